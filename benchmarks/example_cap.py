@@ -0,0 +1,69 @@
+"""
+Benchmarks item-item recommend requests of a user with many preferences for several caps on the number of examples,
+reporting the latency and the overlap of the capped recommendations with the uncapped ones.
+
+A synthetic user rates random quotes of the collection, in random order of recency.
+Usage: python -m benchmarks.example_cap --likes 300 --dislikes 100 --caps 10 20 50 100
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.utils import measure
+from quotes_recommender.recommender.constants import (
+    DEFAULT_RECOMMENDATIONS_LIMIT,
+    EXAMPLE_CANDIDATES_FACTOR,
+)
+from quotes_recommender.recommender.examples import select_examples
+from quotes_recommender.vector_store.vector_store_singleton import (
+    QdrantVectorStoreSingleton,
+)
+
+
+def main() -> None:
+    """Measures recommend requests with capped and uncapped examples."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--likes', type=int, default=300)
+    parser.add_argument('--dislikes', type=int, default=100)
+    parser.add_argument('--caps', type=int, nargs='+', default=[10, 20, 50, 100])
+    parser.add_argument('--limit', type=int, default=DEFAULT_RECOMMENDATIONS_LIMIT)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    vector_store = QdrantVectorStoreSingleton().vector_store
+    points, _ = vector_store.scroll_points(payload_attributes=['tags'], limit=(args.likes + args.dislikes) * 5)
+    if len(points) < args.likes + args.dislikes:
+        raise ValueError(f'The collection holds only {len(points)} quotes.')
+    rng = np.random.default_rng(0)
+    rated = [points[index] for index in rng.permutation(len(points))[: args.likes + args.dislikes]]
+    tags = {str(point.id): (point.payload or {}).get('tags') or [] for point in rated}
+    likes = [str(point.id) for point in rated[: args.likes]]
+    dislikes = [str(point.id) for point in rated[args.likes :]]
+
+    def recommend(positives: list[str], negatives: list[str]) -> set[str]:
+        return {
+            str(point.id)
+            for point in vector_store.get_item_item_recommendations(
+                positives=positives, negatives=negatives, limit=args.limit
+            )
+        }
+
+    uncapped = recommend(likes, dislikes)
+    print(
+        measure(
+            f'uncapped ({len(likes)} positives, {len(dislikes)} negatives)',
+            lambda: recommend(likes, dislikes),
+            runs=args.runs,
+        )
+    )
+    for cap in args.caps:
+        positives = select_examples(likes[: cap * EXAMPLE_CANDIDATES_FACTOR], tags, cap)
+        negatives = select_examples(dislikes[: cap * EXAMPLE_CANDIDATES_FACTOR], tags, cap)
+        overlap = len(recommend(positives, negatives) & uncapped) / max(len(uncapped), 1)
+        result = measure(f'cap={cap}', lambda: recommend(positives, negatives), runs=args.runs)  # noqa: B023
+        print(f'{result} overlap={overlap:.2f}')
+
+
+if __name__ == '__main__':
+    main()
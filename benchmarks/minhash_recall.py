@@ -0,0 +1,107 @@
+"""
+Benchmarks the MinHash LSH index against the exact bitmap intersection search for similar users.
+
+Writes random users to the given Redis database, which has to be empty, and flushes it afterwards.
+Usage: python -m benchmarks.minhash_recall --users 100000 --db 15
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.utils import measure
+from quotes_recommender.user_store.constants import (
+    DEFAULT_LSH_BANDS,
+    QUOTE_IDS_KEY,
+    QUOTE_INDEX_KEY,
+)
+from quotes_recommender.user_store.minhash import MinHashIndex
+from quotes_recommender.user_store.models import PreferenceKey
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.utils.redis import RedisConfig
+
+
+def generate_users(user_store: RedisUserStore, users: int, quotes: int, tastes: int, likes: int) -> None:
+    """
+    Stores random like bitmaps. Each user likes quotes of one of several tastes, so that similar users exist.
+    :param user_store: User store to write to.
+    :param users: Number of users.
+    :param quotes: Number of quotes.
+    :param tastes: Number of tastes, i.e., groups of quotes liked together.
+    :param likes: Mean number of likes per user.
+    :return: None
+    """
+    rng = np.random.default_rng(42)
+    taste_quotes = np.array_split(rng.permutation(quotes), tastes)
+    # quotes are addressed by their own number
+    user_store.client.hset(QUOTE_INDEX_KEY, mapping={str(quote): quote for quote in range(quotes)})
+    user_store.client.rpush(QUOTE_IDS_KEY, *map(str, range(quotes)))
+    with user_store.client.pipeline(transaction=False) as pipe:
+        for user in range(users):
+            pool = taste_quotes[rng.integers(tastes)]
+            user_likes = rng.choice(pool, size=min(len(pool), max(1, rng.poisson(likes))), replace=False)
+            bits = np.zeros(quotes, dtype=np.uint8)
+            bits[user_likes] = 1
+            pipe.set(PreferenceKey(username=f'user-{user}').like_key, np.packbits(bits).tobytes())
+            if user % 10_000 == 0:
+                pipe.execute()
+        pipe.execute()
+
+
+def exact_similar_users(user_store: RedisUserStore, username: str, k: int) -> list[tuple[str, float]]:
+    """
+    Returns the users with the highest exact Jaccard similarity.
+    :param user_store: User store holding the preference bitmaps and the likers index.
+    :param username: The username of the user.
+    :param k: Max number of similar users.
+    :return: Usernames and Jaccard similarities, most similar first.
+    """
+    likes, _ = user_store.get_user_preferences(username)
+    common_likes = user_store.get_common_likes(username, likes=likes)
+    like_counts = user_store.get_like_counts(list(common_likes))
+    similarities = [
+        (other_user, intersection_size / (len(likes) + like_count - intersection_size))
+        for (other_user, intersection_size), like_count in zip(common_likes.items(), like_counts)
+    ]
+    return sorted(similarities, key=lambda item: -item[1])[:k]
+
+
+def main() -> None:
+    """Generates random users, builds both indexes and compares recall and latency."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--quotes', type=int, default=20_000)
+    parser.add_argument('--tastes', type=int, default=500)
+    parser.add_argument('--likes', type=int, default=20)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--bands', type=int, default=DEFAULT_LSH_BANDS)
+    parser.add_argument('--db', type=int, default=15)
+    args = parser.parse_args()
+
+    user_store = RedisUserStore(RedisConfig(db=args.db))
+    if user_store.client.dbsize():
+        raise ValueError(f'Redis database {args.db} is not empty.')
+    try:
+        generate_users(user_store, args.users, args.quotes, args.tastes, args.likes)
+        user_store.rebuild_likers_index()
+        minhash_index = MinHashIndex(user_store, bands=args.bands)
+        minhash_index.rebuild()
+
+        rng = np.random.default_rng(0)
+        queries = [f'user-{user}' for user in rng.choice(args.users, size=args.queries, replace=False)]
+        recalls = []
+        for username in queries:
+            exact = {other_user for other_user, _ in exact_similar_users(user_store, username, args.k)}
+            approximate = {other_user for other_user, _ in minhash_index.get_similar_users(username, args.k)}
+            if exact:
+                recalls.append(len(exact & approximate) / len(exact))
+        print(f'recall@{args.k}: {np.mean(recalls):.3f} ({len(recalls)} queries)')
+        print(measure('exact (bitmaps)', lambda: exact_similar_users(user_store, queries[0], args.k)))
+        print(measure('approximate (MinHash LSH)', lambda: minhash_index.get_similar_users(queries[0], args.k)))
+    finally:
+        user_store.client.flushdb()
+
+
+if __name__ == '__main__':
+    main()
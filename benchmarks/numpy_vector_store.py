@@ -0,0 +1,120 @@
+"""
+Benchmarks the NumPy brute-force vector store against Qdrant for growing collection sizes.
+
+Usage: python -m benchmarks.numpy_vector_store --sizes 10000 100000 1000000
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+import numpy.typing as npt
+
+from benchmarks.utils import measure
+from quotes_recommender.utils.qdrant import QdrantConfig
+from quotes_recommender.vector_store.constants import DEFAULT_EMBEDDING_SIZE
+from quotes_recommender.vector_store.vector_store_numpy import NumpyVectorStore
+from quotes_recommender.vector_store.vector_store_qdrant import QdrantVectorStore
+
+TAGS: list[str] = ['love', 'life', 'inspirational', 'humor', 'philosophy', 'wisdom', 'truth', 'poetry']
+
+
+def generate_batches(size: int, batch_size: int = 10_000) -> Iterator[tuple[list[Any], npt.NDArray[np.float32]]]:
+    """
+    Generates random quotes and embeddings.
+    :param size: Number of quotes.
+    :param batch_size: Number of quotes per batch.
+    :return: Batches of quote items and embeddings.
+    """
+    rng = np.random.default_rng(42)
+    for start in range(0, size, batch_size):
+        count = min(batch_size, size - start)
+        quotes = [
+            {
+                'id': point_id,
+                'data': {
+                    'text': f'quote {point_id}',
+                    'author': f'author {point_id % 1000}',
+                    'avatar_img': None,
+                    'tags': list(rng.choice(TAGS, size=2, replace=False)),
+                },
+            }
+            for point_id in range(start, start + count)
+        ]
+        yield quotes, rng.standard_normal((count, DEFAULT_EMBEDDING_SIZE), dtype=np.float32)
+
+
+def benchmark(name: str, vector_store: Any, collection: str, size: int, runs: int) -> None:
+    """
+    Measures the requests issued by the app.
+    :param name: Name of the backend.
+    :param vector_store: Vector store instance.
+    :param collection: Collection to query.
+    :param size: Number of points in the collection.
+    :param runs: Number of runs per request.
+    :return: None
+    """
+    rng = np.random.default_rng(0)
+    query = rng.standard_normal(DEFAULT_EMBEDDING_SIZE, dtype=np.float32)
+    examples = [int(point_id) for point_id in rng.choice(size, size=10, replace=False)]
+    for result in [
+        measure(
+            f'{name} search',
+            lambda: vector_store.get_content_based_recommendation(query, collection=collection),
+            runs=runs,
+        ),
+        measure(
+            f'{name} search (tag filter)',
+            lambda: vector_store.get_content_based_recommendation(query, tags=['love'], collection=collection),
+            runs=runs,
+        ),
+        measure(
+            f'{name} recommend (5 positives, 5 negatives)',
+            lambda: vector_store.get_item_item_recommendations(
+                positives=examples[:5], negatives=examples[5:], collection=collection
+            ),
+            runs=runs,
+        ),
+        measure(f'{name} retrieve (10 IDs)', lambda: vector_store.search_points(examples, collection=collection), runs),
+        measure(
+            f'{name} scroll (tag filter)',
+            lambda: vector_store.scroll_points(['text'], tags=['love'], limit=25, collection=collection),
+            runs=runs,
+        ),
+    ]:
+        print(result)
+
+
+def main() -> None:
+    """Loads random data into both backends and measures each of them."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--skip-qdrant', action='store_true')
+    args = parser.parse_args()
+
+    qdrant_store = None if args.skip_qdrant else QdrantVectorStore(QdrantConfig())
+    for size in args.sizes:
+        print(f'### {size} points')
+        collection = f'benchmark_{size}'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            numpy_store = NumpyVectorStore(path=Path(tmp_dir))
+            for quotes, embeddings in generate_batches(size):
+                numpy_store.upsert_quotes(quotes, embeddings, collection_name=collection)
+            benchmark('numpy', numpy_store, collection, size, args.runs)
+        if qdrant_store is not None:
+            qdrant_store.client.recreate_collection(
+                collection_name=collection,
+                vectors_config=qdrant_store.client.get_collection(collection_name='quotes').config.params.vectors,
+            )
+            qdrant_store.ensure_payload_indexes(collection=collection)
+            for quotes, embeddings in generate_batches(size):
+                qdrant_store.upsert_quotes(quotes, embeddings.tolist(), collection_name=collection)
+            benchmark('qdrant', qdrant_store, collection, size, args.runs)
+            qdrant_store.client.delete_collection(collection)
+
+
+if __name__ == '__main__':
+    main()
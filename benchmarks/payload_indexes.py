@@ -0,0 +1,95 @@
+"""
+Benchmarks filtered scroll and search requests against Qdrant before and after creating the payload indexes.
+
+The managed indexes of the collection are dropped for the first measurement, so run it against a scratch copy of the
+quotes collection rather than the one served by the app. The indexes are re-created even if the benchmark fails.
+
+Usage: python -m benchmarks.payload_indexes --collection quotes-benchmark --keyword love --author "Oscar Wilde"
+"""
+
+import argparse
+
+import numpy as np
+from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+
+from benchmarks.utils import TimingResult, measure
+from quotes_recommender.vector_store.constants import (
+    DEFAULT_EMBEDDING_SIZE,
+    DEFAULT_PAYLOAD_INDEX,
+    DEFAULT_QUOTE_COLLECTION,
+    PAYLOAD_INDEXES,
+)
+from quotes_recommender.vector_store.vector_store_singleton import (
+    QdrantVectorStoreSingleton,
+)
+
+
+def run_queries(collection: str, keyword: str, author: str, runs: int) -> list[TimingResult]:
+    """
+    Measures the filtered requests issued by the app.
+    :param collection: Collection to query.
+    :param keyword: Keyword for the full-text filter.
+    :param author: Author for the author filter.
+    :param runs: Number of runs per request.
+    :return: Timing results.
+    """
+    vector_store = QdrantVectorStoreSingleton().vector_store
+    query_embedding = np.random.default_rng(0).random(DEFAULT_EMBEDDING_SIZE, dtype=np.float32)
+    author_filter = Filter(must=[FieldCondition(key='author', match=MatchValue(value=author))])
+    return [
+        measure(
+            'scroll (keyword filter)',
+            lambda: vector_store.scroll_points(['text'], keyword=keyword, limit=25, collection=collection),
+            runs=runs,
+        ),
+        measure(
+            'search (author filter)',
+            lambda: vector_store.client.search(
+                collection_name=collection, query_vector=query_embedding, query_filter=author_filter, limit=10
+            ),
+            runs=runs,
+        ),
+        measure(
+            'count (likes range filter)',
+            lambda: vector_store.client.count(
+                collection_name=collection,
+                count_filter=Filter(must=[FieldCondition(key='likes', range={'gte': 1000})]),
+                exact=True,
+            ),
+            runs=runs,
+        ),
+    ]
+
+
+def main() -> None:
+    """Drops the managed indexes (except the tags index), measures, re-creates them and measures again."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--collection', required=True, help='Scratch collection, its indexes are dropped.')
+    parser.add_argument('--keyword', default='love')
+    parser.add_argument('--author', default='Oscar Wilde')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+    if args.collection == DEFAULT_QUOTE_COLLECTION:
+        parser.error(f'refusing to drop the indexes of the served collection {DEFAULT_QUOTE_COLLECTION!r}')
+
+    vector_store = QdrantVectorStoreSingleton().vector_store
+    try:
+        for field_name in PAYLOAD_INDEXES:
+            if field_name != DEFAULT_PAYLOAD_INDEX:
+                vector_store.client.delete_payload_index(
+                    collection_name=args.collection, field_name=field_name, wait=True
+                )
+        print('### Without payload indexes')
+        for result in run_queries(args.collection, args.keyword, args.author, args.runs):
+            print(result)
+    finally:
+        # restore the indexes even if the benchmark failed
+        for status in vector_store.ensure_payload_indexes(collection=args.collection):
+            print(status)
+    print('### With payload indexes')
+    for result in run_queries(args.collection, args.keyword, args.author, args.runs):
+        print(result)
+
+
+if __name__ == '__main__':
+    main()
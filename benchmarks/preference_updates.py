@@ -0,0 +1,162 @@
+"""
+Benchmarks the throughput of preference updates under concurrent clients, comparing the atomic Lua scripts with the
+previous approach of checking memberships first and applying the changes in a second round trip.
+
+Writes random preferences to the given Redis database, which has to be empty, and flushes it afterwards.
+Usage: python -m benchmarks.preference_updates --clients 1 4 16 --seconds 5 --db 15
+"""
+
+import argparse
+import itertools
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+from quotes_recommender.user_store.constants import QUOTE_IDS_KEY, QUOTE_INDEX_KEY
+from quotes_recommender.user_store.models import LikersKey, PreferenceKey
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.utils.redis import RedisConfig
+
+
+def seed_quote_ids(user_store: RedisUserStore, quotes: int) -> dict[str, int]:
+    """
+    Assigns the dense integers of all quotes up front, so that both approaches address the same bits.
+    :param user_store: User store.
+    :param quotes: Number of quotes.
+    :return: Quote IDs mapped to their integers.
+    """
+    quote_indexes = {f'quote-{quote}': quote for quote in range(quotes)}
+    user_store.client.hset(QUOTE_INDEX_KEY, mapping=quote_indexes)  # type: ignore
+    user_store.client.rpush(QUOTE_IDS_KEY, *quote_indexes)
+    return quote_indexes
+
+
+def legacy_set_preferences(user_store: RedisUserStore, username: str, quote_id: str, index: int, like: bool) -> None:
+    """
+    Sets a preference the way it was done before the scripts: check the bits, then move or set in a transaction.
+    :param user_store: User store.
+    :param username: The username of the user.
+    :param quote_id: ID of the rated quote.
+    :param index: Dense integer of the rated quote.
+    :param like: Whether the quote is liked or disliked.
+    :return: None
+    """
+    hash_keys = PreferenceKey(username=username)
+    dst_key, src_key = (
+        (hash_keys.like_key, hash_keys.dislike_key) if like else (hash_keys.dislike_key, hash_keys.like_key)
+    )
+    with user_store.client.pipeline(transaction=False) as pipe:
+        pipe.getbit(src_key, index)
+        pipe.getbit(dst_key, index)
+        in_src, in_dst = pipe.execute()
+    if in_dst:
+        return
+    with user_store.client.pipeline() as pipe:
+        if in_src:
+            pipe.setbit(src_key, index, 0)
+        pipe.setbit(dst_key, index, 1)
+        if like:
+            pipe.sadd(LikersKey(quote_id=quote_id).key, username)
+        elif in_src:
+            pipe.srem(LikersKey(quote_id=quote_id).key, username)
+        pipe.execute()
+
+
+def legacy_delete_preference(user_store: RedisUserStore, username: str, quote_id: str, index: int, like: bool) -> None:
+    """
+    Deletes a preference the way it was done before the scripts: check the bit, then clear it.
+    :param user_store: User store.
+    :param username: The username of the user.
+    :param quote_id: ID of the rated quote.
+    :param index: Dense integer of the rated quote.
+    :param like: Whether a like or a dislike is deleted.
+    :return: None
+    """
+    hash_keys = PreferenceKey(username=username)
+    key = hash_keys.like_key if like else hash_keys.dislike_key
+    if not user_store.client.getbit(key, index):
+        return
+    with user_store.client.pipeline() as pipe:
+        pipe.setbit(key, index, 0)
+        if like:
+            pipe.srem(LikersKey(quote_id=quote_id).key, username)
+        pipe.execute()
+
+
+def run_clients(
+    name: str, clients: int, seconds: float, quotes: int, operation: Callable[[int, str, str, bool], None]
+) -> None:
+    """
+    Runs random likes, dislikes and deletions from concurrent clients and prints the throughput.
+    :param name: Name of the approach.
+    :param clients: Number of concurrent clients, each rating as its own user.
+    :param seconds: Duration of the run.
+    :param quotes: Number of quotes to rate.
+    :param operation: Callable applying an operation ('set' or 'delete') of a client to a quote, liked or disliked.
+    :return: None
+    """
+    counts = [0] * clients
+    stop = threading.Event()
+
+    def client(client_index: int) -> None:
+        rng = np.random.default_rng(client_index)
+        while not stop.is_set():
+            action = 'delete' if rng.random() < 0.3 else 'set'
+            operation(client_index, action, f'quote-{rng.integers(quotes)}', bool(rng.random() < 0.7))
+            counts[client_index] += 1
+
+    threads = [threading.Thread(target=client, args=(client_index,)) for client_index in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(f'{name:<10} clients={clients:<4} {sum(counts) / seconds:10.1f} ops/sec')
+
+
+def main() -> None:
+    """Measures both approaches for growing numbers of concurrent clients."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--quotes', type=int, default=1_000)
+    parser.add_argument('--db', type=int, default=15)
+    args = parser.parse_args()
+
+    user_store = RedisUserStore(RedisConfig(db=args.db))
+    if user_store.client.dbsize():
+        raise ValueError(f'Redis database {args.db} is not empty.')
+    quote_indexes = seed_quote_ids(user_store, args.quotes)
+
+    def script_operation(client_index: int, action: str, quote_id: str, like: bool) -> None:
+        username = f'user-{client_index}'
+        if action == 'delete':
+            user_store.delete_user_preference(
+                username, likes=[quote_id] if like else None, dislikes=None if like else [quote_id]
+            )
+        else:
+            user_store.set_user_preferences(
+                username, likes=[quote_id] if like else None, dislikes=None if like else [quote_id]
+            )
+
+    def legacy_operation(client_index: int, action: str, quote_id: str, like: bool) -> None:
+        username = f'user-{client_index}'
+        if action == 'delete':
+            legacy_delete_preference(user_store, username, quote_id, quote_indexes[quote_id], like)
+        else:
+            legacy_set_preferences(user_store, username, quote_id, quote_indexes[quote_id], like)
+
+    try:
+        for clients, (name, operation) in itertools.product(
+            args.clients, [('script', script_operation), ('legacy', legacy_operation)]
+        ):
+            run_clients(name, clients, args.seconds, args.quotes, operation)
+    finally:
+        user_store.client.flushdb()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmarks the throughput of preference reads and writes under concurrent requests, comparing the blocking user store
+served by a thread pool with the asyncio user store served by a single event loop. Both share a connection pool of
+--max-connections connections.
+
+Writes random preferences to the given Redis database, which has to be empty, and flushes it afterwards.
+Usage: python -m benchmarks.user_store_concurrency --concurrency 1 16 64 --requests 5000 --db 15
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.user_store.user_store_redis_async import (
+    AsyncRedisUserStore,
+)
+from quotes_recommender.utils.redis import RedisConfig
+
+
+def make_requests(requests: int, users: int, quotes: int) -> list[tuple[str, str, bool]]:
+    """
+    Draws random requests.
+    :param requests: Number of requests.
+    :param users: Number of users.
+    :param quotes: Number of quotes.
+    :return: Usernames, quote IDs and whether the quote is liked.
+    """
+    rng = np.random.default_rng(0)
+    return [
+        (f'user-{user}', f'quote-{quote}', bool(like))
+        for user, quote, like in zip(
+            rng.integers(users, size=requests), rng.integers(quotes, size=requests), rng.random(requests) < 0.7
+        )
+    ]
+
+
+def run_sync(
+    user_store: RedisUserStore, operation: str, concurrency: int, requests: list[tuple[str, str, bool]]
+) -> float:
+    """
+    Serves the requests with the blocking user store from a thread pool.
+    :param user_store: Blocking user store.
+    :param operation: 'read' or 'write'.
+    :param concurrency: Number of threads.
+    :param requests: Requests.
+    :return: Requests per second.
+    """
+
+    def handle(request: tuple[str, str, bool]) -> None:
+        username, quote_id, like = request
+        if operation == 'read':
+            user_store.get_user_preferences(username)
+        else:
+            user_store.set_user_preferences(
+                username, likes=[quote_id] if like else None, dislikes=None if like else [quote_id]
+            )
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(handle, requests))
+    return len(requests) / (time.perf_counter() - start_time)
+
+
+async def run_async(
+    user_store: AsyncRedisUserStore, operation: str, concurrency: int, requests: list[tuple[str, str, bool]]
+) -> float:
+    """
+    Serves the requests with the asyncio user store, at most the given number at once.
+    :param user_store: Asyncio user store.
+    :param operation: 'read' or 'write'.
+    :param concurrency: Number of concurrent requests.
+    :param requests: Requests.
+    :return: Requests per second.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def handle(request: tuple[str, str, bool]) -> None:
+        username, quote_id, like = request
+        async with semaphore:
+            if operation == 'read':
+                await user_store.get_user_preferences(username)
+            else:
+                await user_store.set_user_preferences(
+                    username, likes=[quote_id] if like else None, dislikes=None if like else [quote_id]
+                )
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(handle(request) for request in requests))
+    return len(requests) / (time.perf_counter() - start_time)
+
+
+async def run_all(args: argparse.Namespace) -> None:
+    """
+    Measures both stores for all operations and concurrency levels.
+    :param args: Parsed arguments.
+    :return: None
+    """
+    redis_config = RedisConfig(db=args.db, max_connections=args.max_connections)
+    user_store = RedisUserStore(redis_config)
+    async_user_store = AsyncRedisUserStore(redis_config)
+    await async_user_store.ping()
+    if user_store.client.dbsize():
+        raise ValueError(f'Redis database {args.db} is not empty.')
+    requests = make_requests(args.requests, args.users, args.quotes)
+    try:
+        # writes first, so that reads find preferences
+        for operation, concurrency in itertools.product(['write', 'read'], args.concurrency):
+            sync_throughput = run_sync(user_store, operation, concurrency, requests)
+            async_throughput = await run_async(async_user_store, operation, concurrency, requests)
+            print(
+                f'{operation:<6} concurrency={concurrency:<4} '
+                f'sync {sync_throughput:10.1f} req/sec  async {async_throughput:10.1f} req/sec'
+            )
+    finally:
+        user_store.client.flushdb()
+        await async_user_store.close()
+
+
+def main() -> None:
+    """Compares the blocking and the asyncio user store."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--requests', type=int, default=5_000)
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--quotes', type=int, default=1_000)
+    parser.add_argument('--max-connections', type=int, default=64)
+    parser.add_argument('--db', type=int, default=15)
+    asyncio.run(run_all(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
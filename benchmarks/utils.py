@@ -0,0 +1,47 @@
+import statistics
+import time
+from typing import Any, Callable
+
+from pydantic import BaseModel, Field
+
+
+class TimingResult(BaseModel):
+    """Class summarizing repeated measurements of a single operation."""
+
+    name: str = Field(description="Name of the measured operation.")
+    runs: int = Field(description="Number of measured runs.")
+    mean_ms: float = Field(description="Mean latency in milliseconds.")
+    p50_ms: float = Field(description="Median latency in milliseconds.")
+    p95_ms: float = Field(description="95th percentile latency in milliseconds.")
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<45} runs={self.runs:<5} mean={self.mean_ms:8.2f}ms "
+            f"p50={self.p50_ms:8.2f}ms p95={self.p95_ms:8.2f}ms"
+        )
+
+
+def measure(name: str, func: Callable[[], Any], runs: int = 50, warmup: int = 3) -> TimingResult:
+    """
+    Measures the latency of a callable.
+    :param name: Name of the measured operation.
+    :param func: Callable without arguments to measure.
+    :param runs: Number of measured runs.
+    :param warmup: Number of unmeasured runs before measuring.
+    :return: Timing summary.
+    """
+    for _ in range(warmup):
+        func()
+    durations: list[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return TimingResult(
+        name=name,
+        runs=runs,
+        mean_ms=statistics.fmean(durations),
+        p50_ms=durations[len(durations) // 2],
+        p95_ms=durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+    )
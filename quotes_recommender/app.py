@@ -3,10 +3,24 @@ import streamlit_authenticator as stauth
 from st_pages import show_pages_from_config
 from streamlit_authenticator.exceptions import RegisterError
 
-from quotes_recommender.core.constants import LOGO_PATH
+from quotes_recommender.core.constants import (
+    DISLIKED_QUOTES_LIMIT_STATE_KEY,
+    LIKED_QUOTES_LIMIT_STATE_KEY,
+    LOGO_PATH,
+)
 from quotes_recommender.core.models import UserPreference
+from quotes_recommender.user_store.popularity_singleton import PopularityIndexSingleton
 from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSingleton
-from quotes_recommender.utils.streamlit import display_quotes
+from quotes_recommender.utils.streamlit import (
+    cancel_recommendations_prefetch,
+    display_load_more_button,
+    display_quotes,
+    flush_preference_buffer_when_due,
+    get_chunk_limit,
+    get_preference_buffer,
+    measure_render,
+    prefetch_recommendations,
+)
 from quotes_recommender.vector_store.vector_store_singleton import (
     QdrantVectorStoreSingleton,
 )
@@ -15,6 +29,8 @@ from quotes_recommender.vector_store.vector_store_singleton import (
 try:
     vector_store = QdrantVectorStoreSingleton().vector_store
     user_store = RedisUserStoreSingleton().user_store
+    # keep the popularity leaderboards in sync with preference updates
+    PopularityIndexSingleton()
 except AttributeError:
     st.rerun()
 
@@ -57,11 +73,16 @@ with login_tab:
         st.sidebar.write(f"Logged in as {st.session_state['name']}")
         # display logout button in sidebar
         authenticator.logout('Logout', 'sidebar', key='logout_sidebar')
+        # compute the user's recommendations in the background, the user likely heads to them next
+        prefetch_recommendations()
         # write welcome message
         st.write(f"## Welcome {st.session_state['name']} 👋")
         with st.spinner('Loading your preferences'):
-            # get (dis-)likes (if any) of logged-in user
-            like_preferences, dislike_preferences = user_store.get_user_preferences(st.session_state['username'])
+            # get (dis-)likes (if any) of logged-in user, including toggles that were not written to redis yet
+            preference_buffer = get_preference_buffer(page='main')
+            like_preferences, dislike_preferences = preference_buffer.likes, preference_buffer.dislikes
+        # write buffered toggles to redis once due, even if the user does not interact with the page anymore
+        flush_preference_buffer_when_due()
         # if user has no preferences
         if (not like_preferences) and (not dislike_preferences):
             st.info(
@@ -80,9 +101,10 @@ with login_tab:
             )
             st.divider()
 
-            # fetch data from Qdrant
-            liked_quotes, disliked_quotes = vector_store.search_points(like_preferences), vector_store.search_points(
-                dislike_preferences
+            # fetch the displayed chunks of the quotes from Qdrant, further chunks are loaded on demand
+            liked_quotes = vector_store.search_points(like_preferences[: get_chunk_limit(LIKED_QUOTES_LIMIT_STATE_KEY)])
+            disliked_quotes = vector_store.search_points(
+                dislike_preferences[: get_chunk_limit(DISLIKED_QUOTES_LIMIT_STATE_KEY)]
             )
             # construct UserPreference instances in order to display later
             like_ratings: list[UserPreference] = [
@@ -98,7 +120,7 @@ with login_tab:
             set_likes, set_dislikes = set(), set()
             # display preferences
             left_col, right_col = st.columns(2)
-            with left_col:
+            with left_col, measure_render('main (likes)'):
                 st.write('### Your Likes')
                 if liked_quotes:
                     # get quote IDs of liked quotes for this session
@@ -109,9 +131,10 @@ with login_tab:
                     # add user inputs to accumulators
                     set_likes.update(set_likes_left)
                     set_dislikes.update(set_dislikes_left)
+                    display_load_more_button(LIKED_QUOTES_LIMIT_STATE_KEY, total=len(like_preferences))
                 else:
                     st.info('You have no liked quotes.')
-            with right_col:
+            with right_col, measure_render('main (dislikes)'):
                 st.write('### Your Dislikes')
                 if disliked_quotes:
                     # get quote IDs of disliked quotes for this session
@@ -122,47 +145,26 @@ with login_tab:
                     # add user inputs to accumulators
                     set_likes.update(set_likes_right)
                     set_dislikes.update(set_dislikes_right)
+                    display_load_more_button(DISLIKED_QUOTES_LIMIT_STATE_KEY, total=len(dislike_preferences))
                 else:
                     st.info('You have no disliked quotes.')
 
-            # if new likes were added
-            if new_likes := set_likes.difference(set(like_preferences)):
-                # add them to redis
-                if not user_store.set_user_preferences(username=st.session_state['username'], likes=new_likes):
-                    st.toast('Failed to save preferences. Please try again later.', icon='🕠')
-                else:
-                    st.rerun()
-            # if new dislikes were added
-            elif new_dislikes := set_dislikes.difference(set(dislike_preferences)):
-                # add them to redis
-                if not user_store.set_user_preferences(username=st.session_state['username'], dislikes=new_dislikes):
-                    st.toast('Failed to save preferences. Please try again later.', icon='🕠')
-                else:
-                    st.rerun()
-            # if no new likes were added, they have to be unselected
-            elif (not new_likes) and (unset_likes := set(like_preferences).difference(set_likes)):
-                # delete them from redis
-                if not user_store.delete_user_preference(
-                    username=st.session_state['username'], likes=list(unset_likes)
-                ):
-                    st.toast('Failed to save preferences. Please try again later.', icon='🕠')
-                else:
-                    st.rerun()
-            # if no new dislikes were added, they have to be unselected
-            elif (not new_dislikes) and (unset_dislikes := set(dislike_preferences).difference(set_dislikes)):
-                # delete them from redis
-                if not user_store.delete_user_preference(
-                    username=st.session_state['username'], dislikes=list(unset_dislikes)
-                ):
-                    st.toast('Failed to save preferences. Please try again later.', icon='🕠')
-                else:
-                    st.rerun()
+            # buffer changed preferences, they are written to redis in one batch once due
+            preference_buffer.record(
+                [quote.id for quote in liked_quotes + disliked_quotes],
+                likes=list(set_likes),
+                dislikes=list(set_dislikes),
+            )
+            if not preference_buffer.flush_if_due():
+                st.toast('Failed to save preferences. Please try again later.', icon='🕠')
 
     # if login was not successful
     elif st.session_state['authentication_status'] is False:
         st.error('❌ Username/password is incorrect')
     # if nothing was typed in
     elif st.session_state['authentication_status'] is None:
+        # stop prefetching the recommendations of a user who logged out
+        cancel_recommendations_prefetch()
         st.warning('Please enter your username and password')
 
 # Sign Up tab
@@ -6,13 +6,57 @@ from yarl import URL
 
 TXT_ENCODING: Final[str] = 'utf-8'
 
+# UI settings
+PREFERENCES_PAGE_SIZE: Final[int] = 25
+# number of quote cards of a list rendered at once, further chunks are rendered on demand
+QUOTES_CHUNK_SIZE: Final[int] = 10
+# session state keys of the number of liked and disliked quotes displayed on the main page
+LIKED_QUOTES_LIMIT_STATE_KEY: Final[str] = 'liked_quotes_limit'
+DISLIKED_QUOTES_LIMIT_STATE_KEY: Final[str] = 'disliked_quotes_limit'
+PREFETCH_WORKERS: Final[int] = 4
+# threads fetching the item-item and user-user recommendations of all sessions concurrently
+RECOMMENDATION_WORKERS: Final[int] = 8
+# seconds after the first buffered preference toggle at which the session's preferences are written to Redis
+PREFERENCE_FLUSH_INTERVAL: Final[float] = 3.0
+# number of buffered preference toggles at which the session's preferences are written to Redis right away
+PREFERENCE_BUFFER_SIZE: Final[int] = 20
+# session state key of the preference buffer
+PREFERENCE_BUFFER_STATE_KEY: Final[str] = 'preference_buffer'
+# session state key of the user whose recommendations were prefetched at login
+PREFETCH_STATE_KEY: Final[str] = 'prefetched_username'
+
 # URLs
 GOODREADS_QUOTES_URL: Final[URL] = URL("https://www.goodreads.com/quotes")
 
 # Paths
 DATA_PATH: Final[Path] = Path('data')
 SENTENCE_ENCODER_PATH: Final[Path] = DATA_PATH / 'all-mpnet-base-v2'
+# version of the quote embeddings, derived data (e.g., user profile vectors) is rebuilt if it changes
+EMBEDDINGS_VERSION: Final[str] = SENTENCE_ENCODER_PATH.name
+NEIGHBOUR_GRAPH_PATH: Final[Path] = DATA_PATH / 'neighbour_graph'
 LOGO_PATH: Final[Path] = Path('resources') / 'sagesnippet_logo.png'
+AVATAR_CACHE_PATH: Final[Path] = DATA_PATH / 'avatar_cache'
+
+# Avatar cache settings
+# max total size of the cached thumbnails in bytes
+AVATAR_CACHE_MAX_BYTES: Final[int] = 64 * 1024 * 1024
+# fraction of the max size the cache is shrunk to once it is exceeded, so that not every insert evicts
+AVATAR_CACHE_LOW_WATERMARK: Final[float] = 0.9
+# max width and height of the thumbnails in pixels
+AVATAR_THUMBNAIL_SIZE: Final[int] = 160
+# seconds to wait for an avatar download
+AVATAR_FETCH_TIMEOUT: Final[float] = 5.0
+# max size of a downloaded avatar in bytes, larger images are rejected before they are read into memory
+AVATAR_MAX_BYTES: Final[int] = 5 * 1024 * 1024
+# seconds after which the download of a broken avatar is retried
+AVATAR_RETRY_INTERVAL: Final[float] = 60 * 60
+# number of concurrent downloads when warming the cache
+AVATAR_WARM_WORKERS: Final[int] = 8
+# threads downloading missing avatars in the background for all sessions, and the max number of queued downloads
+AVATAR_DOWNLOAD_WORKERS: Final[int] = 4
+AVATAR_MAX_PENDING: Final[int] = 256
+# URL schemes avatars are downloaded from
+AVATAR_URL_SCHEMES: Final[tuple[str, ...]] = ('http', 'https')
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 TAG_MAPPING_PATH: Final[Path] = Path(script_dir) / './short_tag_mapping.json'
@@ -5,6 +5,7 @@ import logging
 from quotes_recommender.core.constants import TAG_MAPPING_PATH, TXT_ENCODING
 from quotes_recommender.ml_models.sentence_encoder import SentenceBERT
 from quotes_recommender.quote_scraper.constants import GOODREADS_SPIDER_NAME
+from quotes_recommender.user_store.popularity_singleton import PopularityIndexSingleton
 from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSingleton
 from quotes_recommender.vector_store.vector_store_singleton import (
     QdrantVectorStoreSingleton,
@@ -21,6 +22,7 @@ class QuotesToQdrantPipeline:
         """Initialize the pipeline."""
         self.vector_store = None
         self.user_store = None
+        self.popularity_index = None
         self.tag_mappings = None
 
     def process_item(self, item, spider):
@@ -44,6 +46,8 @@ class QuotesToQdrantPipeline:
         mapped_tags = [self.tag_mappings.get(tag, tag) for tag in item['data']['tags']]
         item['data']['tags'] = list(set(mapped_tags))
         self.vector_store.upsert_quotes([item], [embeddings])
+        # rank the new quote by the likes it received on the scraped website
+        self.popularity_index.seed([(item['id'], item['data']['likes'], item['data']['tags'])])
         return item
 
     def open_spider(self, spider) -> None:
@@ -52,6 +56,7 @@ class QuotesToQdrantPipeline:
         """
         self.vector_store = QdrantVectorStoreSingleton().vector_store
         self.user_store = RedisUserStoreSingleton().user_store
+        self.popularity_index = PopularityIndexSingleton().popularity_index
         with open(TAG_MAPPING_PATH, 'r', encoding=TXT_ENCODING) as file:
             self.tag_mappings = json.load(file)
         file.close()
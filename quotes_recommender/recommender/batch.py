@@ -0,0 +1,137 @@
+"""
+Offline job precomputing the recommendations of all registered users.
+
+Usage: python -m quotes_recommender.recommender.batch --batch-size 64
+"""
+
+import argparse
+import logging
+import time
+from typing import Sequence
+
+from quotes_recommender.recommender.constants import (
+    DEFAULT_MAX_EXAMPLES,
+    DEFAULT_RECOMMENDATIONS_LIMIT,
+    DEFAULT_USER_BATCH_SIZE,
+)
+from quotes_recommender.recommender.examples import get_recommend_examples_batch
+from quotes_recommender.recommender.models import BatchStats
+from quotes_recommender.recommender.user_user import get_user_user_recommendations
+from quotes_recommender.user_store.constants import DEFAULT_RECOMMENDATIONS_TTL
+from quotes_recommender.user_store.models import (
+    PrecomputedRecommendations,
+    get_preferences_version,
+)
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSingleton
+from quotes_recommender.vector_store.vector_store_singleton import (
+    QdrantVectorStoreSingleton,
+    VectorStore,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_user_user_quote_ids(
+    user_store: RedisUserStore,
+    username: str,
+    likes: Sequence[str],
+    dislikes: Sequence[str],
+    limit: int = DEFAULT_RECOMMENDATIONS_LIMIT,
+) -> list[str]:
+    """
+    Returns the quotes the most similar users liked but the given user did not rate yet.
+    :param user_store: User store holding the preferences.
+    :param username: The username of the user.
+    :param likes: IDs of the quotes liked by the user.
+    :param dislikes: IDs of the quotes disliked by the user.
+    :param limit: Max number of quote IDs.
+    :return: Quote IDs, best first.
+    """
+    return [
+        quote_id for quote_id, _ in get_user_user_recommendations(user_store, username, likes, dislikes, limit=limit)
+    ]
+
+
+def precompute_recommendations(
+    user_store: RedisUserStore,
+    vector_store: VectorStore,
+    batch_size: int = DEFAULT_USER_BATCH_SIZE,
+    limit: int = DEFAULT_RECOMMENDATIONS_LIMIT,
+    ttl: int = DEFAULT_RECOMMENDATIONS_TTL,
+    max_examples: int = DEFAULT_MAX_EXAMPLES,
+) -> BatchStats:
+    """
+    Computes item-item and user-user recommendations of all registered users and stores them in Redis.
+    Preferences are read and results are written with one round trip per batch of users, item-item recommendations
+    are requested with one batch request per batch of users.
+    :param user_store: User store holding the preferences.
+    :param vector_store: Vector store holding the quotes.
+    :param batch_size: Number of users processed at once.
+    :param limit: Number of recommendations per user and kind.
+    :param ttl: Seconds after which the recommendations expire.
+    :param max_examples: Max number of positive and of negative examples per item-item recommend request.
+    :return: Statistics of the run.
+    """
+    start_time = time.perf_counter()
+    usernames = list(user_store.get_user_credentials().keys())
+    users, skipped_users = 0, 0
+    for batch_start in range(0, len(usernames), batch_size):
+        batch_end = batch_start + batch_size
+        batch_usernames = usernames[batch_start:batch_end]
+        # skip users without preferences
+        batch = [
+            (username, likes, dislikes)
+            for username, (likes, dislikes) in zip(
+                batch_usernames, user_store.get_user_preferences_batch(batch_usernames)
+            )
+            if likes or dislikes
+        ]
+        skipped_users += len(batch_usernames) - len(batch)
+        item_item_recommendations = vector_store.get_item_item_recommendations_batch(
+            get_recommend_examples_batch(user_store, vector_store, batch, max_examples=max_examples), limit=limit
+        )
+        created_at = time.time()
+        user_store.store_recommendations(
+            {
+                username: PrecomputedRecommendations(
+                    version=get_preferences_version(likes, dislikes),
+                    created_at=created_at,
+                    item_item=[str(point.id) for point in item_item],
+                    user_user=get_user_user_quote_ids(user_store, username, likes, dislikes, limit=limit),
+                )
+                for (username, likes, dislikes), item_item in zip(batch, item_item_recommendations)
+            },
+            ttl=ttl,
+        )
+        users += len(batch)
+        logger.info(f'Precomputed recommendations of {batch_start + len(batch_usernames)}/{len(usernames)} users.')
+    stats = BatchStats(users=users, skipped_users=skipped_users, seconds=time.perf_counter() - start_time)
+    logger.info(
+        f'Precomputed recommendations of {stats.users} users ({stats.skipped_users} without preferences) '
+        f'in {stats.seconds:.1f}s ({stats.users_per_second:.1f} users/sec).'
+    )
+    return stats
+
+
+def main() -> None:
+    """Precomputes the recommendations with the configured stores."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_USER_BATCH_SIZE)
+    parser.add_argument('--limit', type=int, default=DEFAULT_RECOMMENDATIONS_LIMIT)
+    parser.add_argument('--ttl', type=int, default=DEFAULT_RECOMMENDATIONS_TTL)
+    parser.add_argument('--max-examples', type=int, default=DEFAULT_MAX_EXAMPLES)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    precompute_recommendations(
+        RedisUserStoreSingleton().user_store,
+        QdrantVectorStoreSingleton().vector_store,
+        batch_size=args.batch_size,
+        limit=args.limit,
+        ttl=args.ttl,
+        max_examples=args.max_examples,
+    )
+
+
+if __name__ == '__main__':
+    main()
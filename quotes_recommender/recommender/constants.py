@@ -0,0 +1,16 @@
+from typing import Final
+
+# default settings
+DEFAULT_RECOMMENDATIONS_LIMIT: Final[int] = 10
+# number of users whose recommendations are requested at once by the batch job
+DEFAULT_USER_BATCH_SIZE: Final[int] = 64
+# number of most similar users voting for the user-user recommendations
+DEFAULT_NEIGHBOUR_USERS: Final[int] = 20
+# max number of positive and of negative examples per recommend request
+DEFAULT_MAX_EXAMPLES: Final[int] = 20
+# examples are chosen among the most recent max_examples * factor preferences
+EXAMPLE_CANDIDATES_FACTOR: Final[int] = 3
+# seconds a branch of the recommendations may take before it is replaced by popular quotes
+DEFAULT_BRANCH_TIMEOUT: Final[float] = 2.0
+# seconds after which recommendations prefetched at login expire
+DEFAULT_PREFETCH_TTL: Final[int] = 60 * 60
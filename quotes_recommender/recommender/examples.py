@@ -0,0 +1,113 @@
+from typing import Collection, Mapping, Sequence
+
+from quotes_recommender.recommender.constants import (
+    DEFAULT_MAX_EXAMPLES,
+    EXAMPLE_CANDIDATES_FACTOR,
+)
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.vector_store.vector_store_singleton import VectorStore
+
+
+def order_by_recency(preferences: Sequence[str], recent: Sequence[str]) -> list[str]:
+    """
+    Orders preferences by the time they were set. Preferences without a recorded time come last.
+    :param preferences: IDs of the rated quotes.
+    :param recent: IDs of the rated quotes with a recorded time, most recent first.
+    :return: IDs of the rated quotes, most recent first.
+    """
+    preference_set = set(preferences)
+    ordered = [quote_id for quote_id in recent if quote_id in preference_set]
+    recent_set = set(ordered)
+    return ordered + [quote_id for quote_id in preferences if quote_id not in recent_set]
+
+
+def select_examples(candidates: Sequence[str], tags: Mapping[str, Collection[str]], max_examples: int) -> list[str]:
+    """
+    Selects a bounded number of examples, preferring recent ones that cover tags not covered yet.
+    Candidates are first taken in order if they add an uncovered tag, the remaining slots are filled in order.
+    :param candidates: IDs of the candidate quotes, most relevant first.
+    :param tags: IDs of the candidate quotes mapped to their tags.
+    :param max_examples: Max number of examples.
+    :return: IDs of the selected quotes in the order of the candidates.
+    """
+    if len(candidates) <= max_examples:
+        return list(candidates)
+    selected: set[str] = set()
+    covered_tags: set[str] = set()
+    for quote_id in candidates:
+        if len(selected) == max_examples:
+            break
+        if quote_tags := set(tags.get(quote_id, ())) - covered_tags:
+            selected.add(quote_id)
+            covered_tags.update(quote_tags)
+    for quote_id in candidates:
+        if len(selected) == max_examples:
+            break
+        selected.add(quote_id)
+    return [quote_id for quote_id in candidates if quote_id in selected]
+
+
+def get_recommend_examples_batch(
+    user_store: RedisUserStore,
+    vector_store: VectorStore,
+    users: Sequence[tuple[str, Sequence[str], Sequence[str]]],
+    max_examples: int = DEFAULT_MAX_EXAMPLES,
+) -> list[tuple[list[str], list[str]]]:
+    """
+    Caps the positive and negative examples of several users' recommend requests, so that their latency does not grow
+    with the number of preferences. Examples are chosen by recency and tag diversity with one round trip to Redis for
+    the preference times and one cached payload fetch for the tags.
+    :param user_store: User store holding the preferences.
+    :param vector_store: Vector store holding the quote payloads.
+    :param users: Usernames, IDs of the liked and IDs of the disliked quotes.
+    :param max_examples: Max number of positive and of negative examples each.
+    :return: Positive and negative examples per user.
+    """
+    capped = [
+        index for index, (_, likes, dislikes) in enumerate(users) if max(len(likes), len(dislikes)) > max_examples
+    ]
+    examples = [(list(likes), list(dislikes)) for _, likes, dislikes in users]
+    if not capped:
+        return examples
+    num_candidates = max_examples * EXAMPLE_CANDIDATES_FACTOR
+    recent_preferences = user_store.get_recent_preferences_batch(
+        [users[index][0] for index in capped], limit=num_candidates
+    )
+    candidates = {
+        index: (
+            order_by_recency(users[index][1], recent_likes)[:num_candidates],
+            order_by_recency(users[index][2], recent_dislikes)[:num_candidates],
+        )
+        for index, (recent_likes, recent_dislikes) in zip(capped, recent_preferences)
+    }
+    quote_ids = {quote_id for like_ids, dislike_ids in candidates.values() for quote_id in like_ids + dislike_ids}
+    tags = {
+        str(point.id): (point.payload or {}).get('tags') or [] for point in vector_store.search_points(list(quote_ids))
+    }
+    for index, (like_ids, dislike_ids) in candidates.items():
+        examples[index] = (
+            select_examples(like_ids, tags, max_examples),
+            select_examples(dislike_ids, tags, max_examples),
+        )
+    return examples
+
+
+def get_recommend_examples(
+    user_store: RedisUserStore,
+    vector_store: VectorStore,
+    username: str,
+    likes: Sequence[str],
+    dislikes: Sequence[str],
+    max_examples: int = DEFAULT_MAX_EXAMPLES,
+) -> tuple[list[str], list[str]]:
+    """
+    Caps the positive and negative examples of a user's recommend request, see get_recommend_examples_batch.
+    :param user_store: User store holding the preferences.
+    :param vector_store: Vector store holding the quote payloads.
+    :param username: The username of the user.
+    :param likes: IDs of the quotes liked by the user.
+    :param dislikes: IDs of the quotes disliked by the user.
+    :param max_examples: Max number of positive and of negative examples each.
+    :return: Positive and negative examples.
+    """
+    return get_recommend_examples_batch(user_store, vector_store, [(username, likes, dislikes)], max_examples)[0]
@@ -0,0 +1,37 @@
+from pydantic import Field
+from qdrant_client.http.models import Record, ScoredPoint
+
+from quotes_recommender.core.models import ForbidExtraModel
+
+
+class BatchStats(ForbidExtraModel):
+    """Class summarizing a run of the batch recommendation job."""
+
+    users: int = Field(description="Number of users whose recommendations were computed.")
+    skipped_users: int = Field(description="Number of users without any preferences.")
+    seconds: float = Field(description="Duration of the run in seconds.")
+
+    @property
+    def users_per_second(self) -> float:
+        """
+        Throughput of the run.
+        :return: Number of processed users per second.
+        """
+        return (self.users + self.skipped_users) / self.seconds if self.seconds else 0.0
+
+
+class Recommendations(ForbidExtraModel):
+    """Class representing the item-item and user-user recommendations served to a user."""
+
+    item_item: list[Record | ScoredPoint] = Field(
+        default_factory=list, description="Quotes similar to the quotes the user liked."
+    )
+    user_user: list[Record | ScoredPoint] = Field(
+        default_factory=list, description="Quotes the most similar users liked."
+    )
+    item_item_fallback: bool = Field(
+        default=False, description="Whether popular quotes are served as the item-item branch failed or timed out."
+    )
+    user_user_fallback: bool = Field(
+        default=False, description="Whether popular quotes are served as the user-user branch found nothing in time."
+    )
@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future, wait
+from typing import Optional
+
+from quotes_recommender.recommender.batch import get_user_user_quote_ids
+from quotes_recommender.recommender.constants import (
+    DEFAULT_PREFETCH_TTL,
+    DEFAULT_RECOMMENDATIONS_LIMIT,
+)
+from quotes_recommender.recommender.service import get_item_item_quotes
+from quotes_recommender.user_store.models import (
+    PrecomputedRecommendations,
+    get_preferences_version,
+)
+from quotes_recommender.user_store.user_profiles import UserProfileStore
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.vector_store.neighbour_graph import NeighbourGraph
+from quotes_recommender.vector_store.vector_store_singleton import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationPrefetcher:
+    """
+    Computes the recommendations of users in the background as soon as they log in, so that the recommendations page
+    serves them like recommendations precomputed by the batch job. The credentials, preference and payload caches
+    are warmed on the way. Prefetches are deduplicated per user and can be cancelled, e.g. when the user logs out.
+    """
+
+    def __init__(
+        self,
+        user_store: RedisUserStore,
+        vector_store: VectorStore,
+        profile_store: UserProfileStore,
+        executor: Executor,
+        limit: int = DEFAULT_RECOMMENDATIONS_LIMIT,
+        ttl: int = DEFAULT_PREFETCH_TTL,
+    ) -> None:
+        """
+        Init recommendation prefetcher.
+        :param user_store: User store holding the preferences and the precomputed recommendations.
+        :param vector_store: Vector store holding the quotes.
+        :param profile_store: Store of the user profile vectors.
+        :param executor: Executor running the prefetches.
+        :param limit: Number of recommendations per user and kind.
+        :param ttl: Seconds after which prefetched recommendations expire.
+        """
+        self.user_store = user_store
+        self.vector_store = vector_store
+        self.profile_store = profile_store
+        self._executor = executor
+        self._limit = limit
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # usernames mapped to their running prefetch and the event cancelling it
+        self._prefetches: dict[str, tuple[Future[Optional[PrecomputedRecommendations]], threading.Event]] = {}
+
+    def prefetch(
+        self, username: str, neighbour_graph: Optional[NeighbourGraph] = None
+    ) -> Future[Optional[PrecomputedRecommendations]]:
+        """
+        Starts prefetching the recommendations of a user unless a prefetch of the user is running already.
+        :param username: The username of the user.
+        :param neighbour_graph: Precomputed neighbour graph, if built.
+        :return: Future of the prefetched recommendations, None if the user has no preferences or it was cancelled.
+        """
+        with self._lock:
+            if username in self._prefetches:
+                return self._prefetches[username][0]
+            cancelled = threading.Event()
+            future = self._executor.submit(self._prefetch, username, neighbour_graph, cancelled)
+            self._prefetches[username] = (future, cancelled)
+        future.add_done_callback(lambda done: self._forget(username, done))
+        return future
+
+    def _forget(self, username: str, future: Future[Optional[PrecomputedRecommendations]]) -> None:
+        """
+        Forgets a finished prefetch, so that the next login prefetches again.
+        :param username: The username of the user.
+        :param future: Future of the finished prefetch.
+        :return: None
+        """
+        with self._lock:
+            if username in self._prefetches and self._prefetches[username][0] is future:
+                del self._prefetches[username]
+
+    def cancel(self, username: str) -> bool:
+        """
+        Cancels the running prefetch of a user. A queued prefetch does not start, a started one stops after its
+        current step without storing its results.
+        :param username: The username of the user.
+        :return: Whether a prefetch was running.
+        """
+        with self._lock:
+            if (prefetch := self._prefetches.pop(username, None)) is None:
+                return False
+        future, cancelled = prefetch
+        cancelled.set()
+        future.cancel()
+        return True
+
+    def wait(self, username: str, timeout: float) -> None:
+        """
+        Waits for the running prefetch of a user, e.g. before the recommendations are served.
+        :param username: The username of the user.
+        :param timeout: Max number of seconds to wait.
+        :return: None
+        """
+        with self._lock:
+            prefetch = self._prefetches.get(username)
+        if prefetch is not None:
+            wait([prefetch[0]], timeout=timeout)
+
+    def _prefetch(
+        self, username: str, neighbour_graph: Optional[NeighbourGraph], cancelled: threading.Event
+    ) -> Optional[PrecomputedRecommendations]:
+        """
+        Computes and stores the recommendations of a user unless current ones are stored already, and warms the
+        caches the recommendations page reads from.
+        :param username: The username of the user.
+        :param neighbour_graph: Precomputed neighbour graph, if built.
+        :param cancelled: Event set if the prefetch was cancelled.
+        :return: Recommendations of the user, None if the user has no preferences or the prefetch was cancelled.
+        """
+        start_time = time.perf_counter()
+        # warm the credentials and preference caches
+        self.user_store.get_user_credentials()
+        likes, dislikes = self.user_store.get_user_preferences(username)
+        if not (likes or dislikes) or cancelled.is_set():
+            return None
+        version = get_preferences_version(likes, dislikes)
+        recommendations = self.user_store.get_recommendations(username)
+        if recommendations is None or recommendations.version != version:
+            item_item = get_item_item_quotes(
+                self.user_store,
+                self.vector_store,
+                self.profile_store,
+                username,
+                likes,
+                dislikes,
+                neighbour_graph=neighbour_graph,
+                limit=self._limit,
+            )
+            if cancelled.is_set():
+                return None
+            user_user = get_user_user_quote_ids(self.user_store, username, likes, dislikes, limit=self._limit)
+            recommendations = PrecomputedRecommendations(
+                version=version,
+                created_at=time.time(),
+                item_item=[str(point.id) for point in item_item],
+                user_user=user_user,
+            )
+            # a cancelled prefetch stores nothing, e.g. after the user logged out
+            if cancelled.is_set():
+                return None
+            self.user_store.store_recommendations({username: recommendations}, ttl=self._ttl)
+        # warm the payload cache
+        self.vector_store.search_points([*recommendations.item_item, *recommendations.user_user])
+        logger.info(f'Prefetched the recommendations of user {username} in {time.perf_counter() - start_time:.2f}s.')
+        return recommendations
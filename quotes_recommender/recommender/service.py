@@ -0,0 +1,194 @@
+import functools
+import logging
+import time
+from concurrent.futures import Executor, Future, wait
+from typing import Callable, Optional, Sequence
+
+from qdrant_client.http.models import Record, ScoredPoint
+
+from quotes_recommender.recommender.batch import get_user_user_quote_ids
+from quotes_recommender.recommender.constants import (
+    DEFAULT_BRANCH_TIMEOUT,
+    DEFAULT_RECOMMENDATIONS_LIMIT,
+)
+from quotes_recommender.recommender.examples import get_recommend_examples
+from quotes_recommender.recommender.models import Recommendations
+from quotes_recommender.user_store.models import (
+    PrecomputedRecommendations,
+    get_preferences_version,
+)
+from quotes_recommender.user_store.popularity import PopularityIndex
+from quotes_recommender.user_store.user_profiles import UserProfileStore
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.vector_store.neighbour_graph import NeighbourGraph
+from quotes_recommender.vector_store.vector_store_singleton import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+# pylint: disable=too-many-arguments
+def get_item_item_quotes(
+    user_store: RedisUserStore,
+    vector_store: VectorStore,
+    profile_store: UserProfileStore,
+    username: str,
+    likes: Sequence[str],
+    dislikes: Sequence[str],
+    precomputed: Optional[PrecomputedRecommendations] = None,
+    neighbour_graph: Optional[NeighbourGraph] = None,
+    limit: int = DEFAULT_RECOMMENDATIONS_LIMIT,
+) -> list[Record | ScoredPoint]:
+    """
+    Returns quotes similar to the quotes a user liked, from the cheapest source available: precomputed
+    recommendations, the neighbour graph, the user's profile vector or the recommendations API.
+    :param user_store: User store holding the preferences.
+    :param vector_store: Vector store holding the quotes.
+    :param profile_store: Store of the user profile vectors.
+    :param username: The username of the user.
+    :param likes: IDs of the quotes liked by the user.
+    :param dislikes: IDs of the quotes disliked by the user.
+    :param precomputed: Current precomputed recommendations of the user, if any.
+    :param neighbour_graph: Precomputed neighbour graph, if built.
+    :param limit: Max number of recommendations.
+    :return: Recommended quotes, best first.
+    """
+    if precomputed and precomputed.item_item:
+        return vector_store.search_points(precomputed.item_item)
+    if neighbour_graph and (neighbours := neighbour_graph.recommend(positives=likes, negatives=dislikes, limit=limit)):
+        return vector_store.search_points([point_id for point_id, _ in neighbours])
+    if (profile_vector := profile_store.get_profile_vector(username)) is not None:
+        return vector_store.get_profile_recommendations(profile_vector, exclude_ids=[*likes, *dislikes], limit=limit)
+    # fall back to the recommendations API for users without likes
+    positives, negatives = get_recommend_examples(user_store, vector_store, username, likes, dislikes)
+    return vector_store.get_item_item_recommendations(positives=positives, negatives=negatives, limit=limit)
+
+
+def get_user_user_quotes(
+    user_store: RedisUserStore,
+    vector_store: VectorStore,
+    username: str,
+    likes: Sequence[str],
+    dislikes: Sequence[str],
+    precomputed: Optional[PrecomputedRecommendations] = None,
+    limit: int = DEFAULT_RECOMMENDATIONS_LIMIT,
+) -> list[Record]:
+    """
+    Returns the quotes the most similar users liked but the user did not rate yet.
+    :param user_store: User store holding the preferences.
+    :param vector_store: Vector store holding the quotes.
+    :param username: The username of the user.
+    :param likes: IDs of the quotes liked by the user.
+    :param dislikes: IDs of the quotes disliked by the user.
+    :param precomputed: Current precomputed recommendations of the user, if any.
+    :param limit: Max number of recommendations.
+    :return: Recommended quotes, best first.
+    """
+    quote_ids = (
+        precomputed.user_user
+        if precomputed
+        else get_user_user_quote_ids(user_store, username, likes, dislikes, limit=limit)
+    )
+    return vector_store.search_points(quote_ids)
+
+
+def _get_branch_result(
+    name: str, future: Future[list[Record | ScoredPoint]], fallback: Callable[[], list[Record]]
+) -> tuple[list[Record | ScoredPoint], bool]:
+    """
+    Returns the result of a finished branch or the fallback if the branch failed, timed out or found nothing.
+    :param name: Name of the branch for logging.
+    :param future: Future of the branch.
+    :param fallback: Callable returning the fallback quotes.
+    :return: Quotes and whether they are the fallback.
+    """
+    if not future.done():
+        # do not start the branch if it is still queued, a running branch finishes in the background
+        future.cancel()
+        logger.warning(f'The {name} recommendations timed out, serving popular quotes instead.')
+        return fallback(), True
+    if (error := future.exception()) is not None:
+        logger.warning(f'The {name} recommendations failed, serving popular quotes instead: {error!r}')
+        return fallback(), True
+    if not (quotes := future.result()):
+        return fallback(), True
+    return quotes, False
+
+
+# pylint: disable=too-many-locals
+def get_recommendations(
+    user_store: RedisUserStore,
+    vector_store: VectorStore,
+    profile_store: UserProfileStore,
+    popularity_index: PopularityIndex,
+    executor: Executor,
+    username: str,
+    likes: Sequence[str],
+    dislikes: Sequence[str],
+    neighbour_graph: Optional[NeighbourGraph] = None,
+    timeout: float = DEFAULT_BRANCH_TIMEOUT,
+    deadline: Optional[float] = None,
+    limit: int = DEFAULT_RECOMMENDATIONS_LIMIT,
+) -> Recommendations:
+    """
+    Returns the item-item and user-user recommendations of a user. Both branches run concurrently, so the latency is
+    that of the slower branch rather than their sum. A branch that fails, does not finish within the timeout or finds
+    nothing is replaced by the most popular quotes the user did not rate yet, which are fetched once for both branches.
+    :param user_store: User store holding the preferences.
+    :param vector_store: Vector store holding the quotes.
+    :param profile_store: Store of the user profile vectors.
+    :param popularity_index: Leaderboards of the quotes by popularity serving the fallbacks.
+    :param executor: Executor running the branches.
+    :param username: The username of the user.
+    :param likes: IDs of the quotes liked by the user.
+    :param dislikes: IDs of the quotes disliked by the user.
+    :param neighbour_graph: Precomputed neighbour graph, if built.
+    :param timeout: Seconds to wait for the branches.
+    :param deadline: time.monotonic() by which the branches must finish, overrides the timeout if given.
+    :param limit: Max number of recommendations per branch.
+    :return: Recommendations of both branches.
+    """
+    # serve recommendations computed offline unless the preferences changed since
+    precomputed = user_store.get_recommendations(username)
+    if precomputed and precomputed.version != get_preferences_version(likes, dislikes):
+        precomputed = None
+    item_item = executor.submit(
+        get_item_item_quotes,
+        user_store,
+        vector_store,
+        profile_store,
+        username,
+        likes,
+        dislikes,
+        precomputed=precomputed,
+        neighbour_graph=neighbour_graph,
+        limit=limit,
+    )
+    user_user = executor.submit(
+        get_user_user_quotes,
+        user_store,
+        vector_store,
+        username,
+        likes,
+        dislikes,
+        precomputed=precomputed,
+        limit=limit,
+    )
+    # both branches share the timeout, as they run at the same time
+    if deadline is not None:
+        timeout = max(0.0, deadline - time.monotonic())
+    wait([item_item, user_user], timeout=timeout)
+
+    @functools.cache
+    def fallback() -> list[Record]:
+        return vector_store.search_points(
+            popularity_index.get_popular_quote_ids(limit=limit, exclude=[*likes, *dislikes])
+        )
+
+    item_item_quotes, item_item_fallback = _get_branch_result('item-item', item_item, fallback)
+    user_user_quotes, user_user_fallback = _get_branch_result('user-user', user_user, fallback)
+    return Recommendations(
+        item_item=item_item_quotes,
+        user_user=user_user_quotes,
+        item_item_fallback=item_item_fallback,
+        user_user_fallback=user_user_fallback,
+    )
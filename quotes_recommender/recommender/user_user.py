@@ -0,0 +1,98 @@
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from quotes_recommender.recommender.constants import (
+    DEFAULT_NEIGHBOUR_USERS,
+    DEFAULT_RECOMMENDATIONS_LIMIT,
+)
+from quotes_recommender.user_store.constants import (
+    DEFAULT_LSH_MIN_LIKES,
+    DEFAULT_SIMILAR_PREFERENCE,
+)
+from quotes_recommender.user_store.minhash import MinHashIndex
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+
+
+def get_similar_users(
+    user_store: RedisUserStore,
+    username: str,
+    likes: Sequence[str],
+    k: int = DEFAULT_NEIGHBOUR_USERS,
+    threshold: int = DEFAULT_SIMILAR_PREFERENCE,
+    lsh_min_likes: int = DEFAULT_LSH_MIN_LIKES,
+) -> list[tuple[str, float]]:
+    """
+    Returns the users with the highest Jaccard similarity of their likes to the given user's likes.
+    The candidates of users with many likes are the users sharing an LSH bucket of the MinHash index, as the likers
+    of all their likes add up to most users. Common likes are counted exactly either way.
+    :param user_store: User store holding the preferences.
+    :param username: The username of the user.
+    :param likes: IDs of the quotes liked by the user.
+    :param k: Max number of similar users.
+    :param threshold: Minimum number of common likes to consider a user similar.
+    :param lsh_min_likes: Min number of likes of the user to look up the candidates in the MinHash index.
+    :return: Usernames and Jaccard similarities, most similar first.
+    """
+    candidates = MinHashIndex(user_store).get_candidates(username) if len(likes) >= lsh_min_likes else None
+    common_likes = {
+        other_user: intersection_size
+        for other_user, intersection_size in user_store.get_common_likes(
+            username, likes=likes, candidates=candidates
+        ).items()
+        if intersection_size >= threshold
+    }
+    if not common_likes:
+        return []
+    usernames = list(common_likes.keys())
+    intersection_sizes = np.fromiter(common_likes.values(), dtype=np.float64, count=len(usernames))
+    like_counts = np.asarray(user_store.get_like_counts(usernames), dtype=np.float64)
+    similarities = intersection_sizes / (len(likes) + like_counts - intersection_sizes)
+    order = np.argsort(-similarities, kind='stable')[:k]
+    return [(usernames[i], float(similarities[i])) for i in order]
+
+
+def get_user_user_recommendations(
+    user_store: RedisUserStore,
+    username: str,
+    likes: Sequence[str],
+    dislikes: Sequence[str],
+    k: int = DEFAULT_NEIGHBOUR_USERS,
+    limit: int = DEFAULT_RECOMMENDATIONS_LIMIT,
+) -> list[tuple[str, float]]:
+    """
+    Recommends the quotes the k most similar users agree on.
+    Every similar user votes for its likes and against its dislikes, weighted by its similarity. Votes are summed up
+    over the sparse user-quote incidence matrix of the similar users at once, i.e., its product with the similarity
+    vector. Quotes the user already rated and quotes without a positive score are never returned.
+    :param user_store: User store holding the preferences.
+    :param username: The username of the user.
+    :param likes: IDs of the quotes liked by the user.
+    :param dislikes: IDs of the quotes disliked by the user.
+    :param k: Number of similar users.
+    :param limit: Number of recommendations.
+    :return: Quote IDs and scores, best first.
+    """
+    if not (similar_users := get_similar_users(user_store, username, likes, k=k)):
+        return []
+    similarities = np.array([similarity for _, similarity in similar_users])
+    # build the incidence matrix in coordinate format: one entry per rating of a similar user
+    quote_ids: list[str] = []
+    weights: list[npt.NDArray[np.float64]] = []
+    for similarity, (user_likes, user_dislikes) in zip(
+        similarities, user_store.get_user_preferences_batch([user for user, _ in similar_users])
+    ):
+        quote_ids.extend(user_likes)
+        quote_ids.extend(user_dislikes)
+        weights.append(np.full(len(user_likes), similarity))
+        weights.append(np.full(len(user_dislikes), -similarity))
+    if not quote_ids:
+        return []
+    unique_quote_ids, inverse = np.unique(np.array(quote_ids), return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(weights), minlength=len(unique_quote_ids))
+    # drop quotes the user already rated and those the similar users disagree with
+    keep = ~np.isin(unique_quote_ids, np.array(list(likes) + list(dislikes), dtype=str)) & (scores > 0)
+    unique_quote_ids, scores = unique_quote_ids[keep], scores[keep]
+    order = np.argsort(-scores, kind='stable')[:limit]
+    return [(str(unique_quote_ids[i]), float(scores[i])) for i in order]
@@ -1,9 +1,17 @@
 import streamlit as st
 import streamlit_authenticator as stauth
 
-from quotes_recommender.core.models import UserPreference
+from quotes_recommender.core.constants import PREFERENCES_PAGE_SIZE
+from quotes_recommender.user_store.popularity_singleton import PopularityIndexSingleton
 from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSingleton
-from quotes_recommender.utils.streamlit import display_quotes, get_tag_filters
+from quotes_recommender.utils.streamlit import (
+    display_quotes,
+    flush_preference_buffer_when_due,
+    get_preference_buffer,
+    get_scroll_pagination,
+    get_tag_filters,
+    measure_render,
+)
 from quotes_recommender.vector_store.vector_store_singleton import (
     QdrantVectorStoreSingleton,
 )
@@ -13,6 +21,8 @@ st.set_page_config(layout='centered')
 try:
     vector_store = QdrantVectorStoreSingleton().vector_store
     user_store = RedisUserStoreSingleton().user_store
+    # keep the popularity leaderboards in sync with preference updates
+    PopularityIndexSingleton()
 except AttributeError:
     st.rerun()
 
@@ -49,41 +59,60 @@ if st.session_state['authentication_status']:
         keyword = st.text_input(
             label="Keyword", help="Type in a keyword you would like to filter for.", placeholder="Filter by keyword."
         )
-    with st.spinner('Loading quotes...'):
-        # get quotes from vector store
+    # continue browsing where the user left off unless filters changed
+    pagination = get_scroll_pagination(
+        state_key='preferences_pagination',
+        filters=(tuple(sorted(tags)), keyword),
         # TODO: get from pydantic model
-        quotes, _ = vector_store.scroll_points(
+        fetch_page=lambda offset: vector_store.scroll_points(
             payload_attributes=['author', 'avatar_img', 'tags', 'text'],
-            limit=25,
+            limit=PREFERENCES_PAGE_SIZE,
             tags=tags,
             keyword=keyword,
-        )
+            offset=offset,
+        ),
+    )
+    with st.spinner('Loading quotes...'):
+        # get quotes of the current page from vector store, the next page gets prefetched in the background
+        quotes = pagination.get_current_page()
     # display quotes with buttons
     st.divider()
     # if no results were found
     if not quotes:
         # display error message
         st.info("❌ No quotes found for your filters. Please set different filters or remove some.")
-    # get ratings (if any) for logged-in user
-    likes, dislikes = user_store.get_user_preferences(st.session_state['username'])
-    # construct UserPreference instances in order to display later
-    like_ratings: list[UserPreference] = list(map(lambda x: UserPreference(id=x, like=True), likes))
-    dislike_ratings: list[UserPreference] = list(map(lambda x: UserPreference(id=x, like=False), dislikes))
+    # get ratings (if any) for logged-in user, including toggles that were not written to redis yet
+    preference_buffer = get_preference_buffer(page='preferences')
     # display quotes and collect user preferences
-    set_likes, set_dislikes = display_quotes(  # type: ignore
-        quotes, display_buttons=True, ratings=like_ratings + dislike_ratings
-    )
-    # write preferences to redis
-    # if new likes were added
-    if new_likes := set(set_likes).difference(set(likes)):
-        # add them to redis
-        if not user_store.set_user_preferences(username=st.session_state['username'], likes=new_likes):
-            st.toast('Failed to save preferences. Please try again later.', icon='🕠')
-    # if new dislikes were added
-    elif new_dislikes := set(set_dislikes).difference(set(dislikes)):
-        # add them to redis
-        if not user_store.set_user_preferences(username=st.session_state['username'], dislikes=new_dislikes):
-            st.toast('Failed to save preferences. Please try again later.', icon='🕠')
+    with measure_render('preferences'):
+        set_likes, set_dislikes = display_quotes(  # type: ignore
+            quotes, display_buttons=True, ratings=preference_buffer.ratings
+        )
+    # buffer changed preferences, they are written to redis in one batch once due
+    preference_buffer.record([quote.id for quote in quotes], likes=set_likes, dislikes=set_dislikes)
+    if not preference_buffer.flush_if_due():
+        st.toast('Failed to save preferences. Please try again later.', icon='🕠')
+    flush_preference_buffer_when_due()
+
+    # display page navigation
+    st.divider()
+    previous_col, page_col, next_col = st.columns(spec=[0.3, 0.4, 0.3])
+    with previous_col:
+        st.button(
+            label="Previous",
+            use_container_width=True,
+            disabled=pagination.page == 0,
+            on_click=pagination.previous_page,
+        )
+    with page_col:
+        st.caption(f"Page {pagination.page + 1}")
+    with next_col:
+        st.button(
+            label="Next",
+            use_container_width=True,
+            disabled=not pagination.has_next_page,
+            on_click=pagination.next_page,
+        )
 
 else:
     st.info('🔔 Please login/register to specify preferences.')
@@ -1,9 +1,26 @@
+import time
+
 import streamlit as st
 import streamlit_authenticator as stauth
 
-from quotes_recommender.utils.streamlit import display_quotes
+from quotes_recommender.recommender.constants import DEFAULT_BRANCH_TIMEOUT
+from quotes_recommender.recommender.service import get_recommendations
+from quotes_recommender.utils.streamlit import (
+    display_quotes,
+    flush_preference_buffer,
+    get_recommendation_executor,
+    get_recommendation_prefetcher,
+    load_neighbour_graph,
+    measure_render,
+)
 
 try:
+    from quotes_recommender.user_store.popularity_singleton import (
+        PopularityIndexSingleton,
+    )
+    from quotes_recommender.user_store.user_profile_singleton import (
+        UserProfileStoreSingleton,
+    )
     from quotes_recommender.user_store.user_store_singleton import (
         RedisUserStoreSingleton,
     )
@@ -20,6 +37,8 @@ st.set_page_config(layout='wide')
 try:
     vector_store = QdrantVectorStoreSingleton().vector_store
     user_store = RedisUserStoreSingleton().user_store
+    profile_store = UserProfileStoreSingleton().profile_store
+    popularity_index = PopularityIndexSingleton().popularity_index
 except AttributeError:
     st.rerun()
 
@@ -47,47 +66,53 @@ if st.session_state['authentication_status']:
 
     item_item_col, user_user_col = st.columns(2)
 
+    # write preference toggles buffered on other pages to redis before reading them
+    flush_preference_buffer()
     # get ratings for logged-in user
     likes, dislikes = user_store.get_user_preferences(st.session_state['username'])
     if not (likes or dislikes):
         st.info("🔔 You have not specified any preferences. Please specify any on the 'Set Preferences' page.")
+        # serve the most popular quotes until the user rated some
+        st.write('### Popular quotes to get you started')
+        display_quotes(vector_store.search_points(popularity_index.get_popular_quote_ids()))
         st.stop()
-    else:
-        with item_item_col:
-            st.write('### Quotes you might also be interested in')
-            # get item-item recommendations
-            item_item_recommendations = vector_store.get_item_item_recommendations(positives=likes, negatives=dislikes)
-            display_quotes(item_item_recommendations)
-    with user_user_col:
-        # get user-user recommendations
-        with st.spinner('Hold tight! We are getting some recommendations for you... 🔍', _cache=True):
-            # get most similar user
-            most_similar_user = user_store.get_most_similar_user(user=st.session_state['username'])
+    with st.spinner('Hold tight! We are getting some recommendations for you... 🔍', _cache=True):
+        # pick up the recommendations prefetched at login if they are about to be ready, within the time budget of the
+        # branches
+        deadline = time.monotonic() + DEFAULT_BRANCH_TIMEOUT
+        get_recommendation_prefetcher().wait(st.session_state['username'], timeout=DEFAULT_BRANCH_TIMEOUT)
+        # fetch item-item and user-user recommendations concurrently, slow branches fall back to popular quotes
+        recommendations = get_recommendations(
+            user_store,
+            vector_store,
+            profile_store,
+            popularity_index,
+            get_recommendation_executor(),
+            st.session_state['username'],
+            likes,
+            dislikes,
+            neighbour_graph=load_neighbour_graph(),
+            deadline=deadline,
+        )
+
+    with item_item_col, measure_render('recommendations (item-item)'):
+        st.write('### Quotes you might also be interested in')
+        display_quotes(recommendations.item_item)
+    with user_user_col, measure_render('recommendations (user-user)'):
         # in case no similar user were found
-        if not most_similar_user:
-            st.info(
-                """
-            ⁉️ Oops, it seems you have a very special taste.
-            Please provide more or other preferences in order to see further recommendations.
-            """
-            )
-            st.stop()
-        # get likes of most similar user
-        most_similar_user_likes, _ = user_store.get_user_preferences(most_similar_user)
-        # get non-symmetric set intersection
-        user_user_quote_ids: list[int | str] = list(set(most_similar_user_likes).difference(likes))
-        # get points
-        user_user_recommendations = vector_store.search_points(user_user_quote_ids, limit=10)
-        if not user_user_recommendations:
+        if recommendations.user_user_fallback:
             st.info(
                 """
             ⁉️ Oops, it seems you have a very special taste.
             Please provide more or other preferences in order to see further recommendations.
             """
             )
+            # display the most popular quotes the user did not rate yet
+            st.write('### Popular among all users')
+        else:
+            st.write('### Similar users also liked')
         # display recommendations
-        st.write('### Similar users also liked')
-        display_quotes(user_user_recommendations)
+        display_quotes(recommendations.user_user)
 
 else:
     st.info('🔔 Please login/register to see your recommendations.')
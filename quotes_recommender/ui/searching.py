@@ -4,8 +4,10 @@ from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSin
 from quotes_recommender.utils.streamlit import (
     click_search_button,
     display_quotes,
+    flush_preference_buffer,
     get_tag_filters,
     load_sentence_bert,
+    measure_render,
 )
 from quotes_recommender.vector_store.vector_store_singleton import (
     QdrantVectorStoreSingleton,
@@ -19,6 +21,8 @@ try:
 except AttributeError:
     st.rerun()
 sentence_bert = load_sentence_bert()
+# write preference toggles buffered on other pages to redis
+flush_preference_buffer()
 
 
 # init state for search button
@@ -56,4 +60,5 @@ if submitted and st.session_state.search_button_clicked:
     if not quotes:
         st.info("No quotes found. Please search for some other quotes or change filters.")
         st.stop()
-    display_quotes(quotes, display_buttons=False)
+    with measure_render('search'):
+        display_quotes(quotes, display_buttons=False)
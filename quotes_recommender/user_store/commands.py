@@ -0,0 +1,447 @@
+"""
+Redis commands of the online user store operations, shared by the blocking and the asyncio user store.
+
+Every operation is split into a function building its commands, sent by the stores with a single pipelined round trip,
+and a function parsing their results. Key layout, script calls and decoding are thus defined once, and the stores only
+execute the commands with their client.
+"""
+
+import json
+import operator
+from collections import Counter
+from typing import Any, Final, Iterable, Mapping, Optional, Sequence, TypeAlias
+
+from pydantic import Field
+
+from quotes_recommender.core.constants import TXT_ENCODING
+from quotes_recommender.core.models import ForbidExtraModel
+from quotes_recommender.user_store.constants import (
+    PREFERENCE_EVENTS_MAXLEN,
+    QUOTE_IDS_KEY,
+    USERS_INDEX_KEY,
+)
+from quotes_recommender.user_store.lua_scripts import (
+    DELETE_PREFERENCES_SCRIPT,
+    MIGRATE_BITMAP_SCRIPT,
+    SET_PREFERENCES_SCRIPT,
+    STORE_LIKES_SCRIPT,
+    delete_preferences_keys,
+    migrate_bitmap_keys,
+    set_preferences_keys,
+    store_likes_keys,
+)
+from quotes_recommender.user_store.models import (
+    CommonLikesKey,
+    CredentialsKey,
+    LikersKey,
+    PrecomputedRecommendations,
+    PreferenceChange,
+    PreferenceKey,
+    RecommendationKey,
+)
+
+# arguments of a Redis command as passed to execute_command
+Command: TypeAlias = tuple[Any, ...]
+# scripts registered by the user stores
+USER_STORE_SCRIPTS: Final[tuple[str, ...]] = (
+    SET_PREFERENCES_SCRIPT,
+    DELETE_PREFERENCES_SCRIPT,
+    STORE_LIKES_SCRIPT,
+    MIGRATE_BITMAP_SCRIPT,
+)
+
+
+class ScriptCall(ForbidExtraModel):
+    """Class defining a call of one of the user store scripts, sent by the script registered with the client."""
+
+    script: str = Field(description="Source of the script.")
+    keys: list[str] = Field(description="Keys of the script.")
+    args: list[str | int] = Field(description="Arguments of the script.")
+
+
+class PreferenceUpdate(ForbidExtraModel):
+    """Class defining an update of one preference bitmap of a user, applied by a single script call."""
+
+    quote_ids: list[str] = Field(description="IDs of the rated or unrated quotes.")
+    like: bool = Field(description="Whether the like bitmap is updated, else the dislike bitmap.")
+    unset: bool = Field(description="Whether the bits of the quotes are cleared, else they are set.")
+
+    def call(self, username: str) -> ScriptCall:
+        """
+        Returns the script call applying the update.
+        :param username: The username of the user.
+        :return: Script call.
+        """
+        script, keys = (
+            (DELETE_PREFERENCES_SCRIPT, delete_preferences_keys(username, self.quote_ids, self.like))
+            if self.unset
+            else (SET_PREFERENCES_SCRIPT, set_preferences_keys(username, self.quote_ids, self.like))
+        )
+        return ScriptCall(
+            script=script, keys=keys, args=[username, int(self.like), PREFERENCE_EVENTS_MAXLEN, *self.quote_ids]
+        )
+
+    def add_result(self, change: PreferenceChange, result: Any) -> None:
+        """
+        Adds the effective changes returned by the script call to a preference change.
+        :param change: Preference change of the user.
+        :param result: Result of the script call.
+        :return: None
+        """
+        if self.unset:
+            (change.removed_likes if self.like else change.removed_dislikes).extend(decode(result))
+            return
+        moved, added = decode(result[0]), decode(result[1])
+        (change.removed_dislikes if self.like else change.removed_likes).extend(moved)
+        (change.added_likes if self.like else change.added_dislikes).extend(moved + added)
+
+
+def decode(values: Iterable[bytes]) -> list[str]:
+    """
+    Decodes the members returned by Redis.
+    :param values: Encoded members.
+    :return: Decoded members.
+    """
+    return [value.decode(TXT_ENCODING) for value in values]
+
+
+def preferences_commands(usernames: Sequence[str]) -> list[Command]:
+    """
+    Builds the commands reading the preference bitmaps of several users.
+    :param usernames: The usernames of the users.
+    :return: Commands, returning the like and dislike bitmap of each user in turn.
+    """
+    return [
+        ('GET', key)
+        for username in usernames
+        for key in (PreferenceKey(username=username).like_key, PreferenceKey(username=username).dislike_key)
+    ]
+
+
+def recent_preferences_commands(usernames: Sequence[str], limit: Optional[int] = None) -> list[Command]:
+    """
+    Builds the commands reading the most recently set preferences of several users.
+    :param usernames: The usernames of the users.
+    :param limit: Max number of likes and dislikes per user, None for all.
+    :return: Commands.
+    """
+    end = -1 if limit is None else limit - 1
+    return [
+        ('ZREVRANGE', key, 0, end)
+        for username in usernames
+        for key in (PreferenceKey(username=username).like_times_key, PreferenceKey(username=username).dislike_times_key)
+    ]
+
+
+def pair_preferences(preferences: Sequence[list[str]]) -> list[tuple[list[str], list[str]]]:
+    """
+    Pairs the likes and dislikes of several users.
+    :param preferences: Decoded likes and dislikes of each user in turn.
+    :return: Lists of liked and disliked quotes' IDs per user.
+    """
+    return list(zip(preferences[::2], preferences[1::2]))
+
+
+def parse_preferences(results: Sequence[Any]) -> list[tuple[list[str], list[str]]]:
+    """
+    Parses the results of the recent preference commands.
+    :param results: Likes and dislikes of each user in turn.
+    :return: Lists of liked and disliked quotes' IDs per user.
+    """
+    return pair_preferences([decode(preferences) for preferences in results])
+
+
+def quote_ids_commands(start: int) -> list[Command]:
+    """
+    Builds the command reading the quote IDs of the dense integers from the given one on.
+    :param start: First integer to read the quote ID of.
+    :return: Commands.
+    """
+    return [('LRANGE', QUOTE_IDS_KEY, start, -1)]
+
+
+def like_counts_commands(usernames: Sequence[str]) -> list[Command]:
+    """
+    Builds the commands counting the likes of several users.
+    :param usernames: The usernames of the users.
+    :return: Commands.
+    """
+    return [('BITCOUNT', PreferenceKey(username=username).like_key) for username in usernames]
+
+
+def likers_commands(likes: Sequence[int | str]) -> list[Command]:
+    """
+    Builds the command reading the union of the likers index of the quotes a user liked.
+    :param likes: IDs of the quotes liked by the user.
+    :return: Commands.
+    """
+    if not likes:
+        return []
+    return [('SUNION', *[LikersKey(quote_id=str(quote_id)).key for quote_id in likes])]
+
+
+def parse_likers(user: str, results: Sequence[Any]) -> list[str]:
+    """
+    Parses the likers of the quotes a user liked.
+    :param user: The username of the user.
+    :param results: Result of the likers command, empty if the user has no likes.
+    :return: The usernames of the other users liking any of the quotes.
+    """
+    # a user is not similar to itself
+    return [liker for liker in decode(results[0]) if liker != user] if results else []
+
+
+def common_likes_commands(user: str, candidates: Sequence[str]) -> list[Command]:
+    """
+    Builds the commands counting the likes candidate users have in common with the given user server-side.
+    The like bitmap of the user is intersected with the bitmap of each candidate into a scratch key, whose set bits are
+    counted. The commands are to be sent in a transaction, as the scratch key is shared by all lookups of the user.
+    :param user: The username of the user.
+    :param candidates: The usernames of the candidates.
+    :return: Commands, every second one returning the number of common likes of a candidate.
+    """
+    if not candidates:
+        return []
+    like_key, common_likes_key = PreferenceKey(username=user).like_key, CommonLikesKey(username=user).key
+    return [
+        *(
+            command
+            for candidate in candidates
+            for command in (
+                ('BITOP', 'AND', common_likes_key, like_key, PreferenceKey(username=candidate).like_key),
+                ('BITCOUNT', common_likes_key),
+            )
+        ),
+        ('DEL', common_likes_key),
+    ]
+
+
+def parse_common_likes(user: str, candidates: Sequence[str], results: Sequence[int]) -> Counter[str]:
+    """
+    Parses the results of the common likes commands.
+    :param user: The username of the user.
+    :param candidates: The usernames of the candidates.
+    :param results: Results of the common likes commands.
+    :return: Usernames of the candidates with common likes mapped to the number of common likes.
+    """
+    return Counter(
+        {
+            candidate: intersection_size
+            for candidate, intersection_size in zip(candidates, results[1::2])
+            # a user is not similar to itself
+            if intersection_size and candidate != user
+        }
+    )
+
+
+def select_most_similar_user(common_likes: Counter[str], threshold: int) -> Optional[str]:
+    """
+    Selects the user with the most common likes.
+    :param common_likes: Usernames mapped to the number of common likes.
+    :param threshold: Minimum number of common preferences to consider a user similar.
+    :return: username for user with most similar preferences.
+    """
+    similar_users = {
+        other_user: intersection_size
+        for other_user, intersection_size in common_likes.items()
+        if intersection_size >= threshold
+    }
+    # if no similar users were found
+    if not similar_users:
+        return None
+    # get user with the greatest intersection
+    return max(similar_users.items(), key=operator.itemgetter(1))[0]
+
+
+def users_index_commands() -> list[Command]:
+    """
+    Builds the command reading the users index.
+    :return: Commands.
+    """
+    return [('HGETALL', USERS_INDEX_KEY)]
+
+
+def parse_users_index(users_index: Mapping[bytes, bytes]) -> dict[str, dict[str, str]]:
+    """
+    Parses the users index.
+    :param users_index: Usernames mapped to their credentials as JSON.
+    :return: usernames mapped to their corresponding credentials.
+    """
+    return {username.decode(TXT_ENCODING): json.loads(credentials) for username, credentials in users_index.items()}
+
+
+def credentials_commands(credential_hashes: Sequence[bytes]) -> list[Command]:
+    """
+    Builds the commands reading the credentials hashes, e.g. to build the users index.
+    :param credential_hashes: Keys of the credentials hashes.
+    :return: Commands.
+    """
+    return [('HGETALL', credential_hash) for credential_hash in credential_hashes]
+
+
+def parse_credentials(credential_hashes: Sequence[bytes], results: Sequence[Any]) -> dict[str, dict[str, str]]:
+    """
+    Parses the credentials hashes.
+    :param credential_hashes: Keys of the credentials hashes.
+    :param results: Fields of each hash.
+    :return: usernames mapped to their corresponding credentials.
+    """
+    return {
+        # extract username from hash key
+        credential_hash.decode(TXT_ENCODING).split(':')[1]: {
+            key.decode(TXT_ENCODING): value.decode(TXT_ENCODING) for key, value in credentials.items()
+        }
+        for credential_hash, credentials in zip(credential_hashes, results)
+    }
+
+
+def index_users_commands(user_credentials: Mapping[str, Mapping[str, str]]) -> list[Command]:
+    """
+    Builds the commands adding users to the users index.
+    :param user_credentials: usernames mapped to their corresponding credentials.
+    :return: Commands.
+    """
+    if not user_credentials:
+        return []
+    return [
+        (
+            'HSET',
+            USERS_INDEX_KEY,
+            *(
+                field
+                for username, credentials in user_credentials.items()
+                for field in (username, json.dumps(credentials))
+            ),
+        )
+    ]
+
+
+def register_user_commands(
+    username: str, credentials: Mapping[str | bytes, bytes | float | int | str]
+) -> list[Command]:
+    """
+    Builds the commands creating the credentials hash of a new user and adding the user to the users index.
+    :param username: The username of the new user.
+    :param credentials: The credentials of the new user.
+    :return: Commands, the first one returns the number of added fields.
+    """
+    decoded_credentials = {
+        (key.decode(TXT_ENCODING) if isinstance(key, bytes) else key): (
+            value.decode(TXT_ENCODING) if isinstance(value, bytes) else str(value)
+        )
+        for key, value in credentials.items()
+    }
+    return [
+        ('HSET', CredentialsKey(username=username).key, *(field for item in credentials.items() for field in item)),
+        *index_users_commands({username: decoded_credentials}),
+    ]
+
+
+def store_recommendations_commands(
+    recommendations: Mapping[str, PrecomputedRecommendations], ttl: int
+) -> list[Command]:
+    """
+    Builds the commands storing precomputed recommendations of several users.
+    :param recommendations: Usernames mapped to their recommendations.
+    :param ttl: Seconds after which the recommendations expire.
+    :return: Commands.
+    """
+    return [
+        ('SET', RecommendationKey(username=username).key, user_recommendations.model_dump_json(), 'EX', ttl)
+        for username, user_recommendations in recommendations.items()
+    ]
+
+
+def recommendations_commands(username: str) -> list[Command]:
+    """
+    Builds the command reading the precomputed recommendations of a user.
+    :param username: The username of the user.
+    :return: Commands.
+    """
+    return [('GET', RecommendationKey(username=username).key)]
+
+
+def parse_recommendations(recommendations: Optional[bytes]) -> Optional[PrecomputedRecommendations]:
+    """
+    Parses the precomputed recommendations of a user.
+    :param recommendations: Recommendations as JSON, None if there are none or they expired.
+    :return: Precomputed recommendations or None.
+    """
+    return None if recommendations is None else PrecomputedRecommendations.model_validate_json(recommendations)
+
+
+def store_likes_call(usernames: Sequence[str], quote_id: str) -> ScriptCall:
+    """
+    Builds the script call storing the likes of several users for a quote together with the likers index.
+    :param usernames: The usernames of the users.
+    :param quote_id: ID of the liked quote.
+    :return: Script call.
+    """
+    return ScriptCall(
+        script=STORE_LIKES_SCRIPT,
+        keys=store_likes_keys(usernames, quote_id),
+        args=[quote_id, PREFERENCE_EVENTS_MAXLEN, *usernames],
+    )
+
+
+def migrate_bitmap_call(set_key: str | bytes) -> ScriptCall:
+    """
+    Builds the script call converting a preference set into a preference bitmap.
+    :param set_key: Key of the preference set.
+    :return: Script call.
+    """
+    set_key = set_key.decode(TXT_ENCODING) if isinstance(set_key, bytes) else set_key
+    return ScriptCall(script=MIGRATE_BITMAP_SCRIPT, keys=migrate_bitmap_keys(set_key), args=[])
+
+
+def memory_usage_commands(keys: Sequence[str | bytes]) -> list[Command]:
+    """
+    Builds the commands reading the memory used by several keys.
+    :param keys: Keys to measure.
+    :return: Commands, returning the bytes of each key, None for missing keys.
+    """
+    # sample all elements of aggregate values
+    return [('MEMORY USAGE', key, 'SAMPLES', 0) for key in keys]
+
+
+def preference_updates(
+    likes: Iterable[int | str] = (),
+    dislikes: Iterable[int | str] = (),
+    unset_likes: Iterable[int | str] = (),
+    unset_dislikes: Iterable[int | str] = (),
+) -> list[PreferenceUpdate]:
+    """
+    Builds the updates of the preference bitmaps of a user, unsetting before setting.
+    Setting keeps likes and dislikes mutually exclusive by clearing the bits of the quotes in the opposite bitmap.
+    :param likes: IDs of quotes to like.
+    :param dislikes: IDs of quotes to dislike.
+    :param unset_likes: IDs of liked quotes to unset.
+    :param unset_dislikes: IDs of disliked quotes to unset.
+    :return: Non-empty updates.
+    """
+    return [
+        PreferenceUpdate(quote_ids=quote_ids, like=like, unset=unset)
+        for quote_ids, like, unset in (
+            ([str(quote_id) for quote_id in unset_likes], True, True),
+            ([str(quote_id) for quote_id in unset_dislikes], False, True),
+            ([str(quote_id) for quote_id in likes], True, False),
+            ([str(quote_id) for quote_id in dislikes], False, False),
+        )
+        if quote_ids
+    ]
+
+
+def parse_preference_change(
+    username: str, updates: Sequence[PreferenceUpdate], results: Sequence[Any]
+) -> PreferenceChange:
+    """
+    Combines the effective changes of the preference updates of a user.
+    :param username: The username of the user.
+    :param updates: Applied updates.
+    :param results: Results of their script calls.
+    :return: Preference change.
+    """
+    change = PreferenceChange(username=username)
+    for update, result in zip(updates, results):
+        update.add_result(change, result)
+    return change
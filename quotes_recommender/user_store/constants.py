@@ -3,3 +3,44 @@ from typing import Final
 # default settings
 DEFAULT_BATCH_SIZE: Final[int] = 500
 DEFAULT_SIMILAR_PREFERENCE: Final[int] = 3
+# seconds after which precomputed recommendations expire
+DEFAULT_RECOMMENDATIONS_TTL: Final[int] = 24 * 60 * 60
+# weight of the disliked quotes' mean embedding in a user's profile vector
+DEFAULT_DISLIKE_WEIGHT: Final[float] = 0.5
+# MinHash signature length and number of LSH bands (each band hashes num_permutations / bands signature rows)
+DEFAULT_MINHASH_PERMUTATIONS: Final[int] = 128
+DEFAULT_LSH_BANDS: Final[int] = 32
+MINHASH_SEED: Final[int] = 42
+DEFAULT_SIMILAR_USERS: Final[int] = 10
+# min number of likes of a user to look up the candidates of similar users in the LSH buckets instead of the likers
+# index, as the likers of many likes add up to most users
+DEFAULT_LSH_MIN_LIKES: Final[int] = 100
+# Redis hash mapping the quote IDs to the dense integers addressing the bits of the preference bitmaps, and Redis list
+# of the quote IDs by their integer
+QUOTE_INDEX_KEY: Final[str] = 'quote:index'
+QUOTE_IDS_KEY: Final[str] = 'quote:ids'
+# Redis hash mapping each registered username to its credentials as JSON, loaded with a single command
+USERS_INDEX_KEY: Final[str] = 'users:credentials'
+# seconds after which cached credentials expire if keyspace notifications are unavailable
+DEFAULT_CREDENTIALS_CACHE_TTL: Final[float] = 60.0
+# Redis key of the checkpointed SCAN cursor of the clean-up of sparse users
+CLEAN_UP_CURSOR_KEY: Final[str] = 'clean_up:cursor'
+# max number of users whose preferences are cached per process
+DEFAULT_PREFERENCE_CACHE_SIZE: Final[int] = 10_000
+# seconds after which cached preferences expire if client tracking is unavailable
+DEFAULT_PREFERENCE_CACHE_TTL: Final[float] = 10.0
+# key prefix of the user keys tracked for invalidations of the preference bitmaps, and the channel the invalidations are
+# published to
+PREFERENCE_TRACKING_PREFIX: Final[str] = 'user:'
+INVALIDATION_CHANNEL: Final[str] = '__redis__:invalidate'
+# Redis stream of the effective preference changes, trimmed to approximately the given number of events
+PREFERENCE_EVENTS_KEY: Final[str] = 'preference:events'
+PREFERENCE_EVENTS_MAXLEN: Final[int] = 1_000_000
+# number of events read and milliseconds waited for new events per read of a stream consumer
+DEFAULT_EVENTS_BATCH_SIZE: Final[int] = 100
+DEFAULT_EVENTS_BLOCK_MS: Final[int] = 5_000
+# milliseconds after which pending events of a dead consumer are claimed by another consumer of the group
+DEFAULT_EVENTS_CLAIM_IDLE_MS: Final[int] = 60_000
+# popularity gained by a quote per like in the app, on top of the likes it received on the scraped website
+APP_LIKE_POPULARITY: Final[float] = 1.0
+DEFAULT_POPULAR_QUOTES: Final[int] = 10
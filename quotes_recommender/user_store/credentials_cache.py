@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import redis
+from redis.client import PubSubWorkerThread
+
+from quotes_recommender.user_store.constants import (
+    DEFAULT_CREDENTIALS_CACHE_TTL,
+    USERS_INDEX_KEY,
+)
+from quotes_recommender.user_store.models import CredentialsKey
+
+logger = logging.getLogger(__name__)
+
+
+class CredentialsCache:
+    """
+    Process-wide cache of the registered users' credentials, shared by all Streamlit sessions.
+    The cache is invalidated by registrations of this process and by Redis keyspace notifications about credential
+    changes of other processes, which the Redis server config has to enable (notify-keyspace-events Kh, set for the
+    redis service of docker-compose.yaml). If notifications are disabled, cached credentials expire after a TTL instead.
+    """
+
+    def __init__(self, client: redis.Redis, db: int, ttl: float = DEFAULT_CREDENTIALS_CACHE_TTL) -> None:
+        """
+        Init credentials cache.
+        :param client: Redis client.
+        :param db: Index of the Redis database, needed for the notification channels.
+        :param ttl: Seconds after which cached credentials expire if keyspace notifications are unavailable.
+        """
+        self._client = client
+        self._db = db
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._credentials: Optional[dict[str, dict[str, str]]] = None
+        self._loaded_at: float = 0.0
+        self._listener: Optional[PubSubWorkerThread] = None
+        self._subscribed = False
+        self.invalidations = 0
+
+    def _subscribe(self) -> None:
+        """
+        Subscribes to keyspace notifications of the credentials hashes and the users index in a background thread,
+        unless the Redis config does not enable them.
+        :return: None
+        """
+        self._subscribed = True
+        try:
+            flags = str(self._client.config_get('notify-keyspace-events').get('notify-keyspace-events', ''))
+            # keyspace events of hash commands are needed, 'A' includes all event classes
+            if 'K' not in flags or not ('h' in flags or 'A' in flags):
+                logger.warning(
+                    f'Keyspace notifications of hashes are disabled (notify-keyspace-events "{flags}"), '
+                    f'credentials are cached for {self._ttl}s.'
+                )
+                return
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(
+                **{
+                    f'__keyspace@{self._db}__:{CredentialsKey(username="*").key}': self._on_notification,
+                    f'__keyspace@{self._db}__:{USERS_INDEX_KEY}': self._on_notification,
+                }
+            )
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except redis.RedisError:
+            logger.warning(f'Cannot subscribe to keyspace notifications, credentials are cached for {self._ttl}s.')
+
+    def _on_notification(self, message: dict) -> None:  # pylint: disable=unused-argument
+        """
+        Invalidates the cache when credentials changed.
+        :param message: Keyspace notification.
+        :return: None
+        """
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Drops the cached credentials, so that they are loaded again on the next access.
+        :return: None
+        """
+        with self._lock:
+            self._credentials = None
+            self.invalidations += 1
+
+    def get(self, load: Callable[[], dict[str, dict[str, str]]]) -> dict[str, dict[str, str]]:
+        """
+        Returns the cached credentials, loading them if they are missing or expired.
+        :param load: Callable loading the credentials from Redis.
+        :return: Copy of the usernames mapped to their credentials, safe to be modified by the caller.
+        """
+        with self._lock:
+            if not self._subscribed:
+                self._subscribe()
+            # fall back to the TTL if notifications are unavailable or the listener died
+            listening = self._listener is not None and self._listener.is_alive()
+            expired = not listening and time.monotonic() - self._loaded_at > self._ttl
+            if self._credentials is None or expired:
+                self._credentials = load()
+                self._loaded_at = time.monotonic()
+            credentials = self._credentials
+        return {username: dict(user_credentials) for username, user_credentials in credentials.items()}
+
+    def close(self) -> None:
+        """
+        Stops listening to keyspace notifications.
+        :return: None
+        """
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
@@ -0,0 +1,212 @@
+"""
+Lua scripts applying preference mutations together with all structures derived from them in one atomic round trip.
+
+Each script maintains the preference bitmaps, the times the preferences were set at and the likers index, and appends
+the effective change to the preference event stream. Bits are addressed by the dense integers of the quotes, which the
+scripts assign to newly rated quotes.
+Derived keys are passed in KEYS, so that the scripts only touch declared keys. Events have the fields of
+PreferenceChange, with quote IDs joined by commas, and are only appended if something changed.
+"""
+
+from typing import Final, Sequence
+
+from quotes_recommender.user_store.constants import (
+    PREFERENCE_EVENTS_KEY,
+    QUOTE_IDS_KEY,
+    QUOTE_INDEX_KEY,
+)
+from quotes_recommender.user_store.models import LikersKey, PreferenceKey
+
+# Lua function returning the dense integer of a quote, assigning the next integer to a new quote
+# KEYS: quote index hash, quote IDs list
+_QUOTE_INDEX_FUNCTION: Final[str] = """
+local function quote_index(quote_id)
+    local index = redis.call('HGET', KEYS[1], quote_id)
+    if not index then
+        index = redis.call('RPUSH', KEYS[2], quote_id) - 1
+        redis.call('HSET', KEYS[1], quote_id, index)
+    end
+    return tonumber(index)
+end
+"""
+
+# KEYS: quote index hash, quote IDs list, destination bitmap, source bitmap, event stream, destination times sorted set,
+#       source times sorted set, likers set of each quote
+# ARGV: username, 1 if the destination is the like bitmap else 0, approximate max length of the event stream, quote IDs
+# returns: quote IDs moved from the source bitmap, quote IDs newly added to the destination bitmap
+SET_PREFERENCES_SCRIPT: Final[str] = _QUOTE_INDEX_FUNCTION + """
+local moved, added = {}, {}
+local like = ARGV[2] == '1'
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+for i = 4, #ARGV do
+    local quote_id = ARGV[i]
+    local index = quote_index(quote_id)
+    if redis.call('SETBIT', KEYS[3], index, 1) == 0 then
+        -- GETBIT does not create a missing source bitmap
+        local from_source = redis.call('GETBIT', KEYS[4], index) == 1
+        redis.call('ZADD', KEYS[6], now, quote_id)
+        if from_source then
+            redis.call('SETBIT', KEYS[4], index, 0)
+            redis.call('ZREM', KEYS[7], quote_id)
+            table.insert(moved, quote_id)
+        else
+            table.insert(added, quote_id)
+        end
+        if like then
+            redis.call('SADD', KEYS[i + 4], ARGV[1])
+        elseif from_source then
+            redis.call('SREM', KEYS[i + 4], ARGV[1])
+        end
+    end
+end
+-- drop emptied bitmaps like Redis drops empty sets
+if #moved > 0 and redis.call('BITCOUNT', KEYS[4]) == 0 then
+    redis.call('DEL', KEYS[4])
+end
+if #moved + #added > 0 then
+    local dst_field, src_field = 'added_dislikes', 'removed_likes'
+    if like then
+        dst_field, src_field = 'added_likes', 'removed_dislikes'
+    end
+    local rated = table.concat(moved, ',')
+    if #added > 0 then
+        rated = (#moved > 0 and rated .. ',' or '') .. table.concat(added, ',')
+    end
+    redis.call('XADD', KEYS[5], 'MAXLEN', '~', ARGV[3], '*', 'username', ARGV[1], dst_field, rated,
+               src_field, table.concat(moved, ','))
+end
+return {moved, added}
+"""
+
+# KEYS: quote index hash, preference bitmap, event stream, times sorted set, likers set of each quote
+# ARGV: username, 1 if the preference bitmap is the like bitmap else 0, approximate max length of the event stream,
+#       quote IDs
+# returns: quote IDs removed from the preference bitmap
+DELETE_PREFERENCES_SCRIPT: Final[str] = """
+local removed = {}
+for i = 4, #ARGV do
+    local quote_id = ARGV[i]
+    -- quotes without an integer were never rated
+    local index = redis.call('HGET', KEYS[1], quote_id)
+    if index and redis.call('GETBIT', KEYS[2], index) == 1 then
+        redis.call('SETBIT', KEYS[2], index, 0)
+        table.insert(removed, quote_id)
+        redis.call('ZREM', KEYS[4], quote_id)
+        if ARGV[2] == '1' then
+            redis.call('SREM', KEYS[i + 1], ARGV[1])
+        end
+    end
+end
+if #removed > 0 then
+    -- drop emptied bitmaps like Redis drops empty sets
+    if redis.call('BITCOUNT', KEYS[2]) == 0 then
+        redis.call('DEL', KEYS[2])
+    end
+    local field = ARGV[2] == '1' and 'removed_likes' or 'removed_dislikes'
+    redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[3], '*', 'username', ARGV[1], field, table.concat(removed, ','))
+end
+return removed
+"""
+
+# KEYS: quote index hash, quote IDs list, likers set of the quote, event stream, like bitmap of each user
+# ARGV: quote ID, approximate max length of the event stream, usernames
+# returns: number of users newly liking the quote
+STORE_LIKES_SCRIPT: Final[str] = _QUOTE_INDEX_FUNCTION + """
+local quote_id = ARGV[1]
+local index = quote_index(quote_id)
+local added = 0
+for i = 3, #ARGV do
+    if redis.call('SETBIT', KEYS[i + 2], index, 1) == 0 then
+        added = added + 1
+        redis.call('XADD', KEYS[4], 'MAXLEN', '~', ARGV[2], '*', 'username', ARGV[i], 'added_likes', quote_id)
+    end
+    redis.call('SADD', KEYS[3], ARGV[i])
+end
+return added
+"""
+
+# KEYS: quote index hash, quote IDs list, preference set, temporary bitmap
+# returns: number of quotes of the converted preference set, 0 if the key does not hold a set (anymore)
+MIGRATE_BITMAP_SCRIPT: Final[str] = _QUOTE_INDEX_FUNCTION + """
+if redis.call('TYPE', KEYS[3]).ok ~= 'set' then
+    return 0
+end
+local quote_ids = redis.call('SMEMBERS', KEYS[3])
+redis.call('DEL', KEYS[4])
+for _, quote_id in ipairs(quote_ids) do
+    redis.call('SETBIT', KEYS[4], quote_index(quote_id), 1)
+end
+-- replace the set, which is never empty, by its bitmap
+redis.call('RENAME', KEYS[4], KEYS[3])
+return #quote_ids
+"""
+
+
+def set_preferences_keys(username: str, quote_ids: Sequence[str], like: bool) -> list[str]:
+    """
+    Returns the keys of SET_PREFERENCES_SCRIPT.
+    :param username: The username of the user.
+    :param quote_ids: IDs of the rated quotes.
+    :param like: Whether the quotes are liked (moved from the dislikes) or disliked (moved from the likes).
+    :return: Keys of the script.
+    """
+    hash_keys = PreferenceKey(username=username)
+    like_keys = (hash_keys.like_key, hash_keys.like_times_key)
+    dislike_keys = (hash_keys.dislike_key, hash_keys.dislike_times_key)
+    (dst_key, dst_times_key), (src_key, src_times_key) = (
+        (like_keys, dislike_keys) if like else (dislike_keys, like_keys)
+    )
+    return [
+        QUOTE_INDEX_KEY,
+        QUOTE_IDS_KEY,
+        dst_key,
+        src_key,
+        PREFERENCE_EVENTS_KEY,
+        dst_times_key,
+        src_times_key,
+        *[LikersKey(quote_id=quote_id).key for quote_id in quote_ids],
+    ]
+
+
+def delete_preferences_keys(username: str, quote_ids: Sequence[str], like: bool) -> list[str]:
+    """
+    Returns the keys of DELETE_PREFERENCES_SCRIPT.
+    :param username: The username of the user.
+    :param quote_ids: IDs of the quotes to unset.
+    :param like: Whether likes or dislikes are unset.
+    :return: Keys of the script.
+    """
+    hash_keys = PreferenceKey(username=username)
+    return [
+        QUOTE_INDEX_KEY,
+        hash_keys.like_key if like else hash_keys.dislike_key,
+        PREFERENCE_EVENTS_KEY,
+        hash_keys.like_times_key if like else hash_keys.dislike_times_key,
+        *[LikersKey(quote_id=quote_id).key for quote_id in quote_ids],
+    ]
+
+
+def store_likes_keys(usernames: Sequence[str], quote_id: str) -> list[str]:
+    """
+    Returns the keys of STORE_LIKES_SCRIPT.
+    :param usernames: The usernames of the users liking the quote.
+    :param quote_id: ID of the liked quote.
+    :return: Keys of the script.
+    """
+    return [
+        QUOTE_INDEX_KEY,
+        QUOTE_IDS_KEY,
+        LikersKey(quote_id=quote_id).key,
+        PREFERENCE_EVENTS_KEY,
+        *[PreferenceKey(username=username).like_key for username in usernames],
+    ]
+
+
+def migrate_bitmap_keys(set_key: str) -> list[str]:
+    """
+    Returns the keys of MIGRATE_BITMAP_SCRIPT.
+    :param set_key: Key of the preference set.
+    :return: Keys of the script.
+    """
+    return [QUOTE_INDEX_KEY, QUOTE_IDS_KEY, set_key, f'{set_key}:migration']
@@ -0,0 +1,84 @@
+"""
+Maintenance jobs for structures derived from the user preferences.
+
+Usage: python -m quotes_recommender.user_store.maintenance rebuild-likers-index
+       python -m quotes_recommender.user_store.maintenance migrate-bitmaps
+       python -m quotes_recommender.user_store.maintenance consume-events --group minhash --consumer worker-1
+"""
+
+import argparse
+import logging
+import socket
+
+from quotes_recommender.user_store.constants import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_SIMILAR_PREFERENCE,
+)
+from quotes_recommender.user_store.minhash import MinHashIndex
+from quotes_recommender.user_store.popularity_singleton import PopularityIndexSingleton
+from quotes_recommender.user_store.preference_events import PreferenceEventConsumer
+from quotes_recommender.user_store.user_profile_singleton import (
+    UserProfileStoreSingleton,
+)
+from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSingleton
+
+
+def main() -> None:
+    """Runs a maintenance job on the configured user store."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest='job', required=True)
+    likers_parser = subparsers.add_parser('rebuild-likers-index', help='Rebuild the quote likers index.')
+    likers_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    minhash_parser = subparsers.add_parser('rebuild-minhash-index', help='Rebuild the MinHash LSH index of the likes.')
+    minhash_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    clean_up_parser = subparsers.add_parser('clean-up', help='Remove the like bitmaps of sparse scraped users.')
+    clean_up_parser.add_argument('--threshold', type=int, default=DEFAULT_SIMILAR_PREFERENCE)
+    clean_up_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    clean_up_parser.add_argument('--max-keys-per-second', type=float, default=None)
+    clean_up_parser.add_argument('--restart', action='store_true', help='Ignore the checkpointed cursor.')
+    migrate_parser = subparsers.add_parser(
+        'migrate-bitmaps', help='Convert the preference sets into bitmaps and report the memory used before and after.'
+    )
+    migrate_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    popularity_parser = subparsers.add_parser(
+        'seed-popularity', help='Rank all quotes of the vector store by their scraped likes.'
+    )
+    popularity_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    events_parser = subparsers.add_parser(
+        'consume-events', help='Keep a derived structure up to date from the preference event stream.'
+    )
+    events_parser.add_argument('--group', choices=['minhash', 'user-profiles'], required=True)
+    events_parser.add_argument('--consumer', default=socket.gethostname())
+    events_parser.add_argument(
+        '--start-id', default='$', help="Where a new group starts, '$' right after a rebuild or '0' for all events."
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    user_store = RedisUserStoreSingleton().user_store
+    if args.job == 'rebuild-likers-index':
+        user_store.rebuild_likers_index(batch_size=args.batch_size)
+    elif args.job == 'rebuild-minhash-index':
+        MinHashIndex(user_store).rebuild(batch_size=args.batch_size)
+    elif args.job == 'clean-up':
+        user_store.clean_up_user_store(
+            threshold=args.threshold,
+            batch_size=args.batch_size,
+            max_keys_per_second=args.max_keys_per_second,
+            resume=not args.restart,
+        )
+    elif args.job == 'migrate-bitmaps':
+        user_store.migrate_to_bitmaps(batch_size=args.batch_size)
+    elif args.job == 'seed-popularity':
+        PopularityIndexSingleton().popularity_index.seed_from_vector_store(batch_size=args.batch_size)
+    elif args.job == 'consume-events':
+        if args.group == 'minhash':
+            handler = MinHashIndex(user_store).apply_change
+        else:
+            handler = UserProfileStoreSingleton().profile_store.apply_change
+        PreferenceEventConsumer(user_store.client, group=args.group, consumer=args.consumer, handler=handler).run(
+            start_id=args.start_id
+        )
+
+
+if __name__ == '__main__':
+    main()
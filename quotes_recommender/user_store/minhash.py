@@ -0,0 +1,233 @@
+import logging
+import zlib
+from typing import Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+from redis.client import Pipeline
+
+from quotes_recommender.core.constants import TXT_ENCODING
+from quotes_recommender.user_store.constants import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_LSH_BANDS,
+    DEFAULT_MINHASH_PERMUTATIONS,
+    DEFAULT_SIMILAR_USERS,
+    MINHASH_SEED,
+)
+from quotes_recommender.user_store.models import (
+    LSHBucketKey,
+    MinHashKey,
+    PreferenceChange,
+    PreferenceKey,
+)
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime of the universal hash functions, small enough for products to fit into 64 bits
+_PRIME: int = (1 << 31) - 1
+
+
+class MinHashIndex:
+    """
+    Locality-sensitive hashing index of the users' likes for approximate nearest neighbour search.
+    Every user's likes are summarized by a MinHash signature stored as a Redis string. The signature is split into
+    bands and the user is added to one bucket set per band, so that users with a high Jaccard similarity share at least
+    one bucket with a high probability. Similar users are found by looking up the user's buckets only, e.g. the
+    candidates of the user-user recommendations of users with many likes.
+    Signatures depend on the number of permutations, bands and the seed, so changing them requires a rebuild.
+    """
+
+    def __init__(
+        self,
+        user_store: RedisUserStore,
+        num_permutations: int = DEFAULT_MINHASH_PERMUTATIONS,
+        bands: int = DEFAULT_LSH_BANDS,
+        seed: int = MINHASH_SEED,
+    ) -> None:
+        """
+        Init MinHash index.
+        :param user_store: User store holding the preferences.
+        :param num_permutations: Length of the signatures.
+        :param bands: Number of LSH bands. More bands find less similar users at the cost of more candidates.
+        :param seed: Seed of the hash functions.
+        """
+        if num_permutations % bands != 0:
+            raise ValueError('The number of permutations must be divisible by the number of bands.')
+        self.user_store = user_store
+        self.num_permutations = num_permutations
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_permutations, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_permutations, dtype=np.uint64)
+
+    def signature(self, quote_ids: Sequence[int | str]) -> npt.NDArray[np.uint32]:
+        """
+        Computes the MinHash signature of a set of quotes.
+        :param quote_ids: IDs of the quotes, must not be empty.
+        :return: Signature.
+        """
+        hashes = np.fromiter(
+            (zlib.crc32(str(quote_id).encode(TXT_ENCODING)) % _PRIME for quote_id in quote_ids),
+            dtype=np.uint64,
+            count=len(quote_ids),
+        )
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0).astype(np.uint32)
+
+    def _bucket_keys(self, signature: npt.NDArray[np.uint32]) -> list[str]:
+        """
+        Returns the keys of the buckets a signature falls into, one per band.
+        :param signature: MinHash signature.
+        :return: Bucket keys.
+        """
+        return [
+            LSHBucketKey(band=band, bucket=rows.tobytes().hex()).key
+            for band, rows in enumerate(signature.reshape(self.bands, -1))
+        ]
+
+    def _decode(self, signature: Optional[bytes]) -> Optional[npt.NDArray[np.uint32]]:
+        """
+        Decodes a stored signature, ignoring signatures of another length.
+        :param signature: Stored signature.
+        :return: Signature or None if there is no valid one.
+        """
+        if not signature or len(signature) != self.num_permutations * 4:
+            return None
+        return np.frombuffer(signature, dtype=np.uint32)
+
+    def update_user(
+        self, username: str, added_likes: Optional[Sequence[str]] = None
+    ) -> Optional[npt.NDArray[np.uint32]]:
+        """
+        Updates the signature and buckets of a user.
+        Added likes are merged into the stored signature, otherwise it is recomputed from all of the user's likes.
+        :param username: The username of the user.
+        :param added_likes: IDs of the newly liked quotes if the user's likes were only added to.
+        :return: New signature or None if the user does not like any quote.
+        """
+        key = MinHashKey(username=username).key
+        like_key = PreferenceKey(username=username).like_key
+        signature: Optional[npt.NDArray[np.uint32]] = None
+
+        def update(pipe: Pipeline) -> None:
+            nonlocal signature
+            old_signature = self._decode(pipe.get(key))  # type: ignore
+            likes = self.user_store.decode_bitmaps([pipe.get(like_key)])[0]  # type: ignore
+            # likes unset again since, e.g. because the change is applied late, are not merged
+            merged_likes = list(set(added_likes or []).intersection(likes))
+            if merged_likes and old_signature is not None:
+                signature = np.minimum(old_signature, self.signature(merged_likes))
+            else:
+                signature = self.signature(likes) if likes else None
+            old_buckets = set(self._bucket_keys(old_signature)) if old_signature is not None else set()
+            new_buckets = set(self._bucket_keys(signature)) if signature is not None else set()
+            pipe.multi()
+            # only touch buckets that changed
+            for bucket_key in old_buckets - new_buckets:
+                pipe.srem(bucket_key, username)
+            for bucket_key in new_buckets - old_buckets:
+                pipe.sadd(bucket_key, username)
+            if signature is None:
+                pipe.delete(key)
+            else:
+                pipe.set(key, signature.tobytes())
+
+        # optimistic locking guards against concurrent updates of the same user
+        self.user_store.client.transaction(update, key, like_key)
+        return signature
+
+    def apply_change(self, change: PreferenceChange) -> None:
+        """
+        Applies a preference change to the signature of the user, as the handler of the minhash consumer of the
+        preference events. Applying a change again or late does not add likes that were unset since.
+        :param change: Effective preference change.
+        :return: None
+        """
+        if change.removed_likes:
+            self.update_user(change.username)
+        elif change.added_likes:
+            self.update_user(change.username, added_likes=change.added_likes)
+
+    def _get_signature(self, username: str) -> Optional[npt.NDArray[np.uint32]]:
+        """
+        Returns the signature of a user, computing it if the user was not indexed yet.
+        :param username: The username of the user.
+        :return: Signature or None if the user does not like any quote.
+        """
+        signature = self._decode(self.user_store.client.get(MinHashKey(username=username).key))  # type: ignore
+        return self.update_user(username) if signature is None else signature
+
+    def _get_candidates(self, username: str, signature: npt.NDArray[np.uint32]) -> set[str]:
+        """
+        Returns the users sharing at least one LSH bucket with the given user.
+        :param username: The username of the user.
+        :param signature: Signature of the user.
+        :return: Usernames of the candidates.
+        """
+        with self.user_store.client.pipeline(transaction=False) as pipe:
+            for bucket_key in self._bucket_keys(signature):
+                pipe.smembers(bucket_key)
+            candidates = {member.decode(TXT_ENCODING) for members in pipe.execute() for member in members}
+        candidates.discard(username)
+        return candidates
+
+    def get_candidates(self, username: str) -> list[str]:
+        """
+        Returns the candidates of similar users, i.e., the users sharing at least one LSH bucket with the given user.
+        The cost does not grow with the number of users or likes. Users with a low similarity may be missed.
+        :param username: The username of the user.
+        :return: Usernames of the candidates.
+        """
+        if (signature := self._get_signature(username)) is None:
+            return []
+        return list(self._get_candidates(username, signature))
+
+    def get_similar_users(self, username: str, k: int = DEFAULT_SIMILAR_USERS) -> list[tuple[str, float]]:
+        """
+        Returns the users with the most similar likes by their estimated Jaccard similarity.
+        Only users sharing an LSH bucket with the given user are considered, so the cost does not grow with the number
+        of users. Users with a low similarity may be missed.
+        :param username: The username of the user.
+        :param k: Max number of similar users.
+        :return: Usernames and estimated Jaccard similarities, most similar first.
+        """
+        if (signature := self._get_signature(username)) is None:
+            return []
+        if not (candidates := self._get_candidates(username, signature)):
+            return []
+        usernames, signatures = [], []
+        for candidate, candidate_signature in zip(
+            candidates, self.user_store.client.mget([MinHashKey(username=candidate).key for candidate in candidates])
+        ):
+            if (candidate_signature := self._decode(candidate_signature)) is not None:
+                usernames.append(candidate)
+                signatures.append(candidate_signature)
+        if not usernames:
+            return []
+        similarities = (np.stack(signatures) == signature).mean(axis=1)
+        order = np.argsort(-similarities, kind='stable')[:k]
+        return [(usernames[i], float(similarities[i])) for i in order]
+
+    def rebuild(self, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Rebuilds the signatures and buckets of all users, e.g. after scraping or changing the index parameters.
+        :param batch_size: Number of users processed at once.
+        :return: Number of indexed users.
+        """
+        # drop the old index
+        for pattern in [LSHBucketKey(band='*', bucket='*').key, MinHashKey(username='*').key]:
+            self.user_store.delete_keys(pattern, batch_size=batch_size)
+        users = 0
+        for chunk in self.user_store.iter_user_bitmaps(PreferenceKey(username='*').like_key, batch_size=batch_size):
+            with self.user_store.client.pipeline(transaction=False) as pipe:
+                for username, likes in chunk:
+                    if not likes:
+                        continue
+                    signature = self.signature(likes)
+                    pipe.set(MinHashKey(username=username).key, signature.tobytes())
+                    for bucket_key in self._bucket_keys(signature):
+                        pipe.sadd(bucket_key, username)
+                    users += 1
+                pipe.execute()
+            logger.info(f'Indexed {users} users.')
+        return users
@@ -1,5 +1,9 @@
+import hashlib
+from typing import Optional, Sequence
+
 from pydantic import Field
 
+from quotes_recommender.core.constants import EMBEDDINGS_VERSION, TXT_ENCODING
 from quotes_recommender.core.models import ForbidExtraModel
 
 
@@ -35,15 +39,234 @@ class PreferenceKey(BaseKey):
     @property
     def like_key(self) -> str:
         """
-        Returns a Redis Hash Key for a user's like.
-        :return: Redis preference hash key.
+        Returns a Redis Key for the bitmap of a user's likes, addressed by the dense integers of the quotes.
+        :return: Redis preference bitmap key.
         """
         return f"{self._base_key}:like"
 
     @property
     def dislike_key(self) -> str:
         """
-        Returns a Redis Hash Key for a user's dislike.
-        :return: Redis preference hash key.
+        Returns a Redis Key for the bitmap of a user's dislikes, addressed by the dense integers of the quotes.
+        :return: Redis preference bitmap key.
         """
         return f"{self._base_key}:dislike"
+
+    @property
+    def like_times_key(self) -> str:
+        """
+        Returns a Redis Key for the sorted set of a user's likes, scored by the time they were set.
+        :return: Redis preference sorted set key.
+        """
+        return f"{self.like_key}:times"
+
+    @property
+    def dislike_times_key(self) -> str:
+        """
+        Returns a Redis Key for the sorted set of a user's dislikes, scored by the time they were set.
+        :return: Redis preference sorted set key.
+        """
+        return f"{self.dislike_key}:times"
+
+
+class CommonLikesKey(BaseKey):
+    """Class defining a Redis key for the intersection of a user's like bitmap with the like bitmap of another user."""
+
+    @property
+    def key(self) -> str:
+        """
+        Returning the Redis key containing the username. It is outside of the user keys, as the tracked user keys
+        invalidate cached preferences.
+        :return: Common likes Redis key
+        """
+        return f"common_likes:{self.username}"
+
+
+class LikersKey(ForbidExtraModel):
+    """Class defining a Redis hash key for the users liking a quote (inverted index of the like bitmaps)."""
+
+    quote_id: str = Field(description="The ID of the liked quote.")
+
+    @property
+    def key(self) -> str:
+        """
+        Returning the Redis hash key containing the quote ID.
+        :return: Likers Redis hash key
+        """
+        return f"quote:{self.quote_id}:likers"
+
+
+class MinHashKey(BaseKey):
+    """Class defining a Redis key for the MinHash signature of a user's likes."""
+
+    @property
+    def key(self) -> str:
+        """
+        Returning the Redis key containing the username.
+        :return: MinHash Redis key
+        """
+        return f"user:{self.username}:minhash"
+
+
+class LSHBucketKey(ForbidExtraModel):
+    """Class defining a Redis hash key for the users sharing an LSH bucket."""
+
+    band: int | str = Field(description="The index of the signature band.")
+    bucket: str = Field(description="The hashed signature rows of the band.")
+
+    @property
+    def key(self) -> str:
+        """
+        Returning the Redis hash key containing the band and bucket.
+        :return: LSH bucket Redis hash key
+        """
+        return f"lsh:{self.band}:{self.bucket}"
+
+
+class ProfileKey(BaseKey):
+    """Class defining a Redis hash key for the profile vector of a user."""
+
+    @property
+    def key(self) -> str:
+        """
+        Returning the Redis hash key containing the username.
+        :return: Profile Redis hash key
+        """
+        return f"user:{self.username}:profile"
+
+
+class RecommendationKey(BaseKey):
+    """Class defining a Redis key for the precomputed recommendations of a user."""
+
+    @property
+    def key(self) -> str:
+        """
+        Returning the Redis key containing the username.
+        :return: Recommendations Redis key
+        """
+        return f"user:{self.username}:recommendations"
+
+
+def get_preferences_version(likes: Sequence[int | str], dislikes: Sequence[int | str]) -> str:
+    """
+    Computes a version stamp of a user's preferences. Recommendations computed from other preferences are stale.
+    :param likes: IDs of liked quotes.
+    :param dislikes: IDs of disliked quotes.
+    :return: Version stamp.
+    """
+    digest = hashlib.sha1(EMBEDDINGS_VERSION.encode(TXT_ENCODING))
+    digest.update(','.join(sorted(map(str, likes))).encode(TXT_ENCODING))
+    digest.update(b'|')
+    digest.update(','.join(sorted(map(str, dislikes))).encode(TXT_ENCODING))
+    return digest.hexdigest()
+
+
+class PrecomputedRecommendations(ForbidExtraModel):
+    """Class representing recommendations that were computed offline for a user."""
+
+    version: str = Field(description="Version stamp of the preferences the recommendations were computed from.")
+    created_at: float = Field(description="UNIX timestamp of the computation.")
+    item_item: list[str] = Field(default_factory=list, description="Quote IDs of the item-item recommendations.")
+    user_user: list[str] = Field(default_factory=list, description="Quote IDs of the user-user recommendations.")
+
+
+class PreferenceChange(ForbidExtraModel):
+    """Class representing the effective changes of a single preference update of a user."""
+
+    username: str = Field(description="The username of the user whose preferences changed.")
+    added_likes: list[str] = Field(default_factory=list, description="Quote IDs that were added to the likes.")
+    removed_likes: list[str] = Field(default_factory=list, description="Quote IDs that were removed from the likes.")
+    added_dislikes: list[str] = Field(default_factory=list, description="Quote IDs that were added to the dislikes.")
+    removed_dislikes: list[str] = Field(
+        default_factory=list, description="Quote IDs that were removed from the dislikes."
+    )
+
+    @property
+    def is_empty(self) -> bool:
+        """
+        Whether the update did not change any preference.
+        :return: True if nothing changed.
+        """
+        return not (self.added_likes or self.removed_likes or self.added_dislikes or self.removed_dislikes)
+
+    def to_event_fields(self) -> dict[str, str]:
+        """
+        Encodes the change as the fields of a preference event, with quote IDs joined by commas.
+        :return: Event fields, without empty lists.
+        """
+        return {
+            field: value if field == 'username' else ','.join(value)
+            for field, value in self.model_dump().items()
+            if value
+        }
+
+    @classmethod
+    def from_event_fields(cls, fields: dict[bytes, bytes]) -> 'PreferenceChange':
+        """
+        Decodes a preference event read from the event stream.
+        :param fields: Event fields.
+        :return: Preference change.
+        """
+        decoded = {field.decode(TXT_ENCODING): value.decode(TXT_ENCODING) for field, value in fields.items()}
+        return cls(
+            username=decoded.pop('username'),
+            **{field: value.split(',') for field, value in decoded.items() if value},
+        )
+
+
+class MemoryReport(ForbidExtraModel):
+    """Class summarizing the memory used by the preferences before and after their migration to bitmaps."""
+
+    keys: int = Field(default=0, description="Number of migrated preference sets.")
+    set_bytes: int = Field(default=0, description="Memory used by the migrated preference sets in bytes.")
+    bitmap_bytes: int = Field(default=0, description="Memory used by their bitmaps in bytes.")
+    mapping_bytes: int = Field(default=0, description="Memory used by the dense quote ID mapping in bytes.")
+    used_memory_before: int = Field(default=0, description="Memory used by Redis before the migration in bytes.")
+    used_memory_after: int = Field(default=0, description="Memory used by Redis after the migration in bytes.")
+
+
+class CleanUpStats(ForbidExtraModel):
+    """Class summarizing a run of the clean-up of sparse users."""
+
+    scanned_keys: int = Field(description="Number of scanned like bitmaps.")
+    deleted_keys: int = Field(description="Number of deleted like bitmaps.")
+    seconds: float = Field(description="Duration of the run in seconds.")
+
+    @property
+    def deleted_keys_per_second(self) -> float:
+        """
+        Deletion throughput of the run.
+        :return: Number of deleted like bitmaps per second.
+        """
+        return self.deleted_keys / self.seconds if self.seconds else 0.0
+
+
+class PreferenceCacheStats(ForbidExtraModel):
+    """Class summarizing the effectiveness of the client-side preference cache."""
+
+    hits: int = Field(description="Number of reads served from the cache.")
+    misses: int = Field(description="Number of reads served by Redis.")
+    invalidations: int = Field(description="Number of invalidated users, by this or other processes.")
+    size: int = Field(description="Number of cached users.")
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Share of the reads served from the cache.
+        :return: Hit rate between 0 and 1.
+        """
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+
+class PopularityKey(ForbidExtraModel):
+    """Class defining a Redis sorted set key ranking the quotes by popularity, overall or within a tag."""
+
+    tag: Optional[str] = Field(default=None, description="The tag of the ranked quotes, None for all quotes.")
+
+    @property
+    def key(self) -> str:
+        """
+        Returning the Redis sorted set key, containing the tag if given.
+        :return: Popularity Redis sorted set key
+        """
+        return "quote:popularity" if self.tag is None else f"quote:popularity:tag:{self.tag}"
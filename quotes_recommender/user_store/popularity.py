@@ -0,0 +1,115 @@
+import logging
+from typing import Collection, Iterable, Optional
+
+from quotes_recommender.core.constants import TXT_ENCODING
+from quotes_recommender.user_store.constants import (
+    APP_LIKE_POPULARITY,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_POPULAR_QUOTES,
+)
+from quotes_recommender.user_store.models import PopularityKey, PreferenceChange
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.vector_store.vector_store_singleton import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class PopularityIndex:
+    """
+    Leaderboard of the quotes by popularity as Redis sorted sets, serving cold-start and fallback recommendations with
+    a single ZREVRANGE. Scores are seeded with the number of likes a quote received on the scraped website and
+    incremented by likes in the app. Optionally, the quotes are ranked within each of their tags as well.
+    """
+
+    def __init__(self, user_store: RedisUserStore, vector_store: VectorStore, per_tag: bool = True) -> None:
+        """
+        Init popularity index.
+        :param user_store: User store holding the leaderboards.
+        :param vector_store: Vector store holding the quote payloads, needed for the tags of liked quotes.
+        :param per_tag: Whether to maintain a leaderboard per tag.
+        """
+        self.user_store = user_store
+        self.vector_store = vector_store
+        self.per_tag = per_tag
+
+    def seed(self, quotes: Iterable[tuple[int | str, int, Collection[str]]]) -> None:
+        """
+        Adds scraped quotes with their number of likes to the leaderboards with a single round trip.
+        Quotes that are ranked already keep their score, so seeding again does not drop the likes gained in the app.
+        :param quotes: IDs, numbers of likes and tags of the quotes.
+        :return: None
+        """
+        with self.user_store.client.pipeline(transaction=False) as pipe:
+            for quote_id, likes, tags in quotes:
+                pipe.zadd(PopularityKey().key, {str(quote_id): likes}, nx=True)
+                if self.per_tag:
+                    for tag in tags:
+                        pipe.zadd(PopularityKey(tag=tag).key, {str(quote_id): likes}, nx=True)
+            pipe.execute()
+
+    def seed_from_vector_store(self, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Seeds the leaderboards with all quotes of the vector store, e.g. for quotes ingested before the index existed.
+        :param batch_size: Number of quotes scrolled at once.
+        :return: Number of seeded quotes.
+        """
+        quotes, offset = 0, None
+        while True:
+            points, offset = self.vector_store.scroll_points(
+                payload_attributes=['likes', 'tags'], limit=batch_size, offset=offset
+            )
+            self.seed(
+                (point.id, int(point.payload.get('likes') or 0), point.payload.get('tags') or [])
+                for point in points
+                if point.payload is not None
+            )
+            quotes += len(points)
+            logger.info(f'Seeded the popularity of {quotes} quotes.')
+            if offset is None:
+                return quotes
+
+    def apply_change(self, change: PreferenceChange) -> None:
+        """
+        Applies the likes and unlikes of a preference change to the leaderboards.
+        :param change: Effective preference change.
+        :return: None
+        """
+        increments = {
+            **{quote_id: APP_LIKE_POPULARITY for quote_id in change.added_likes},
+            **{quote_id: -APP_LIKE_POPULARITY for quote_id in change.removed_likes},
+        }
+        if not increments:
+            return
+        # tags are read from the cached payloads
+        tags = (
+            {
+                str(point.id): (point.payload or {}).get('tags') or []
+                for point in self.vector_store.search_points(list(increments))
+            }
+            if self.per_tag
+            else {}
+        )
+        with self.user_store.client.pipeline(transaction=False) as pipe:
+            for quote_id, increment in increments.items():
+                pipe.zincrby(PopularityKey().key, increment, quote_id)
+                for tag in tags.get(quote_id, []):
+                    pipe.zincrby(PopularityKey(tag=tag).key, increment, quote_id)
+            pipe.execute()
+
+    def get_popular_quote_ids(
+        self, limit: int = DEFAULT_POPULAR_QUOTES, tag: Optional[str] = None, exclude: Collection[str] = ()
+    ) -> list[str]:
+        """
+        Returns the most popular quotes with a single ZREVRANGE.
+        :param limit: Max number of quotes.
+        :param tag: Tag of the quotes, None for all quotes.
+        :param exclude: IDs of quotes to skip, e.g. those the user rated already.
+        :return: Quote IDs, most popular first.
+        """
+        exclude = {str(quote_id) for quote_id in exclude}
+        quote_ids = self.user_store.client.zrevrange(PopularityKey(tag=tag).key, 0, limit + len(exclude) - 1)
+        return [
+            quote_id
+            for quote_id in (quote_id.decode(TXT_ENCODING) for quote_id in quote_ids)
+            if quote_id not in exclude
+        ][:limit]
@@ -0,0 +1,21 @@
+from typing import Any
+
+from quotes_recommender.user_store.popularity import PopularityIndex
+from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSingleton
+from quotes_recommender.utils.singleton import Singleton
+from quotes_recommender.vector_store.vector_store_singleton import (
+    QdrantVectorStoreSingleton,
+)
+
+
+class PopularityIndexSingleton(Singleton):
+    """Singleton class for the popularity leaderboards of the quotes"""
+
+    def init(self, *args: Any, **kwargs: Any) -> None:  # pylint: disable=unused-argument
+        """Init popularity index and keep it in sync with preference updates"""
+
+        user_store = RedisUserStoreSingleton().user_store
+        self.popularity_index = PopularityIndex(
+            user_store=user_store, vector_store=QdrantVectorStoreSingleton().vector_store
+        )
+        user_store.add_preference_listener(self.popularity_index.apply_change)
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import redis
+from redis.client import PubSubWorkerThread
+from redis.connection import AbstractConnection
+
+from quotes_recommender.core.constants import TXT_ENCODING
+from quotes_recommender.user_store.constants import (
+    DEFAULT_PREFERENCE_CACHE_SIZE,
+    DEFAULT_PREFERENCE_CACHE_TTL,
+    INVALIDATION_CHANNEL,
+    PREFERENCE_TRACKING_PREFIX,
+)
+from quotes_recommender.user_store.models import (
+    PreferenceCacheStats,
+    PreferenceKey,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PreferenceCache:
+    """
+    Process-wide client-side cache of the users' preferences, shared by all Streamlit sessions.
+    Coherence across processes relies on Redis client tracking in broadcasting mode: Redis publishes all modified
+    user keys to the invalidation channel, which a background thread listens to. The listener's connection
+    enables tracking itself, redirecting the invalidations to itself, so this works with RESP2 connections as well.
+    If tracking cannot be enabled, cached preferences expire after a TTL instead.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        max_size: int = DEFAULT_PREFERENCE_CACHE_SIZE,
+        ttl: float = DEFAULT_PREFERENCE_CACHE_TTL,
+    ) -> None:
+        """
+        Init preference cache.
+        :param client: Redis client.
+        :param max_size: Max number of cached users, the least recently read users are evicted first.
+        :param ttl: Seconds after which cached preferences expire if client tracking is unavailable.
+        """
+        self._client = client
+        self._max_size = max_size
+        self._ttl = ttl
+        # reentrant, as reconnects of the listener clear the cache while it subscribes
+        self._lock = threading.RLock()
+        # usernames mapped to the time they were loaded and their likes and dislikes
+        self._preferences: OrderedDict[str, tuple[float, tuple[str, ...], tuple[str, ...]]] = OrderedDict()
+        self._pubsub: Optional[redis.client.PubSub] = None
+        self._listener: Optional[PubSubWorkerThread] = None
+        self._subscribed = False
+        self._tracking = False
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _subscribe(self) -> None:
+        """
+        Enables client tracking of the user keys on a dedicated connection and listens to the invalidations in a
+        background thread.
+        :return: None
+        """
+        self._subscribed = True
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        try:
+            # enable tracking before subscribing, as subscribed RESP2 connections only accept pub/sub commands
+            connection = self._client.connection_pool.get_connection()
+            pubsub.connection = connection
+            self._enable_tracking(connection)
+            # on reconnects, enable tracking again before the channel is subscribed again
+            connection.register_connect_callback(self._on_connect)
+            connection.register_connect_callback(pubsub.on_connect)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+            self._pubsub = pubsub
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except redis.RedisError:
+            pubsub.reset()
+            logger.warning(f'Cannot enable client tracking, preferences are cached for {self._ttl}s.')
+
+    def _enable_tracking(self, connection: AbstractConnection) -> None:
+        """
+        Enables client tracking of the user keys, redirecting the invalidations to the connection itself.
+        :param connection: Connection of the invalidation listener.
+        :return: None
+        """
+        connection.send_command('CLIENT', 'ID')
+        client_id = connection.read_response()
+        connection.send_command(
+            'CLIENT', 'TRACKING', 'ON', 'REDIRECT', client_id, 'BCAST', 'PREFIX', PREFERENCE_TRACKING_PREFIX
+        )
+        connection.read_response()
+        self._tracking = True
+
+    def _on_connect(self, connection: AbstractConnection) -> None:
+        """
+        Enables tracking again after the listener reconnected. Invalidations may have been missed in the meantime,
+        so the cache is cleared.
+        :param connection: Connection of the invalidation listener.
+        :return: None
+        """
+        self.clear()
+        try:
+            self._enable_tracking(connection)
+        except redis.RedisError:
+            self._tracking = False
+            logger.warning(f'Cannot enable client tracking, preferences are cached for {self._ttl}s.')
+
+    def _on_invalidation(self, message: dict) -> None:
+        """
+        Invalidates the users whose preference bitmaps changed. Changes of other user keys, e.g. profiles or
+        recommendations, are ignored, so that they neither evict users nor keep loaded preferences from being cached.
+        :param message: Invalidation message with the changed keys, or None if the whole keyspace was flushed.
+        :return: None
+        """
+        if message['data'] is None:
+            self.clear()
+            return
+        for key in message['data']:
+            key = key.decode(TXT_ENCODING)
+            # get username from key
+            hash_keys = PreferenceKey(username=key.split(':')[1])
+            if key in (hash_keys.like_key, hash_keys.dislike_key):
+                self.invalidate(hash_keys.username)
+
+    def invalidate(self, username: str) -> None:
+        """
+        Drops the cached preferences of a user, so that they are loaded again on the next read.
+        :param username: The username of the user.
+        :return: None
+        """
+        with self._lock:
+            self.invalidations += 1
+            self._preferences.pop(username, None)
+
+    def clear(self) -> None:
+        """
+        Drops the cached preferences of all users.
+        :return: None
+        """
+        with self._lock:
+            self.invalidations += len(self._preferences)
+            self._preferences.clear()
+
+    def get(self, username: str, load: Callable[[str], tuple[list[str], list[str]]]) -> tuple[list[str], list[str]]:
+        """
+        Returns the cached preferences of a user, loading them if they are missing or expired.
+        :param username: The username of the user.
+        :param load: Callable loading the likes and dislikes of a user from Redis.
+        :return: Copies of the liked and disliked quotes' IDs, safe to be modified by the caller.
+        """
+        with self._lock:
+            if not self._subscribed:
+                self._subscribe()
+            # fall back to the TTL if tracking is unavailable or the listener died
+            tracking = self._tracking and self._listener is not None and self._listener.is_alive()
+            cached = self._preferences.get(username)
+            if cached is not None and (tracking or time.monotonic() - cached[0] <= self._ttl):
+                self._preferences.move_to_end(username)
+                self.hits += 1
+                return list(cached[1]), list(cached[2])
+            self.misses += 1
+            invalidations = self.invalidations
+        likes, dislikes = load(username)
+        with self._lock:
+            # do not cache what might have been changed while loading
+            if self.invalidations == invalidations:
+                self._preferences[username] = (time.monotonic(), tuple(likes), tuple(dislikes))
+                self._preferences.move_to_end(username)
+                while len(self._preferences) > self._max_size:
+                    self._preferences.popitem(last=False)
+        return likes, dislikes
+
+    def stats(self) -> PreferenceCacheStats:
+        """
+        Returns the hit and invalidation counts of the cache.
+        :return: Cache statistics.
+        """
+        with self._lock:
+            return PreferenceCacheStats(
+                hits=self.hits, misses=self.misses, invalidations=self.invalidations, size=len(self._preferences)
+            )
+
+    def close(self) -> None:
+        """
+        Stops listening to invalidations.
+        :return: None
+        """
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._pubsub is not None:
+            if self._pubsub.connection is not None:
+                self._pubsub.connection.deregister_connect_callback(self._on_connect)
+                # the connection is returned to the pool, so tracking must not outlive the listener
+                self._pubsub.connection.disconnect()
+            self._pubsub.close()
+            self._pubsub = None
+        self._tracking = False
@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import redis
+
+from quotes_recommender.user_store.constants import (
+    DEFAULT_EVENTS_BATCH_SIZE,
+    DEFAULT_EVENTS_BLOCK_MS,
+    DEFAULT_EVENTS_CLAIM_IDLE_MS,
+    PREFERENCE_EVENTS_KEY,
+)
+from quotes_recommender.user_store.models import PreferenceChange
+
+logger = logging.getLogger(__name__)
+
+
+class PreferenceEventConsumer:
+    """
+    Member of a consumer group of the preference event stream, applying every event to a derived structure.
+    Each group receives every event once, split among its consumers. Events are acknowledged after they were applied,
+    so a restarted consumer first retries its pending events and then continues after the last event delivered to its
+    group. Pending events of dead consumers are claimed once they have been idle for a while. As events may be applied
+    more than once, handlers have to be idempotent.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        group: str,
+        consumer: str,
+        handler: Callable[[PreferenceChange], None],
+        batch_size: int = DEFAULT_EVENTS_BATCH_SIZE,
+        block_ms: int = DEFAULT_EVENTS_BLOCK_MS,
+        claim_idle_ms: int = DEFAULT_EVENTS_CLAIM_IDLE_MS,
+    ) -> None:
+        """
+        Init preference event consumer.
+        :param client: Redis client.
+        :param group: Name of the consumer group, one per derived structure.
+        :param consumer: Name of the consumer within the group, stable across restarts.
+        :param handler: Callback applying a preference change.
+        :param batch_size: Max number of events read at once.
+        :param block_ms: Milliseconds to wait for new events per read.
+        :param claim_idle_ms: Milliseconds after which pending events of other consumers are claimed.
+        """
+        self._client = client
+        self.group = group
+        self.consumer = consumer
+        self._handler = handler
+        self._batch_size = batch_size
+        self._block_ms = block_ms
+        self._claim_idle_ms = claim_idle_ms
+        self.applied = 0
+        self.failed = 0
+
+    def create_group(self, start_id: str = '$') -> bool:
+        """
+        Creates the consumer group if it does not exist yet.
+        :param start_id: ID after which the group starts reading, '$' for new events only or '0' for all retained ones.
+        :return: True if the group was created, False if it already existed.
+        """
+        try:
+            self._client.xgroup_create(PREFERENCE_EVENTS_KEY, self.group, id=start_id, mkstream=True)
+        except redis.ResponseError as error:
+            if not str(error).startswith('BUSYGROUP'):
+                raise
+            return False
+        logger.info(f'Created consumer group {self.group} of the preference events starting after {start_id}.')
+        return True
+
+    def _apply(self, events: list[tuple[bytes, Optional[dict[bytes, bytes]]]]) -> int:
+        """
+        Applies events and acknowledges the applied ones with a single command. Failed events stay pending.
+        :param events: IDs and fields of the events, fields are None for events trimmed from the stream.
+        :return: Number of acknowledged events.
+        """
+        acknowledged = []
+        for event_id, fields in events:
+            if fields:
+                try:
+                    self._handler(PreferenceChange.from_event_fields(fields))
+                    self.applied += 1
+                except Exception:  # pylint: disable=broad-exception-caught
+                    self.failed += 1
+                    logger.exception(
+                        f'Consumer {self.consumer} of group {self.group} failed to apply event {event_id}.'
+                    )
+                    continue
+            acknowledged.append(event_id)
+        if acknowledged:
+            self._client.xack(PREFERENCE_EVENTS_KEY, self.group, *acknowledged)
+        return len(acknowledged)
+
+    def process_pending(self) -> int:
+        """
+        Retries the events delivered to this consumer but not acknowledged, e.g. before a crash.
+        :return: Number of acknowledged events.
+        """
+        acknowledged, last_id = 0, '0'
+        while response := self._client.xreadgroup(
+            self.group, self.consumer, {PREFERENCE_EVENTS_KEY: last_id}, count=self._batch_size
+        ):
+            if not (events := response[0][1]):
+                break
+            acknowledged += self._apply(events)
+            last_id = events[-1][0]
+        return acknowledged
+
+    def claim_stale(self) -> int:
+        """
+        Claims and applies the events pending for other consumers for longer than the idle time.
+        :return: Number of acknowledged events.
+        """
+        acknowledged, start_id = 0, '0-0'
+        while True:
+            start_id, events, *_ = self._client.xautoclaim(
+                PREFERENCE_EVENTS_KEY,
+                self.group,
+                self.consumer,
+                min_idle_time=self._claim_idle_ms,
+                start_id=start_id,
+                count=self._batch_size,
+            )
+            acknowledged += self._apply(events)
+            if start_id in (b'0-0', '0-0'):
+                return acknowledged
+
+    def read_new(self) -> int:
+        """
+        Waits for events not delivered to the group yet and applies them.
+        :return: Number of acknowledged events.
+        """
+        response = self._client.xreadgroup(
+            self.group, self.consumer, {PREFERENCE_EVENTS_KEY: '>'}, count=self._batch_size, block=self._block_ms
+        )
+        return self._apply(response[0][1]) if response else 0
+
+    def run(self, stop: Optional[threading.Event] = None, start_id: str = '$') -> None:
+        """
+        Consumes the preference events until stopped.
+        :param stop: Event stopping the consumer after the current read.
+        :param start_id: ID after which the group starts reading if it does not exist yet.
+        :return: None
+        """
+        self.create_group(start_id=start_id)
+        self.process_pending()
+        last_claim = time.monotonic()
+        while stop is None or not stop.is_set():
+            self.read_new()
+            # look for events of dead consumers from time to time
+            if time.monotonic() - last_claim > self._claim_idle_ms / 1000:
+                self.claim_stale()
+                last_claim = time.monotonic()
@@ -0,0 +1,67 @@
+import threading
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from quotes_recommender.core.constants import TXT_ENCODING
+
+
+def bitmap_positions(bitmap: Optional[bytes]) -> npt.NDArray[np.int64]:
+    """
+    Returns the positions of the set bits of a Redis bitmap, whose first bit is the most significant bit of its first
+    byte.
+    :param bitmap: Bitmap, None if the key does not exist.
+    :return: Ascending positions.
+    """
+    return np.flatnonzero(np.unpackbits(np.frombuffer(bitmap or b'', dtype=np.uint8)))
+
+
+class QuoteIdMapping:
+    """
+    In-process copy of the dense integers of the quotes, which address the bits of the preference bitmaps.
+    The preference scripts assign the next integer to each newly rated quote by appending its ID to a Redis list, and
+    map the ID to its integer in a Redis hash. Integers are never reassigned, so the list only grows and the process
+    only copies the quote IDs appended since it decoded an unknown integer.
+    """
+
+    def __init__(self) -> None:
+        """Init an empty mapping."""
+        self._lock = threading.Lock()
+        self._quote_ids: list[str] = []
+
+    def __len__(self) -> int:
+        """
+        Returns the number of copied quote IDs.
+        :return: Number of quote IDs.
+        """
+        return len(self._quote_ids)
+
+    def missing_from(self, positions: Iterable[npt.NDArray[np.int64]]) -> Optional[int]:
+        """
+        Checks whether the quote IDs of bitmap positions were copied.
+        :param positions: Ascending positions of the set bits of bitmaps.
+        :return: First integer that was not copied yet, None if all positions are known.
+        """
+        known = len(self._quote_ids)
+        return known if any(indices.size and indices[-1] >= known for indices in positions) else None
+
+    def extend(self, start: int, quote_ids: Sequence[bytes]) -> None:
+        """
+        Copies the quote IDs read from the Redis list, skipping those copied concurrently in the meantime.
+        :param start: Integer of the first read quote ID.
+        :param quote_ids: Quote IDs read from the Redis list.
+        :return: None
+        """
+        with self._lock:
+            self._quote_ids.extend(
+                quote_id.decode(TXT_ENCODING) for quote_id in quote_ids[len(self._quote_ids) - start :]
+            )
+
+    def decode(self, positions: npt.NDArray[np.int64]) -> list[str]:
+        """
+        Returns the quote IDs of the set bits of a bitmap.
+        :param positions: Ascending positions of the set bits of a bitmap, all of them copied.
+        :return: Quote IDs.
+        """
+        return [self._quote_ids[index] for index in positions.tolist()]
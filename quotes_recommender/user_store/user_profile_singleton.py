@@ -0,0 +1,19 @@
+from typing import Any
+
+from quotes_recommender.user_store.user_profiles import UserProfileStore
+from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSingleton
+from quotes_recommender.utils.singleton import Singleton
+from quotes_recommender.vector_store.vector_store_singleton import (
+    QdrantVectorStoreSingleton,
+)
+
+
+class UserProfileStoreSingleton(Singleton):
+    """Singleton class for the user profile vectors"""
+
+    def init(self, *args: Any, **kwargs: Any) -> None:  # pylint: disable=unused-argument
+        """Init user profile store. Profiles are kept in sync by the user-profiles consumer of the preference events."""
+
+        self.profile_store = UserProfileStore(
+            user_store=RedisUserStoreSingleton().user_store, vector_store=QdrantVectorStoreSingleton().vector_store
+        )
@@ -0,0 +1,181 @@
+import logging
+from typing import Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+from redis.client import Pipeline
+
+from quotes_recommender.core.constants import EMBEDDINGS_VERSION, TXT_ENCODING
+from quotes_recommender.user_store.constants import DEFAULT_DISLIKE_WEIGHT
+from quotes_recommender.user_store.models import (
+    PreferenceChange,
+    PreferenceKey,
+    ProfileKey,
+    get_preferences_version,
+)
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.vector_store.vector_store_singleton import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileStore:
+    """
+    Maintains a profile vector per user, i.e., the mean of the liked quote embeddings minus the weighted mean of the
+    disliked ones. Sums and counts are stored in a Redis hash, so that each preference change is applied incrementally.
+    """
+
+    def __init__(
+        self,
+        user_store: RedisUserStore,
+        vector_store: VectorStore,
+        dislike_weight: float = DEFAULT_DISLIKE_WEIGHT,
+        embeddings_version: str = EMBEDDINGS_VERSION,
+    ) -> None:
+        """
+        Init user profile store.
+        :param user_store: User store holding the preferences.
+        :param vector_store: Vector store holding the quote embeddings.
+        :param dislike_weight: Weight of the disliked quotes' mean embedding.
+        :param embeddings_version: Version of the embeddings. Profiles of another version are rebuilt on demand.
+        """
+        self.user_store = user_store
+        self.vector_store = vector_store
+        self.dislike_weight = dislike_weight
+        self.embeddings_version = embeddings_version
+
+    def _is_current(self, profile: dict[bytes, bytes], preferences_version: Optional[str] = None) -> bool:
+        """
+        Whether a stored profile exists and was built from the current embeddings and, if given, from the preferences
+        of the given version.
+        :param profile: Stored profile hash.
+        :param preferences_version: Version of the user's current preferences, None to only check the embeddings.
+        :return: True if the profile can be used.
+        """
+        return (
+            bool(profile)
+            and profile.get(b'version', b'').decode(TXT_ENCODING) == self.embeddings_version
+            and (
+                preferences_version is None
+                or profile.get(b'preferences_version', b'').decode(TXT_ENCODING) == preferences_version
+            )
+        )
+
+    def apply_change(self, change: PreferenceChange) -> None:
+        """
+        Applies a preference change to the stored profile of the user, as the handler of the user-profiles consumer of
+        the preference events. Profiles store the version of the preferences they were built from, so that applying a
+        change is idempotent: changes applied already are skipped, and profiles that were not built from the
+        preferences right before the change, e.g. because changes arrived out of order, are rebuilt from the sets.
+        Profiles that do not exist or are outdated are dropped and rebuilt on demand instead.
+        :param change: Effective preference change.
+        :return: None
+        """
+        key = ProfileKey(username=change.username).key
+        hash_keys = PreferenceKey(username=change.username)
+        # fetch embeddings of all changed quotes with a single request
+        vectors = self.vector_store.get_vectors(
+            change.added_likes + change.removed_likes + change.added_dislikes + change.removed_dislikes
+        )
+        preferences: Optional[tuple[list[str], list[str]]] = None
+
+        def update(pipe: Pipeline) -> None:
+            nonlocal preferences
+            preferences = None
+            profile: dict[bytes, bytes] = pipe.hgetall(key)  # type: ignore
+            if not self._is_current(profile):
+                pipe.multi()
+                pipe.delete(key)
+                return
+            likes, dislikes = map(
+                set,
+                self.user_store.decode_bitmaps(
+                    [pipe.get(hash_keys.like_key), pipe.get(hash_keys.dislike_key)]  # type: ignore
+                ),
+            )
+            version = get_preferences_version(likes, dislikes)
+            applied_version = profile.get(b'preferences_version', b'').decode(TXT_ENCODING)
+            if applied_version == version:
+                return
+            previous_version = get_preferences_version(
+                (likes - set(change.added_likes)) | set(change.removed_likes),
+                (dislikes - set(change.added_dislikes)) | set(change.removed_dislikes),
+            )
+            if applied_version != previous_version:
+                preferences = list(likes), list(dislikes)
+                return
+            fields: dict[str, bytes | int | str] = {'preferences_version': version}
+            for kind, added, removed in [
+                ('like', change.added_likes, change.removed_likes),
+                ('dislike', change.added_dislikes, change.removed_dislikes),
+            ]:
+                vector_sum = np.frombuffer(profile[f'{kind}_sum'.encode()], dtype=np.float32).copy()
+                count = int(profile[f'{kind}_count'.encode()])
+                for quote_id, sign in [(quote_id, 1) for quote_id in added] + [(quote_id, -1) for quote_id in removed]:
+                    if (vector := vectors.get(quote_id)) is None:
+                        continue
+                    vector_sum = vector_sum + sign * vector if vector_sum.size else sign * vector
+                    count += sign
+                # reset sum of empty sets in order to avoid accumulating rounding errors
+                if count <= 0:
+                    vector_sum, count = np.empty(0, dtype=np.float32), 0
+                fields[f'{kind}_sum'] = vector_sum.astype(np.float32).tobytes()
+                fields[f'{kind}_count'] = count
+            pipe.multi()
+            pipe.hset(key, mapping=fields)  # type: ignore
+
+        # optimistic locking guards against concurrent updates of the same profile and preferences
+        self.user_store.client.transaction(update, key, hash_keys.like_key, hash_keys.dislike_key)
+        if preferences is not None:
+            self._build(change.username, *preferences)
+
+    def rebuild(self, username: str) -> dict[bytes, bytes]:
+        """
+        Rebuilds the profile of a user from all of the user's preferences.
+        :param username: The username of the user.
+        :return: Stored profile hash.
+        """
+        return self._build(username, *self.user_store.get_user_preferences(username))
+
+    def _build(self, username: str, likes: Sequence[str], dislikes: Sequence[str]) -> dict[bytes, bytes]:
+        """
+        Builds and stores the profile of a user from the given preferences.
+        :param username: The username of the user.
+        :param likes: IDs of the quotes liked by the user.
+        :param dislikes: IDs of the quotes disliked by the user.
+        :return: Stored profile hash.
+        """
+        vectors = self.vector_store.get_vectors([*likes, *dislikes])
+        profile: dict[bytes, bytes] = {
+            b'version': self.embeddings_version.encode(TXT_ENCODING),
+            b'preferences_version': get_preferences_version(likes, dislikes).encode(TXT_ENCODING),
+        }
+        for kind, quote_ids in [('like', likes), ('dislike', dislikes)]:
+            found = [vectors[quote_id] for quote_id in quote_ids if quote_id in vectors]
+            vector_sum = np.sum(found, axis=0, dtype=np.float32) if found else np.empty(0, dtype=np.float32)
+            profile[f'{kind}_sum'.encode()] = vector_sum.tobytes()
+            profile[f'{kind}_count'.encode()] = str(len(found)).encode()
+        self.user_store.client.hset(ProfileKey(username=username).key, mapping=profile)  # type: ignore
+        logger.info(f'Rebuilt profile vector of user {username}.')
+        return profile
+
+    def get_profile_vector(self, username: str) -> Optional[npt.NDArray[np.float32]]:
+        """
+        Returns the profile vector of a user, rebuilding it if it is missing or outdated. Profiles that do not match
+        the user's current preferences yet, e.g. while the user-profiles consumer catches up, are outdated as well.
+        :param username: The username of the user.
+        :return: Profile vector or None if the user has not liked any quote.
+        """
+        likes, dislikes = self.user_store.get_user_preferences(username)
+        profile: dict[bytes, bytes] = self.user_store.client.hgetall(ProfileKey(username=username).key)  # type: ignore
+        if not self._is_current(profile, get_preferences_version(likes, dislikes)):
+            profile = self._build(username, likes, dislikes)
+        like_count, dislike_count = int(profile[b'like_count']), int(profile[b'dislike_count'])
+        if like_count == 0:
+            return None
+        profile_vector = np.frombuffer(profile[b'like_sum'], dtype=np.float32) / like_count
+        if dislike_count > 0:
+            profile_vector = profile_vector - self.dislike_weight * (
+                np.frombuffer(profile[b'dislike_sum'], dtype=np.float32) / dislike_count
+            )
+        return profile_vector
@@ -1,17 +1,66 @@
 import itertools
 import logging
-import operator
-from typing import Any, Mapping, Optional, Sequence
+import time
+from collections import Counter
+from typing import Any, Callable, Iterator, Mapping, Optional, Sequence
 
 import redis
 
 from quotes_recommender.core.constants import TXT_ENCODING
+from quotes_recommender.user_store.commands import (
+    USER_STORE_SCRIPTS,
+    Command,
+    PreferenceUpdate,
+    ScriptCall,
+    common_likes_commands,
+    credentials_commands,
+    index_users_commands,
+    like_counts_commands,
+    likers_commands,
+    memory_usage_commands,
+    migrate_bitmap_call,
+    pair_preferences,
+    parse_common_likes,
+    parse_credentials,
+    parse_likers,
+    parse_preference_change,
+    parse_preferences,
+    parse_recommendations,
+    parse_users_index,
+    preference_updates,
+    preferences_commands,
+    quote_ids_commands,
+    recent_preferences_commands,
+    recommendations_commands,
+    register_user_commands,
+    select_most_similar_user,
+    store_likes_call,
+    store_recommendations_commands,
+    users_index_commands,
+)
 from quotes_recommender.user_store.constants import (
+    CLEAN_UP_CURSOR_KEY,
     DEFAULT_BATCH_SIZE,
+    DEFAULT_RECOMMENDATIONS_TTL,
     DEFAULT_SIMILAR_PREFERENCE,
+    PREFERENCE_EVENTS_KEY,
+    PREFERENCE_EVENTS_MAXLEN,
+    QUOTE_IDS_KEY,
+    QUOTE_INDEX_KEY,
+)
+from quotes_recommender.user_store.credentials_cache import CredentialsCache
+from quotes_recommender.user_store.models import (
+    CleanUpStats,
+    CredentialsKey,
+    LikersKey,
+    MemoryReport,
+    PrecomputedRecommendations,
+    PreferenceChange,
+    PreferenceKey,
 )
-from quotes_recommender.user_store.models import CredentialsKey, PreferenceKey
-from quotes_recommender.utils.redis import RedisConfig
+from quotes_recommender.user_store.preference_cache import PreferenceCache
+from quotes_recommender.user_store.quote_ids import QuoteIdMapping, bitmap_positions
+from quotes_recommender.utils.redis import RedisConfig, get_connection_pool
 
 logger = logging.getLogger(__name__)
 
@@ -28,118 +77,256 @@ class RedisUserStore:
         # raise error of no host or port was provided
         if redis_config.host is None or redis_config.port is None:
             raise ConnectionError("No Redis host or port specified.")
-        # get redis instance
-        self._client = redis.Redis(
-            host=str(redis_config.host),
-            port=int(redis_config.port),
-            db=redis_config.db,
-            password=redis_config.password,
-            username=redis_config.user,
-        )
+        # get redis instance backed by the process-wide connection pool
+        self._client = redis.Redis(connection_pool=get_connection_pool(redis_config))
         # test connection
         if ping:
             if not self._client.ping():
                 raise ConnectionError("Cannot connect to Redis.")
             logger.info('Connected to Redis.')
+        # callbacks invoked with the effective changes of each preference update
+        self._preference_listeners: list[Callable[[PreferenceChange], None]] = []
+        # credentials of all registered users shared by all sessions of the process
+        self.credentials_cache = CredentialsCache(self._client, db=redis_config.db)
+        # preferences of recently active users shared by all sessions of the process
+        self.preference_cache = PreferenceCache(self._client)
+        # quote IDs of the bits of the preference bitmaps
+        self.quote_ids = QuoteIdMapping()
+        # atomic preference mutations by script source
+        self._scripts = {script: self._client.register_script(script) for script in USER_STORE_SCRIPTS}
+
+    @property
+    def client(self) -> redis.Redis:
+        """
+        Returns the Redis client, e.g. for structures derived from the user data.
+        :return: Redis client.
+        """
+        return self._client
+
+    def _execute(self, commands: Sequence[Command | ScriptCall], transaction: bool = False) -> list[Any]:
+        """
+        Sends commands built by the commands module with a single round trip.
+        :param commands: Commands and script calls.
+        :param transaction: Whether to wrap the commands in a MULTI/EXEC transaction.
+        :return: Results of the commands.
+        """
+        if not commands:
+            return []
+        with self._client.pipeline(transaction=transaction) as pipe:
+            for command in commands:
+                if isinstance(command, ScriptCall):
+                    self._scripts[command.script](keys=command.keys, args=command.args, client=pipe)
+                else:
+                    pipe.execute_command(*command)
+            return pipe.execute()
+
+    def add_preference_listener(self, listener: Callable[[PreferenceChange], None]) -> None:
+        """
+        Registers a callback that is invoked with the effective changes after each preference update.
+        :param listener: Callback receiving the preference change.
+        :return: None
+        """
+        self._preference_listeners.append(listener)
+
+    def _notify_preference_listeners(self, change: PreferenceChange) -> None:
+        """
+        Passes a preference change to all registered listeners. Failing listeners do not fail the update.
+        :param change: Effective preference change.
+        :return: None
+        """
+        if change.is_empty:
+            return
+        # do not wait for the invalidation from Redis to read the own writes
+        self.preference_cache.invalidate(change.username)
+        for listener in self._preference_listeners:
+            try:
+                listener(change)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception(f'Preference listener failed for user {change.username}.')
 
-    def _get_all_users(
+    def decode_bitmaps(self, bitmaps: Sequence[Optional[bytes]]) -> list[list[str]]:
+        """
+        Decodes preference bitmaps into the IDs of their quotes. The quote IDs of integers assigned since the last
+        decoding are copied from Redis with a single round trip.
+        :param bitmaps: Preference bitmaps, None for missing keys.
+        :return: Quote IDs per bitmap.
+        """
+        positions = [bitmap_positions(bitmap) for bitmap in bitmaps]
+        if (start := self.quote_ids.missing_from(positions)) is not None:
+            self.quote_ids.extend(start, *self._execute(quote_ids_commands(start)))
+        return [self.quote_ids.decode(indices) for indices in positions]
+
+    def iter_user_bitmaps(
         self,
         search_str: Optional[str] = None,
         batch_size: int = DEFAULT_BATCH_SIZE,
-    ) -> dict[str, list[str]]:
+    ) -> Iterator[list[tuple[str, list[str]]]]:
         """
-        Receive key-value results for all users.
+        Streams the preference bitmaps of all users matching the search string in chunks.
+        Each SCAN batch is read with a single pipelined round trip and bitmaps are only decoded for the current chunk,
+        so memory is bounded by the batch size rather than the keyspace.
         :param search_str: Search string.
-        :param batch_size: Number of returned results.
-        :return: Dictionary mapping each username to a list of its set members
+        :param batch_size: Number of keys per chunk.
+        :return: Chunks of usernames and the quote IDs of their bitmaps.
 
         References:
             - https://redis-py.readthedocs.io/en/stable/#redis.Redis.scan_iter
         """
-        # init user data dict
-        users_data = {}
-        # iterate over each key matching the search string
-        for key in self._client.scan_iter(match=search_str, count=batch_size):
-            # decode key
-            key_str = key.decode(TXT_ENCODING)
-            # parse set members
-            members = list(map(lambda member: member.decode(TXT_ENCODING), self._client.smembers(key_str)))
-            # get username from hash key
-            username: str = key_str.split(':')[1]
-            # add results to users data dict
-            users_data[username] = members
-        # return dict
-        return users_data
+        keys = self._client.scan_iter(match=search_str, count=batch_size, _type='string')
+        while batch_keys := list(itertools.islice(keys, batch_size)):
+            with self._client.pipeline(transaction=False) as pipe:
+                for key in batch_keys:
+                    pipe.get(key)
+                batch_quote_ids = self.decode_bitmaps(pipe.execute())
+            yield [
+                # get username from hash key
+                (key.decode(TXT_ENCODING).split(':')[1], quote_ids)
+                for key, quote_ids in zip(batch_keys, batch_quote_ids)
+            ]
+
+    def delete_keys(self, search_str: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Deletes all keys matching the search string with one UNLINK per SCAN batch.
+        :param search_str: Search string.
+        :param batch_size: Number of keys per batch.
+        :return: Number of deleted keys.
+        """
+        deleted = 0
+        keys = self._client.scan_iter(match=search_str, count=batch_size)
+        while batch_keys := list(itertools.islice(keys, batch_size)):
+            deleted += self._client.unlink(*batch_keys)  # type: ignore
+        return deleted
+
+    def get_common_likes(
+        self,
+        user: str,
+        likes: Optional[Sequence[int | str]] = None,
+        candidates: Optional[Sequence[str]] = None,
+    ) -> Counter[str]:
+        """
+        Counts the likes every other user has in common with the given user.
+        Candidates are the users liking any of the user's liked quotes, looked up with a single SUNION of the likers
+        index. The common likes are counted server-side by intersecting the like bitmaps with BITOP AND and BITCOUNT in
+        a single transaction, so only the counts are transferred.
+        :param user: The username of the user for whom similar users are to be found.
+        :param likes: IDs of the quotes liked by the user to look up the candidates. Read from Redis if not given.
+        :param candidates: The usernames of the only users to count the common likes of, e.g. found by the MinHash
+            index, instead of all users of the likers index.
+        :return: Usernames mapped to the number of common likes.
+        """
+        if candidates is None:
+            if likes is None:
+                likes = self.get_user_preferences(user)[0]
+            candidates = parse_likers(user, self._execute(likers_commands(likes)))
+        return parse_common_likes(
+            user, candidates, self._execute(common_likes_commands(user, candidates), transaction=True)
+        )
 
     def get_most_similar_user(self, user: str, threshold: int = DEFAULT_SIMILAR_PREFERENCE) -> Optional[str]:
         """
-        Get user with most similar preferences to the given user based on set intersection.
+        Get user with most similar preferences to the given user based on the intersection of their likes.
         :param user: The username of the user for whom similar users are to be found.
         :param threshold: Minimum number of common preferences to consider a user similar.
         :return: username for user with most similar preferences.
         """
-        current_user_preferences = self.get_user_preferences(user)[0]
-        all_users = self._get_all_users(search_str='user:*:preferences:like')
-        similar_users = {}
-        for other_user, data in all_users.items():
-            intersection_list = list(set(current_user_preferences).intersection(data))
-            if (user != other_user) and (len(intersection_list) >= threshold):
-                similar_users[other_user] = data
-        # if no similar users were found
-        if not similar_users:
-            return None
-        # get user with the greatest set intersection
-        most_similar_user = max(similar_users.items(), key=operator.itemgetter(1))[0]
-        # return username of most similar user
-        return most_similar_user
+        return select_most_similar_user(self.get_common_likes(user), threshold)
 
     def get_user_credentials(self) -> dict[Any, Any]:
         """
-        Get all registered users and their credentials from redis.
+        Get all registered users and their credentials from the process-wide cache, loading them from Redis if needed.
         :return: usernames mapped to their corresponding credentials.
         """
-        # init dict for credentials
-        user_credentials: dict[Any, Any] = {}
-        # get credentials for every username
-        for credential_hash in self._client.scan_iter(match='user:*:credentials', _type='hash'):
-            # extract username from hash key
-            username: str = credential_hash.decode(TXT_ENCODING).split(':')[1]
-            user_credentials[username] = {
-                # get corresponding credentials
-                key.decode(TXT_ENCODING): value.decode(TXT_ENCODING)
-                for key, value in self._client.hgetall(credential_hash).items()
-            }
+        return self.credentials_cache.get(self._load_user_credentials)
+
+    def _load_user_credentials(self) -> dict[str, dict[str, str]]:
+        """
+        Get all registered users and their credentials from the users index with a single command.
+        The index is built from the credentials hashes once if it does not exist yet.
+        :return: usernames mapped to their corresponding credentials.
+        """
+        if users_index := self._execute(users_index_commands())[0]:
+            return parse_users_index(users_index)
+        credential_hashes = list(self._client.scan_iter(match=CredentialsKey(username='*').key, _type='hash'))
+        user_credentials = parse_credentials(credential_hashes, self._execute(credentials_commands(credential_hashes)))
+        self._execute(index_users_commands(user_credentials))
         return user_credentials
 
     def register_user(self, username: str, credentials: Mapping[str | bytes, bytes | float | int | str]) -> bool:
         """
-        Creates a new hash for a new user
+        Creates a new hash for a new user and adds the user to the users index.
         :param username: The username of the new user.
         :param credentials: The credentials of the new user.
         :return: True if all fields were added, else False.
         """
-        hash_key: str = CredentialsKey(username=username).key
-        added_fields = self._client.hset(name=hash_key, mapping=credentials)
+        added_fields, _ = self._execute(register_user_commands(username, credentials), transaction=True)
+        self.credentials_cache.invalidate()
         return added_fields == len(credentials)
 
     def get_user_preferences(self, username: str) -> tuple[list[str], list[str]]:
         """
-        Returns all preferences for a given user.
+        Returns all preferences for a given user from the process-wide cache, loading them from Redis if needed.
 
         Unpack result to receive likes and dislikes separately:
         like_ids, dislike_ids = user_store.get_user_preferences(...)
         :param username: The username of the logged-in user.
         :return: Lists of liked and disliked quotes' IDs.
         """
-        # create hash keys from username
-        hash_keys = PreferenceKey(username=username)
-        likes = self._client.smembers(name=hash_keys.like_key)
-        dislikes = self._client.smembers(name=hash_keys.dislike_key)
-        # return encoded likes and dislikes
-        return (
-            list(map(lambda x: x.decode(TXT_ENCODING), likes)),
-            list(map(lambda x: x.decode(TXT_ENCODING), dislikes)),
-        )
+        return self.preference_cache.get(username, self._load_user_preferences)
+
+    def _load_user_preferences(self, username: str) -> tuple[list[str], list[str]]:
+        """
+        Loads all preferences for a given user from Redis with a single round trip.
+        :param username: The username of the user.
+        :return: Lists of liked and disliked quotes' IDs.
+        """
+        return self.get_user_preferences_batch([username])[0]
+
+    def get_user_preferences_batch(self, usernames: Sequence[str]) -> list[tuple[list[str], list[str]]]:
+        """
+        Returns all preferences for several users with a single round trip.
+        :param usernames: The usernames of the users.
+        :return: Lists of liked and disliked quotes' IDs per user.
+        """
+        return pair_preferences(self.decode_bitmaps(self._execute(preferences_commands(usernames))))
+
+    def get_recent_preferences_batch(
+        self, usernames: Sequence[str], limit: Optional[int] = None
+    ) -> list[tuple[list[str], list[str]]]:
+        """
+        Returns the most recently set preferences for several users with a single round trip.
+        Preferences set before their times were recorded, e.g. scraped likes, are left out.
+        :param usernames: The usernames of the users.
+        :param limit: Max number of likes and dislikes per user, None for all.
+        :return: Lists of liked and disliked quotes' IDs per user, most recent first.
+        """
+        return parse_preferences(self._execute(recent_preferences_commands(usernames, limit=limit)))
+
+    def get_like_counts(self, usernames: Sequence[str]) -> list[int]:
+        """
+        Returns the number of liked quotes of several users with a single round trip.
+        :param usernames: The usernames of the users.
+        :return: Number of likes per user.
+        """
+        return self._execute(like_counts_commands(usernames))
+
+    def store_recommendations(
+        self, recommendations: Mapping[str, PrecomputedRecommendations], ttl: int = DEFAULT_RECOMMENDATIONS_TTL
+    ) -> None:
+        """
+        Stores precomputed recommendations of several users with a single round trip.
+        :param recommendations: Usernames mapped to their recommendations.
+        :param ttl: Seconds after which the recommendations expire.
+        :return: None
+        """
+        self._execute(store_recommendations_commands(recommendations, ttl))
+
+    def get_recommendations(self, username: str) -> Optional[PrecomputedRecommendations]:
+        """
+        Returns the precomputed recommendations of a user.
+        :param username: The username of the logged-in user.
+        :return: Precomputed recommendations or None if there are none or they expired.
+        """
+        return parse_recommendations(*self._execute(recommendations_commands(username)))
 
     def store_likes_batch(self, user_ids: Sequence[str], quote_id: str | int) -> None:
         """
@@ -148,36 +335,144 @@ class RedisUserStore:
         :param quote_id: The ID of the quote (point) which should be stored for each user.
         :return: None
         """
-        # create hash keys from user ids
-        hash_keys: list[str] = [PreferenceKey(username=str(user_id)).like_key for user_id in user_ids]
-        with self._client.pipeline() as pipe:
-            for hash_key in hash_keys:
-                pipe.sadd(hash_key, quote_id)
-            pipe.execute()
-            pipe.close()
+        if not user_ids:
+            return
+        usernames = [str(user_id) for user_id in user_ids]
+        # store the likes together with the likers index in one atomic round trip
+        self._execute([store_likes_call(usernames, str(quote_id))])
+        for username in usernames:
+            self.preference_cache.invalidate(username)
 
-    def clean_up_user_store(self, threshold: int = DEFAULT_SIMILAR_PREFERENCE) -> None:
+    def rebuild_likers_index(self, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
         """
-        Cleans the user store by removing all sets having less than a specified number of elements.
-        :param threshold: The minimum set size
-        :return: None
+        Rebuilds the likers index from the like bitmaps of all users, e.g. for data stored before the index existed.
+        :param batch_size: Number of keys scanned at once.
+        :return: Number of indexed users.
+        """
+        # drop the old index
+        self.delete_keys(LikersKey(quote_id='*').key, batch_size=batch_size)
+        users = 0
+        for chunk in self.iter_user_bitmaps(search_str=PreferenceKey(username='*').like_key, batch_size=batch_size):
+            likers: dict[str, list[str]] = {}
+            for username, user_likes in chunk:
+                for quote_id in user_likes:
+                    likers.setdefault(quote_id, []).append(username)
+            with self._client.pipeline(transaction=False) as pipe:
+                for quote_id, usernames in likers.items():
+                    pipe.sadd(LikersKey(quote_id=quote_id).key, *usernames)
+                pipe.execute()
+            users += len(chunk)
+        logger.info(f'Indexed the likes of {users} users.')
+        return users
+
+    def clean_up_user_store(
+        self,
+        threshold: int = DEFAULT_SIMILAR_PREFERENCE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_keys_per_second: Optional[float] = None,
+        resume: bool = True,
+    ) -> CleanUpStats:
         """
-        # get all user sets
-        user_data_all = self._get_all_users(search_str='user:*:preferences:like')
+        Cleans the user store by removing all like bitmaps having less than a specified number of likes.
+        The keyspace is walked in SCAN batches. Like counts are checked with pipelined BITCOUNT calls, only small
+        bitmaps are fetched, and they are removed with one UNLINK per batch. The SCAN cursor is checkpointed after
+        every batch, so an interrupted clean-up resumes where it stopped.
+        :param threshold: The minimum number of likes
+        :param batch_size: Number of keys scanned per batch.
+        :param max_keys_per_second: Max number of scanned keys per second, to limit the load next to live traffic.
+        :param resume: Whether to resume from the checkpointed cursor instead of starting over.
+        :return: Statistics of the run.
+        """
+        start_time = time.perf_counter()
+        cursor = int(self._client.get(CLEAN_UP_CURSOR_KEY) or 0) if resume else 0  # type: ignore
         # get registered users
-        registered_users = list(self.get_user_credentials().keys())
-        user_data_filtered = {key: value for key, value in user_data_all.items() if key not in registered_users}
-        with self._client.pipeline() as pipe:
-            # iter over all sets (except the one for the registered users)
-            for username, like_set in user_data_filtered.items():
-                # if the user has less than N likes
-                if len(like_set) < threshold:
-                    # re-construct hask key
-                    hash_key: str = PreferenceKey(username=username).like_key
-                    # delete key
-                    pipe.delete(hash_key)
-            pipe.execute()
-            pipe.close()
+        registered_users = set(self.get_user_credentials().keys())
+        scanned_keys, deleted_keys = 0, 0
+        while True:
+            cursor, keys = self._client.scan(
+                cursor=cursor, match=PreferenceKey(username='*').like_key, count=batch_size, _type='string'
+            )
+            # skip the bitmaps of the registered users
+            usernames = [
+                username for key in keys if (username := key.decode(TXT_ENCODING).split(':')[1]) not in registered_users
+            ]
+            like_counts = self.get_like_counts(usernames)
+            # users having less than N likes
+            if small_users := [username for username, count in zip(usernames, like_counts) if count < threshold]:
+                with self._client.pipeline(transaction=False) as pipe:
+                    for username in small_users:
+                        pipe.get(PreferenceKey(username=username).like_key)
+                    like_sets = self.decode_bitmaps(pipe.execute())
+                with self._client.pipeline() as pipe:
+                    # delete keys
+                    pipe.unlink(
+                        *[PreferenceKey(username=username).like_key for username in small_users],
+                        *[PreferenceKey(username=username).like_times_key for username in small_users],
+                    )
+                    # remove the users from the likers index
+                    for username, like_set in zip(small_users, like_sets):
+                        for quote_id in like_set:
+                            pipe.srem(LikersKey(quote_id=quote_id).key, username)
+                        # publish the removal to the consumers of the event stream
+                        if like_set:
+                            pipe.xadd(
+                                PREFERENCE_EVENTS_KEY,
+                                PreferenceChange(username=username, removed_likes=like_set).to_event_fields(),
+                                maxlen=PREFERENCE_EVENTS_MAXLEN,
+                                approximate=True,
+                            )
+                    pipe.execute()
+                for username, like_set in zip(small_users, like_sets):
+                    self._notify_preference_listeners(PreferenceChange(username=username, removed_likes=like_set))
+            scanned_keys += len(keys)
+            deleted_keys += len(small_users)
+            if cursor == 0:
+                self._client.delete(CLEAN_UP_CURSOR_KEY)
+                break
+            # checkpoint the cursor
+            self._client.set(CLEAN_UP_CURSOR_KEY, cursor)
+            # wait until the scan rate drops below the limit
+            if max_keys_per_second:
+                time.sleep(max(0.0, scanned_keys / max_keys_per_second - (time.perf_counter() - start_time)))
+        stats = CleanUpStats(
+            scanned_keys=scanned_keys, deleted_keys=deleted_keys, seconds=time.perf_counter() - start_time
+        )
+        logger.info(
+            f'Deleted {stats.deleted_keys} of {stats.scanned_keys} like bitmaps in {stats.seconds:.1f}s '
+            f'({stats.deleted_keys_per_second:.1f} keys/sec).'
+        )
+        return stats
+
+    def migrate_to_bitmaps(self, batch_size: int = DEFAULT_BATCH_SIZE) -> MemoryReport:
+        """
+        Converts the preference sets of all users into preference bitmaps, e.g. for data stored before the bitmaps.
+        Each set is replaced by its bitmap atomically by a script, which assigns dense integers to the quotes not rated
+        since the bitmaps were introduced. The memory used by each set is measured before its conversion and the memory
+        used by its bitmap after, so that the report compares both layouts of the same preferences.
+        Preference writers are to be stopped during the migration, as the scripts applying preference updates expect
+        bitmaps.
+        :param batch_size: Number of keys scanned and converted per round trip.
+        :return: Memory report.
+        """
+        report = MemoryReport(used_memory_before=self._client.info('memory')['used_memory'])
+        for search_str in (PreferenceKey(username='*').like_key, PreferenceKey(username='*').dislike_key):
+            keys = self._client.scan_iter(match=search_str, count=batch_size, _type='set')
+            while batch_keys := list(itertools.islice(keys, batch_size)):
+                set_bytes = self._execute(memory_usage_commands(batch_keys))
+                sizes = self._execute([migrate_bitmap_call(key) for key in batch_keys], transaction=True)
+                # skip the sets converted or deleted concurrently
+                migrated_keys = [key for key, size in zip(batch_keys, sizes) if size]
+                report.keys += len(migrated_keys)
+                report.set_bytes += sum(memory for memory, size in zip(set_bytes, sizes) if size and memory)
+                report.bitmap_bytes += sum(filter(None, self._execute(memory_usage_commands(migrated_keys))))
+        report.mapping_bytes = sum(filter(None, self._execute(memory_usage_commands([QUOTE_INDEX_KEY, QUOTE_IDS_KEY]))))
+        report.used_memory_after = self._client.info('memory')['used_memory']
+        logger.info(
+            f'Migrated {report.keys} preference sets of {report.set_bytes} bytes to bitmaps of {report.bitmap_bytes} '
+            f'bytes and a quote ID mapping of {report.mapping_bytes} bytes. Redis used {report.used_memory_before} '
+            f'bytes before and {report.used_memory_after} bytes after the migration.'
+        )
+        return report
 
     def set_user_preferences(
         self,
@@ -192,47 +487,24 @@ class RedisUserStore:
         :param dislikes: List of quote IDs of disliked quotes.
         :return: Whether operation was successful
         """
-        # build hash keys
-        hash_keys = PreferenceKey(username=username)
-        if likes:
-            # sync likes
-            self._sync_preferences(
-                preferences=likes, src_hash_key=hash_keys.dislike_key, dst_hash_key=hash_keys.like_key
-            )
-        if dislikes:
-            # sync dislikes
-            self._sync_preferences(
-                preferences=dislikes, src_hash_key=hash_keys.like_key, dst_hash_key=hash_keys.dislike_key
-            )
+        self._apply_preference_updates(username, preference_updates(likes=likes or (), dislikes=dislikes or ()))
         # TODO: return True if everything went right else False
         return True
 
-    def _sync_preferences(
-        self, preferences: Sequence[int | str] | set[int | str], src_hash_key: str, dst_hash_key: str
-    ) -> None:
+    def _apply_preference_updates(self, username: str, updates: Sequence[PreferenceUpdate]) -> PreferenceChange:
         """
-        Synchronizes the preferences for the logged-in user in order to keep mutually exclusiveness of
-        preferences in Redis.
-        :param preferences: Either like or dislike IDs.
-        :param src_hash_key: Hash key of the source/opposite set of provided preferences
-        (i.e., hash key for dislikes if likes were provided).
-        :param dst_hash_key: Hash key of the destination/target set of provided preferences
-        (i.e., hash key for likes if likes were provided).
-        :return: None
+        Applies preference updates of a user in a single transaction and round trip, keeping likes and dislikes
+        mutually exclusive. Bitmaps, times and the likers index are updated atomically by the scripts.
+        Listeners are notified once with the combined change.
+        :param username: The username of the logged-in user.
+        :param updates: Preference updates.
+        :return: Effective preference change.
         """
-        with self._client.pipeline() as pipe:
-            # if at least a single preference is already a member of the opposite set
-            # (i.e., if at least a single 1 is contained)
-            if any((index_list := list(map(int, self._client.smismember(src_hash_key, preferences))))):
-                # move it to the correct set (i.e, src set)
-                for dislike in list(itertools.compress(preferences, index_list)):
-                    pipe.smove(src_hash_key, dst_hash_key, dislike)
-            # add remaining preferences (i.e., those with an index of 0) to the corresponding set (i.e., src set)
-            # therefore, invert index_list items (0 -> 1, 1 -> 0)
-            if any((inverted_index_list := [not idx for idx in index_list])):
-                pipe.sadd(dst_hash_key, *list(itertools.compress(preferences, inverted_index_list)))
-            pipe.execute()
-            pipe.close()
+        change = parse_preference_change(
+            username, updates, self._execute([update.call(username) for update in updates], transaction=True)
+        )
+        self._notify_preference_listeners(change)
+        return change
 
     def delete_user_preference(
         self,
@@ -241,7 +513,7 @@ class RedisUserStore:
         dislikes: Optional[Sequence[int | str] | set[int | str]] = None,
     ) -> Optional[bool]:
         """
-        Removes a member from a set if it is part of it.
+        Removes preferences of the logged-in user if they are set.
         :param username: The username of the logged-in user.
         :param likes: List of quote IDs of liked quotes.
         :param dislikes: List of quote IDs of disliked quotes.
@@ -251,12 +523,35 @@ class RedisUserStore:
             raise ValueError('Can only specify likes or dislikes to delete, not both.')
         if (not likes) and (not dislikes):
             raise ValueError('Either specify likes or dislikes.')
-        # construct corresponding hash key
-        hash_key: str = (
-            PreferenceKey(username=username).like_key if likes else PreferenceKey(username=username).dislike_key
+        # clear the bits that are set together with their derived entries in one round trip
+        change = self._apply_preference_updates(
+            username, preference_updates(unset_likes=likes or (), unset_dislikes=dislikes or ())
         )
-        # check if the member exists in the given set
-        if self._client.smismember(hash_key, likes if likes else dislikes):
-            result = self._client.srem(hash_key, *likes if likes else dislikes)  # type: ignore
-            return result != 0
-        return False
+        return not change.is_empty
+
+    def apply_user_preferences(
+        self,
+        username: str,
+        likes: Sequence[int | str] = (),
+        dislikes: Sequence[int | str] = (),
+        unset_likes: Sequence[int | str] = (),
+        unset_dislikes: Sequence[int | str] = (),
+    ) -> bool:
+        """
+        Applies several preference updates of a user, e.g. buffered by a UI session, in a single transaction and round
+        trip. Listeners are notified once with the combined change.
+        :param username: The username of the logged-in user.
+        :param likes: IDs of quotes to like.
+        :param dislikes: IDs of quotes to dislike.
+        :param unset_likes: IDs of liked quotes to unset.
+        :param unset_dislikes: IDs of disliked quotes to unset.
+        :return: Whether the operation was successful.
+        """
+        if not (updates := preference_updates(likes, dislikes, unset_likes, unset_dislikes)):
+            return True
+        try:
+            self._apply_preference_updates(username, updates)
+        except redis.RedisError:
+            logger.exception(f'Failed to apply the preferences of user {username}.')
+            return False
+        return True
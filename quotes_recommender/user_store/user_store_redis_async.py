@@ -0,0 +1,353 @@
+import asyncio
+import inspect
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Mapping, Optional, Sequence
+
+import redis.asyncio
+
+from quotes_recommender.user_store.commands import (
+    USER_STORE_SCRIPTS,
+    Command,
+    PreferenceUpdate,
+    ScriptCall,
+    common_likes_commands,
+    credentials_commands,
+    index_users_commands,
+    like_counts_commands,
+    likers_commands,
+    pair_preferences,
+    parse_common_likes,
+    parse_credentials,
+    parse_likers,
+    parse_preference_change,
+    parse_preferences,
+    parse_recommendations,
+    parse_users_index,
+    preference_updates,
+    preferences_commands,
+    quote_ids_commands,
+    recent_preferences_commands,
+    recommendations_commands,
+    register_user_commands,
+    select_most_similar_user,
+    store_likes_call,
+    store_recommendations_commands,
+    users_index_commands,
+)
+from quotes_recommender.user_store.constants import (
+    DEFAULT_RECOMMENDATIONS_TTL,
+    DEFAULT_SIMILAR_PREFERENCE,
+)
+from quotes_recommender.user_store.credentials_cache import CredentialsCache
+from quotes_recommender.user_store.models import (
+    CredentialsKey,
+    PrecomputedRecommendations,
+    PreferenceChange,
+)
+from quotes_recommender.user_store.preference_cache import PreferenceCache
+from quotes_recommender.user_store.quote_ids import QuoteIdMapping, bitmap_positions
+from quotes_recommender.utils.redis import RedisConfig, get_async_connection_pool
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRedisUserStore:
+    """
+    Asyncio variant of the Redis user store, so that concurrent requests do not serialise on round trips.
+    Both stores send the commands built by the commands module and offer the same online methods.
+    Offline maintenance jobs (index rebuilds, clean-up) are only offered by the blocking store.
+    """
+
+    def __init__(
+        self,
+        redis_config: RedisConfig,
+        credentials_cache: Optional[CredentialsCache] = None,
+        preference_cache: Optional[PreferenceCache] = None,
+        quote_ids: Optional[QuoteIdMapping] = None,
+    ) -> None:
+        """
+        Create an asyncio Redis user store instance. Call ping() to test the connection.
+        :param redis_config: RedisConfig object
+        :param credentials_cache: Credentials cache of a blocking store of the process, invalidated on registrations.
+        :param preference_cache: Preference cache of a blocking store of the process, invalidated on updates.
+        :param quote_ids: Quote ID mapping of a blocking store of the process, else the store copies its own.
+        """
+        # raise error of no host or port was provided
+        if redis_config.host is None or redis_config.port is None:
+            raise ConnectionError("No Redis host or port specified.")
+        # get redis instance backed by the process-wide connection pool
+        self._client = redis.asyncio.Redis(connection_pool=get_async_connection_pool(redis_config))
+        # callbacks invoked with the effective changes of each preference update
+        self._preference_listeners: list[Callable[[PreferenceChange], Optional[Awaitable[None]]]] = []
+        self._credentials_cache = credentials_cache
+        self._preference_cache = preference_cache
+        # quote IDs of the bits of the preference bitmaps
+        self.quote_ids = QuoteIdMapping() if quote_ids is None else quote_ids
+        # atomic preference mutations by script source
+        self._scripts = {script: self._client.register_script(script) for script in USER_STORE_SCRIPTS}
+
+    async def _execute(self, commands: Sequence[Command | ScriptCall], transaction: bool = False) -> list[Any]:
+        """
+        Sends commands built by the commands module with a single round trip.
+        :param commands: Commands and script calls.
+        :param transaction: Whether to wrap the commands in a MULTI/EXEC transaction.
+        :return: Results of the commands.
+        """
+        if not commands:
+            return []
+        async with self._client.pipeline(transaction=transaction) as pipe:
+            for command in commands:
+                if isinstance(command, ScriptCall):
+                    await self._scripts[command.script](keys=command.keys, args=command.args, client=pipe)
+                else:
+                    pipe.execute_command(*command)
+            return await pipe.execute()
+
+    async def ping(self) -> None:
+        """
+        Tests the connection.
+        :return: None
+        """
+        if not await self._client.ping():
+            raise ConnectionError("Cannot connect to Redis.")
+        logger.info('Connected to Redis.')
+
+    async def close(self) -> None:
+        """
+        Releases the client. Pooled connections stay open for other clients of the process.
+        :return: None
+        """
+        await self._client.aclose()
+
+    @property
+    def client(self) -> redis.asyncio.Redis:
+        """
+        Returns the asyncio Redis client, e.g. for structures derived from the user data.
+        :return: Redis client.
+        """
+        return self._client
+
+    def add_preference_listener(self, listener: Callable[[PreferenceChange], Optional[Awaitable[None]]]) -> None:
+        """
+        Registers a callback that is invoked with the effective changes after each preference update.
+        Coroutine functions are awaited, blocking callbacks run in a worker thread.
+        :param listener: Callback receiving the preference change.
+        :return: None
+        """
+        self._preference_listeners.append(listener)
+
+    async def _notify_preference_listeners(self, change: PreferenceChange) -> None:
+        """
+        Passes a preference change to all registered listeners. Failing listeners do not fail the update.
+        :param change: Effective preference change.
+        :return: None
+        """
+        if change.is_empty:
+            return
+        # do not wait for the invalidation from Redis to read the own writes
+        if self._preference_cache is not None:
+            self._preference_cache.invalidate(change.username)
+        for listener in self._preference_listeners:
+            try:
+                if inspect.iscoroutinefunction(listener):
+                    await listener(change)  # type: ignore
+                else:
+                    await asyncio.to_thread(listener, change)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception(f'Preference listener failed for user {change.username}.')
+
+    async def decode_bitmaps(self, bitmaps: Sequence[Optional[bytes]]) -> list[list[str]]:
+        """
+        Decodes preference bitmaps into the IDs of their quotes, see RedisUserStore.decode_bitmaps.
+        :param bitmaps: Preference bitmaps, None for missing keys.
+        :return: Quote IDs per bitmap.
+        """
+        positions = [bitmap_positions(bitmap) for bitmap in bitmaps]
+        if (start := self.quote_ids.missing_from(positions)) is not None:
+            self.quote_ids.extend(start, *(await self._execute(quote_ids_commands(start))))
+        return [self.quote_ids.decode(indices) for indices in positions]
+
+    async def get_common_likes(
+        self,
+        user: str,
+        likes: Optional[Sequence[int | str]] = None,
+        candidates: Optional[Sequence[str]] = None,
+    ) -> Counter[str]:
+        """
+        Counts the likes every other user has in common with the given user server-side, see
+        RedisUserStore.get_common_likes.
+        :param user: The username of the user for whom similar users are to be found.
+        :param likes: IDs of the quotes liked by the user to look up the candidates. Read from Redis if not given.
+        :param candidates: The usernames of the only users to count the common likes of, e.g. found by the MinHash
+            index, instead of all users of the likers index.
+        :return: Usernames mapped to the number of common likes.
+        """
+        if candidates is None:
+            if likes is None:
+                likes = (await self.get_user_preferences(user))[0]
+            candidates = parse_likers(user, await self._execute(likers_commands(likes)))
+        return parse_common_likes(
+            user, candidates, await self._execute(common_likes_commands(user, candidates), transaction=True)
+        )
+
+    async def get_most_similar_user(self, user: str, threshold: int = DEFAULT_SIMILAR_PREFERENCE) -> Optional[str]:
+        """
+        Get user with most similar preferences to the given user based on the intersection of their likes.
+        :param user: The username of the user for whom similar users are to be found.
+        :param threshold: Minimum number of common preferences to consider a user similar.
+        :return: username for user with most similar preferences.
+        """
+        return select_most_similar_user(await self.get_common_likes(user), threshold)
+
+    async def get_user_credentials(self) -> dict[Any, Any]:
+        """
+        Get all registered users and their credentials from the users index with a single command.
+        The index is built from the credentials hashes once if it does not exist yet.
+        :return: usernames mapped to their corresponding credentials.
+        """
+        if users_index := (await self._execute(users_index_commands()))[0]:
+            return parse_users_index(users_index)
+        credential_hashes = [
+            credential_hash
+            async for credential_hash in self._client.scan_iter(match=CredentialsKey(username='*').key, _type='hash')
+        ]
+        user_credentials = parse_credentials(
+            credential_hashes, await self._execute(credentials_commands(credential_hashes))
+        )
+        await self._execute(index_users_commands(user_credentials))
+        return user_credentials
+
+    async def register_user(self, username: str, credentials: Mapping[str | bytes, bytes | float | int | str]) -> bool:
+        """
+        Creates a new hash for a new user and adds the user to the users index.
+        :param username: The username of the new user.
+        :param credentials: The credentials of the new user.
+        :return: True if all fields were added, else False.
+        """
+        added_fields, _ = await self._execute(register_user_commands(username, credentials), transaction=True)
+        if self._credentials_cache is not None:
+            self._credentials_cache.invalidate()
+        return added_fields == len(credentials)
+
+    async def get_user_preferences(self, username: str) -> tuple[list[str], list[str]]:
+        """
+        Returns all preferences for a given user with a single round trip.
+        :param username: The username of the logged-in user.
+        :return: Lists of liked and disliked quotes' IDs.
+        """
+        return (await self.get_user_preferences_batch([username]))[0]
+
+    async def get_user_preferences_batch(self, usernames: Sequence[str]) -> list[tuple[list[str], list[str]]]:
+        """
+        Returns all preferences for several users with a single round trip.
+        :param usernames: The usernames of the users.
+        :return: Lists of liked and disliked quotes' IDs per user.
+        """
+        return pair_preferences(await self.decode_bitmaps(await self._execute(preferences_commands(usernames))))
+
+    async def get_recent_preferences_batch(
+        self, usernames: Sequence[str], limit: Optional[int] = None
+    ) -> list[tuple[list[str], list[str]]]:
+        """
+        Returns the most recently set preferences for several users with a single round trip.
+        Preferences set before their times were recorded, e.g. scraped likes, are left out.
+        :param usernames: The usernames of the users.
+        :param limit: Max number of likes and dislikes per user, None for all.
+        :return: Lists of liked and disliked quotes' IDs per user, most recent first.
+        """
+        return parse_preferences(await self._execute(recent_preferences_commands(usernames, limit=limit)))
+
+    async def get_like_counts(self, usernames: Sequence[str]) -> list[int]:
+        """
+        Returns the number of liked quotes of several users with a single round trip.
+        :param usernames: The usernames of the users.
+        :return: Number of likes per user.
+        """
+        return await self._execute(like_counts_commands(usernames))
+
+    async def store_recommendations(
+        self, recommendations: Mapping[str, PrecomputedRecommendations], ttl: int = DEFAULT_RECOMMENDATIONS_TTL
+    ) -> None:
+        """
+        Stores precomputed recommendations of several users with a single round trip.
+        :param recommendations: Usernames mapped to their recommendations.
+        :param ttl: Seconds after which the recommendations expire.
+        :return: None
+        """
+        await self._execute(store_recommendations_commands(recommendations, ttl))
+
+    async def get_recommendations(self, username: str) -> Optional[PrecomputedRecommendations]:
+        """
+        Returns the precomputed recommendations of a user.
+        :param username: The username of the logged-in user.
+        :return: Precomputed recommendations or None if there are none or they expired.
+        """
+        return parse_recommendations(*(await self._execute(recommendations_commands(username))))
+
+    async def store_likes_batch(self, user_ids: Sequence[str], quote_id: str | int) -> None:
+        """
+        Stores the likes of several users for a given quote ID in Redis.
+        :param user_ids: List of user IDs.
+        :param quote_id: The ID of the quote (point) which should be stored for each user.
+        :return: None
+        """
+        if not user_ids:
+            return
+        usernames = [str(user_id) for user_id in user_ids]
+        await self._execute([store_likes_call(usernames, str(quote_id))])
+        if self._preference_cache is not None:
+            for username in usernames:
+                self._preference_cache.invalidate(username)
+
+    async def set_user_preferences(
+        self,
+        username: str,
+        likes: Optional[Sequence[int | str] | set[int | str]] = None,
+        dislikes: Optional[Sequence[int | str] | set[int | str]] = None,
+    ) -> bool:
+        """
+        Sets the preferences of the logged-in user.
+        :param username: The username of the logged-in user.
+        :param likes: List of quote IDs of liked quotes.
+        :param dislikes: List of quote IDs of disliked quotes.
+        :return: Whether operation was successful
+        """
+        await self._apply_preference_updates(username, preference_updates(likes=likes or (), dislikes=dislikes or ()))
+        return True
+
+    async def _apply_preference_updates(self, username: str, updates: Sequence[PreferenceUpdate]) -> PreferenceChange:
+        """
+        Applies preference updates of a user in a single transaction and round trip, see
+        RedisUserStore._apply_preference_updates.
+        :param username: The username of the logged-in user.
+        :param updates: Preference updates.
+        :return: Effective preference change.
+        """
+        change = parse_preference_change(
+            username, updates, await self._execute([update.call(username) for update in updates], transaction=True)
+        )
+        await self._notify_preference_listeners(change)
+        return change
+
+    async def delete_user_preference(
+        self,
+        username: str,
+        likes: Optional[Sequence[int | str] | set[int | str]] = None,
+        dislikes: Optional[Sequence[int | str] | set[int | str]] = None,
+    ) -> Optional[bool]:
+        """
+        Removes preferences of the logged-in user if they are set.
+        :param username: The username of the logged-in user.
+        :param likes: List of quote IDs of liked quotes.
+        :param dislikes: List of quote IDs of disliked quotes.
+        :return: Whether the operation was successful.
+        """
+        if likes and dislikes:
+            raise ValueError('Can only specify likes or dislikes to delete, not both.')
+        if (not likes) and (not dislikes):
+            raise ValueError('Either specify likes or dislikes.')
+        change = await self._apply_preference_updates(
+            username, preference_updates(unset_likes=likes or (), unset_dislikes=dislikes or ())
+        )
+        return not change.is_empty
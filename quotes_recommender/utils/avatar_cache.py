@@ -0,0 +1,330 @@
+"""
+Disk cache of the author avatars as thumbnails, and a job warming it with the avatars of all quotes.
+
+Usage: python -m quotes_recommender.utils.avatar_cache --workers 8
+"""
+
+import argparse
+import hashlib
+import http.client
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from PIL import Image
+
+from quotes_recommender.core.constants import (
+    AVATAR_CACHE_LOW_WATERMARK,
+    AVATAR_CACHE_MAX_BYTES,
+    AVATAR_CACHE_PATH,
+    AVATAR_FETCH_TIMEOUT,
+    AVATAR_MAX_BYTES,
+    AVATAR_MAX_PENDING,
+    AVATAR_RETRY_INTERVAL,
+    AVATAR_THUMBNAIL_SIZE,
+    AVATAR_URL_SCHEMES,
+    AVATAR_WARM_WORKERS,
+    TXT_ENCODING,
+)
+from quotes_recommender.vector_store.constants import DEFAULT_SCROLL_BATCH_SIZE
+from quotes_recommender.vector_store.vector_store_singleton import (
+    QdrantVectorStoreSingleton,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AvatarCache:
+    """
+    Disk cache of avatar thumbnails, so that quote cards do not fetch full-size images from remote hosts on every
+    render. Thumbnails are content-addressed, so an avatar shared by several authors (e.g. the default avatar) is
+    stored once, and an index maps the hash of each image URL to its thumbnail. The total size of the thumbnails and
+    the index is capped by evicting the least recently read thumbnails first, with their modification times as
+    recency, together with their index entries. Only http(s) URLs are downloaded.
+    """
+
+    def __init__(
+        self,
+        path: Path = AVATAR_CACHE_PATH,
+        max_bytes: int = AVATAR_CACHE_MAX_BYTES,
+        thumbnail_size: int = AVATAR_THUMBNAIL_SIZE,
+        timeout: float = AVATAR_FETCH_TIMEOUT,
+        retry_interval: float = AVATAR_RETRY_INTERVAL,
+        executor: Optional[Executor] = None,
+        max_pending: int = AVATAR_MAX_PENDING,
+        max_avatar_bytes: int = AVATAR_MAX_BYTES,
+    ) -> None:
+        """
+        Init avatar cache.
+        :param path: Directory of the cache.
+        :param max_bytes: Max total size of the thumbnails in bytes.
+        :param thumbnail_size: Max width and height of the thumbnails in pixels.
+        :param timeout: Seconds to wait for a download.
+        :param retry_interval: Seconds after which the download of a broken avatar is retried.
+        :param executor: Executor downloading missing avatars in the background, None to only read the cache.
+        :param max_pending: Max number of background downloads, further missing avatars are scheduled on later reads.
+        :param max_avatar_bytes: Max size of a downloaded avatar in bytes, larger avatars are treated as broken.
+        """
+        self._thumbnails_path = path / 'thumbnails'
+        self._index_path = path / 'index'
+        self._thumbnails_path.mkdir(parents=True, exist_ok=True)
+        self._index_path.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._thumbnail_size = thumbnail_size
+        self._timeout = timeout
+        self._retry_interval = retry_interval
+        self._executor = executor
+        self._max_pending = max_pending
+        self._max_avatar_bytes = max_avatar_bytes
+        self._lock = threading.Lock()
+        # index entries hold the names of their thumbnails
+        self._size = sum(file.stat().st_size for file in self._thumbnails_path.glob('*.jpg')) + sum(
+            file.stat().st_size for file in self._index_path.glob('[0-9a-f]*')
+        )
+        # URLs that are being downloaded and URLs mapped to the time their download failed, oldest failure first
+        self._pending: set[str] = set()
+        self._failed: dict[str, float] = {}
+        self._placeholder: Optional[bytes] = None
+
+    @property
+    def placeholder(self) -> bytes:
+        """
+        Returns a neutral thumbnail displayed instead of missing or broken avatars.
+        :return: Thumbnail bytes.
+        """
+        if self._placeholder is None:
+            buffer = io.BytesIO()
+            Image.new('RGB', (self._thumbnail_size, self._thumbnail_size), color=(222, 222, 222)).save(
+                buffer, format='PNG'
+            )
+            self._placeholder = buffer.getvalue()
+        return self._placeholder
+
+    def get(self, url: str) -> Optional[bytes]:
+        """
+        Returns the thumbnail of an avatar without blocking. Missing avatars are downloaded in the background.
+        :param url: URL of the avatar.
+        :return: Thumbnail bytes, None if the avatar is not cached yet or broken.
+        """
+        if (thumbnail := self._read(url)) is None and self._executor is not None:
+            self._schedule(url)
+        return thumbnail
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        """
+        Returns the thumbnail of an avatar, downloading and resizing it if it is not cached yet.
+        :param url: URL of the avatar.
+        :return: Thumbnail bytes, None if the avatar is broken.
+        """
+        if (thumbnail := self._read(url)) is not None:
+            return thumbnail
+        if urllib.parse.urlsplit(url).scheme not in AVATAR_URL_SCHEMES:
+            logger.warning(f'Cannot cache avatar {url}: unsupported URL scheme.')
+            self._record_failure(url)
+            return None
+        try:
+            with urllib.request.urlopen(url, timeout=self._timeout) as response:
+                image = Image.open(io.BytesIO(self._read_body(response)))
+                image.thumbnail((self._thumbnail_size, self._thumbnail_size))
+                buffer = io.BytesIO()
+                image.convert('RGB').save(buffer, format='JPEG', quality=85)
+        # download errors and unreadable images are OSErrors
+        except (OSError, ValueError, Image.DecompressionBombError) as error:
+            logger.warning(f'Cannot cache avatar {url}: {error!r}')
+            self._record_failure(url)
+            return None
+        thumbnail = buffer.getvalue()
+        self._store(url, thumbnail)
+        return thumbnail
+
+    def warm(self, urls: Iterable[str], workers: int = AVATAR_WARM_WORKERS) -> int:
+        """
+        Downloads the avatars that are not cached yet, e.g. after quotes were ingested.
+        :param urls: URLs of the avatars.
+        :param workers: Number of concurrent downloads.
+        :return: Number of cached avatars.
+        """
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='avatars') as executor:
+            return sum(thumbnail is not None for thumbnail in executor.map(self.fetch, set(urls)))
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        """
+        Hashes data for addressing index entries and thumbnails.
+        :param data: Data to hash.
+        :return: Hex digest.
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    def _read(self, url: str) -> Optional[bytes]:
+        """
+        Reads the thumbnail of an avatar from disk and marks it as recently read.
+        :param url: URL of the avatar.
+        :return: Thumbnail bytes, None if the avatar is not cached.
+        """
+        index_file = self._index_path / self._digest(url.encode(TXT_ENCODING))
+        try:
+            thumbnail_file = self._thumbnails_path / index_file.read_text(encoding=TXT_ENCODING)
+            thumbnail = thumbnail_file.read_bytes()
+            os.utime(thumbnail_file)
+        except FileNotFoundError:
+            return None
+        return thumbnail
+
+    def _read_body(self, response: http.client.HTTPResponse) -> bytes:
+        """
+        Reads the body of an avatar download, rejecting avatars larger than the max size without reading them fully.
+        :param response: Response of the download.
+        :return: Body bytes.
+        """
+        content_length = response.headers.get('Content-Length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self._max_avatar_bytes:
+            raise ValueError(f'avatar of {content_length} bytes exceeds {self._max_avatar_bytes} bytes')
+        # read one byte more than allowed to detect larger bodies without a (correct) Content-Length
+        body = response.read(self._max_avatar_bytes + 1)
+        if len(body) > self._max_avatar_bytes:
+            raise ValueError(f'avatar exceeds {self._max_avatar_bytes} bytes')
+        return body
+
+    def _record_failure(self, url: str) -> None:
+        """
+        Records a failed download, so that it is not retried before the retry interval, and forgets the failures that
+        may be retried already, so that the failures do not accumulate.
+        :param url: URL of the avatar.
+        :return: None
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._failed:
+                failed_url, failed_at = next(iter(self._failed.items()))
+                if now - failed_at < self._retry_interval:
+                    break
+                del self._failed[failed_url]
+            # re-insert the URL, so that the failures stay ordered by time
+            self._failed.pop(url, None)
+            self._failed[url] = now
+
+    def _schedule(self, url: str) -> None:
+        """
+        Downloads an avatar in the background unless it is downloaded already, failed recently or too many downloads
+        are pending.
+        :param url: URL of the avatar.
+        :return: None
+        """
+        with self._lock:
+            failed_at = self._failed.get(url)
+            if url in self._pending or (failed_at is not None and time.monotonic() - failed_at < self._retry_interval):
+                return
+            if len(self._pending) >= self._max_pending:
+                return
+            self._pending.add(url)
+        self._executor.submit(self._fetch_in_background, url)  # type: ignore
+
+    def _fetch_in_background(self, url: str) -> None:
+        """
+        Downloads an avatar and forgets that it is pending.
+        :param url: URL of the avatar.
+        :return: None
+        """
+        try:
+            self.fetch(url)
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    @staticmethod
+    def _write(file: Path, data: bytes) -> None:
+        """
+        Writes a file atomically, so that readers never see partial files.
+        :param file: Path of the file.
+        :param data: Content of the file.
+        :return: None
+        """
+        descriptor, temp_path = tempfile.mkstemp(dir=file.parent, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, file)
+
+    def _store(self, url: str, thumbnail: bytes) -> None:
+        """
+        Stores the thumbnail of an avatar and evicts the least recently read thumbnails if the cache is full.
+        :param url: URL of the avatar.
+        :param thumbnail: Thumbnail bytes.
+        :return: None
+        """
+        thumbnail_name = f'{self._digest(thumbnail)}.jpg'
+        thumbnail_file = self._thumbnails_path / thumbnail_name
+        index_file = self._index_path / self._digest(url.encode(TXT_ENCODING))
+        with self._lock:
+            if not thumbnail_file.exists():
+                self._write(thumbnail_file, thumbnail)
+                self._size += len(thumbnail)
+            if not index_file.exists():
+                self._size += len(thumbnail_name)
+            self._write(index_file, thumbnail_name.encode(TXT_ENCODING))
+            if self._size > self._max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """
+        Deletes the least recently read thumbnails until the cache is shrunk to its low watermark, and the index
+        entries of the deleted thumbnails.
+        :return: None
+        """
+        files = sorted(
+            ((file.stat(), file) for file in self._thumbnails_path.glob('*.jpg')),
+            key=lambda entry: entry[0].st_mtime,
+        )
+        # thumbnails mapped to the index entries pointing to them
+        index: dict[str, list[Path]] = {}
+        for index_file in self._index_path.glob('[0-9a-f]*'):
+            try:
+                index.setdefault(index_file.read_text(encoding=TXT_ENCODING), []).append(index_file)
+            except FileNotFoundError:
+                continue
+        evicted = 0
+        for stat, file in files:
+            if self._size <= self._max_bytes * AVATAR_CACHE_LOW_WATERMARK:
+                break
+            file.unlink(missing_ok=True)
+            self._size -= stat.st_size
+            for index_file in index.get(file.name, []):
+                index_file.unlink(missing_ok=True)
+                self._size -= len(file.name)
+            evicted += 1
+        logger.info(f'Evicted {evicted} avatars, {self._size} bytes are cached.')
+
+
+def main() -> None:
+    """Caches the avatars of all quotes of the configured vector store."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=AVATAR_WARM_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_SCROLL_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    vector_store = QdrantVectorStoreSingleton().vector_store
+    avatar_cache = AvatarCache()
+    avatars, offset = 0, None
+    while True:
+        points, offset = vector_store.scroll_points(
+            payload_attributes=['avatar_img'], limit=args.batch_size, offset=offset
+        )
+        avatars += avatar_cache.warm(
+            (point.payload['avatar_img'] for point in points if point.payload and point.payload.get('avatar_img')),
+            workers=args.workers,
+        )
+        logger.info(f'Cached {avatars} avatars.')
+        if offset is None:
+            break
+
+
+if __name__ == '__main__':
+    main()
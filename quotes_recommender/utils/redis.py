@@ -1,5 +1,8 @@
+import threading
 from typing import Optional
 
+import redis
+import redis.asyncio
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from yarl import URL
@@ -16,6 +19,9 @@ class RedisConfig(BaseSettings):
     host: str = Field(min_length=0, default='0.0.0.0')
     port: int = Field(default=6379)
     db: int = Field(ge=0, default=0)
+    max_connections: int = Field(ge=1, default=64)
+    pool_timeout: Optional[float] = Field(ge=0, default=20.0)
+    socket_timeout: Optional[float] = Field(gt=0, default=None)
 
     @property
     def redis_url(self) -> URL:
@@ -25,6 +31,23 @@ class RedisConfig(BaseSettings):
         """
         return URL(f"redis://{self.host}:{self.port}")
 
+    @property
+    def pool_kwargs(self) -> dict:
+        """
+        Returns the keyword arguments of the connection pools.
+        :return: Connection pool settings.
+        """
+        return {
+            'host': str(self.host),
+            'port': int(self.port),
+            'db': self.db,
+            'password': self.password,
+            'username': self.user,
+            'max_connections': self.max_connections,
+            'timeout': self.pool_timeout,
+            'socket_timeout': self.socket_timeout,
+        }
+
     @property
     def redis_url_with_creds(self) -> URL:
         """
@@ -32,3 +55,36 @@ class RedisConfig(BaseSettings):
         :return: yarl URl object with credentials
         """
         return self.redis_url.with_user(self.user).with_password(self.password)
+
+
+_pools_lock = threading.Lock()
+_pools: dict[tuple, redis.BlockingConnectionPool] = {}
+_async_pools: dict[tuple, redis.asyncio.BlockingConnectionPool] = {}
+
+
+def get_connection_pool(redis_config: RedisConfig) -> redis.BlockingConnectionPool:
+    """
+    Returns the process-wide connection pool of a Redis config, so that all clients share at most max_connections
+    connections. Callers wait up to pool_timeout seconds for a free connection instead of opening more.
+    :param redis_config: Redis config.
+    :return: Connection pool.
+    """
+    key = tuple(sorted(redis_config.pool_kwargs.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = redis.BlockingConnectionPool(**redis_config.pool_kwargs)
+        return _pools[key]
+
+
+def get_async_connection_pool(redis_config: RedisConfig) -> redis.asyncio.BlockingConnectionPool:
+    """
+    Returns the process-wide asyncio connection pool of a Redis config.
+    Asyncio connections are bound to the event loop that opened them, so the pool must be used from one event loop.
+    :param redis_config: Redis config.
+    :return: Asyncio connection pool.
+    """
+    key = tuple(sorted(redis_config.pool_kwargs.items()))
+    with _pools_lock:
+        if key not in _async_pools:
+            _async_pools[key] = redis.asyncio.BlockingConnectionPool(**redis_config.pool_kwargs)
+        return _async_pools[key]
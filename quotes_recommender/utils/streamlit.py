@@ -1,14 +1,38 @@
 import json
 import logging
-from typing import Optional, Sequence
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterator, Optional, Sequence
 
 import streamlit as st
 from qdrant_client.http.models import Record, ScoredPoint
 
-from quotes_recommender.core.constants import TAG_MAPPING_PATH, TXT_ENCODING
+from quotes_recommender.core.constants import (
+    AVATAR_DOWNLOAD_WORKERS,
+    NEIGHBOUR_GRAPH_PATH,
+    PREFERENCE_BUFFER_SIZE,
+    PREFERENCE_BUFFER_STATE_KEY,
+    PREFERENCE_FLUSH_INTERVAL,
+    PREFETCH_STATE_KEY,
+    PREFETCH_WORKERS,
+    QUOTES_CHUNK_SIZE,
+    RECOMMENDATION_WORKERS,
+    TAG_MAPPING_PATH,
+    TXT_ENCODING,
+)
 from quotes_recommender.core.models import UserPreference
 from quotes_recommender.ml_models.sentence_encoder import SentenceBERT
+from quotes_recommender.recommender.prefetch import RecommendationPrefetcher
+from quotes_recommender.user_store.user_profile_singleton import (
+    UserProfileStoreSingleton,
+)
 from quotes_recommender.user_store.user_store_singleton import RedisUserStoreSingleton
+from quotes_recommender.utils.avatar_cache import AvatarCache
+from quotes_recommender.vector_store.neighbour_graph import NeighbourGraph
+from quotes_recommender.vector_store.vector_store_singleton import (
+    QdrantVectorStoreSingleton,
+)
 
 user_store = RedisUserStoreSingleton().user_store
 logger = logging.getLogger(__name__)
@@ -35,6 +59,17 @@ def load_sentence_bert() -> SentenceBERT:
     return sentence_bert
 
 
+@st.cache_resource(ttl=3600)
+def load_neighbour_graph() -> Optional[NeighbourGraph]:
+    """
+    Loading the precomputed item-item neighbour graph, reloaded hourly in order to pick up rebuilds.
+    :return: Neighbour graph or None if it has not been built yet.
+    """
+    if not (NEIGHBOUR_GRAPH_PATH / 'meta.json').exists():
+        return None
+    return NeighbourGraph(NEIGHBOUR_GRAPH_PATH)
+
+
 def click_search_button() -> None:
     """
     Auxiliary function to add statefulness to the search button.
@@ -54,6 +89,394 @@ def get_tag_filters() -> list[str]:
     return list(set(tag_mapping_file.values()))
 
 
+@st.cache_resource
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool shared by all sessions for fetching data in the background.
+    :return: Thread pool executor.
+    """
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='prefetch')
+
+
+@st.cache_resource
+def get_recommendation_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool shared by all sessions for fetching the branches of the recommendations concurrently.
+    :return: Thread pool executor.
+    """
+    return ThreadPoolExecutor(max_workers=RECOMMENDATION_WORKERS, thread_name_prefix='recommendations')
+
+
+@st.cache_resource
+def get_recommendation_prefetcher() -> RecommendationPrefetcher:
+    """
+    Prefetcher shared by all sessions for computing the recommendations of users in the background at login.
+    :return: Recommendation prefetcher.
+    """
+    return RecommendationPrefetcher(
+        user_store=user_store,
+        vector_store=QdrantVectorStoreSingleton().vector_store,
+        profile_store=UserProfileStoreSingleton().profile_store,
+        executor=get_prefetch_executor(),
+    )
+
+
+def prefetch_recommendations() -> None:
+    """
+    Starts prefetching the recommendations of the logged-in user once per login.
+    :return: None
+    """
+    if st.session_state.get(PREFETCH_STATE_KEY) != st.session_state['username']:
+        cancel_recommendations_prefetch()
+        get_recommendation_prefetcher().prefetch(st.session_state['username'], neighbour_graph=load_neighbour_graph())
+        st.session_state[PREFETCH_STATE_KEY] = st.session_state['username']
+
+
+def cancel_recommendations_prefetch() -> None:
+    """
+    Cancels the running prefetch of the user who logged in with the session, e.g. after a logout.
+    :return: None
+    """
+    if (username := st.session_state.pop(PREFETCH_STATE_KEY, None)) is not None:
+        get_recommendation_prefetcher().cancel(username)
+
+
+@st.cache_resource
+def get_avatar_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool shared by all sessions for downloading missing avatars, so that slow avatar hosts do not hold up the
+    prefetches of pages and recommendations.
+    :return: Thread pool executor.
+    """
+    return ThreadPoolExecutor(max_workers=AVATAR_DOWNLOAD_WORKERS, thread_name_prefix='avatars')
+
+
+@st.cache_resource
+def get_avatar_cache() -> AvatarCache:
+    """
+    Avatar thumbnail cache shared by all sessions, downloading missing avatars on their own threads.
+    :return: Avatar cache.
+    """
+    return AvatarCache(executor=get_avatar_executor())
+
+
+class ScrollPagination:
+    """Cursor-based pagination over scroll results that prefetches the next page in the background."""
+
+    def __init__(
+        self, fetch_page: Callable[[Optional[Any]], tuple[list[Record], Optional[Any]]], filters: Hashable
+    ) -> None:
+        """
+        Init pagination state.
+        :param fetch_page: Function returning the page starting at the given offset and the next page offset.
+        :param filters: Filters the pages were fetched with. A change of filters invalidates the cursor.
+        """
+        self.fetch_page = fetch_page
+        self.filters = filters
+        # start offsets of all pages visited so far, the first page has no offset
+        self.offsets: list[Optional[Any]] = [None]
+        self.page: int = 0
+        self.has_next_page: bool = False
+        # pending or fetched pages by page number, only the current and the next page are kept, as visited pages can be
+        # fetched again from their offsets
+        self._pages: dict[int, Future[tuple[list[Record], Optional[Any]]]] = {}
+
+    def _submit(self, page: int) -> None:
+        """
+        Fetches the given page in the background unless it was already requested.
+        :param page: Page number.
+        :return: None
+        """
+        if page not in self._pages:
+            self._pages[page] = get_prefetch_executor().submit(self.fetch_page, self.offsets[page])
+
+    def get_current_page(self) -> list[Record]:
+        """
+        Returns the points of the current page and prefetches the subsequent one.
+        :return: Points of the current page.
+        """
+        self._submit(self.page)
+        try:
+            points, next_offset = self._pages[self.page].result()
+        except Exception:
+            # forget failed request in order to retry on the next rerun
+            del self._pages[self.page]
+            raise
+        self.has_next_page = next_offset is not None
+        if self.has_next_page:
+            # remember cursor of the next page
+            if len(self.offsets) == self.page + 1:
+                self.offsets.append(next_offset)
+            # prefetch next page while the user rates the current one
+            self._submit(self.page + 1)
+        self._forget_other_pages()
+        return points
+
+    def _forget_other_pages(self) -> None:
+        """
+        Drops the pages other than the current and the next one, so that the session does not hold all visited pages.
+        Fetches of dropped pages that did not start yet are cancelled.
+        :return: None
+        """
+        for page in [page for page in self._pages if page not in (self.page, self.page + 1)]:
+            self._pages.pop(page).cancel()
+
+    def next_page(self) -> None:
+        """
+        Moves the cursor to the next page.
+        :return: None
+        """
+        if self.has_next_page:
+            self.page += 1
+
+    def previous_page(self) -> None:
+        """
+        Moves the cursor to the previous page.
+        :return: None
+        """
+        self.page = max(0, self.page - 1)
+
+
+def get_scroll_pagination(
+    state_key: str,
+    filters: Hashable,
+    fetch_page: Callable[[Optional[Any]], tuple[list[Record], Optional[Any]]],
+) -> ScrollPagination:
+    """
+    Gets the pagination of the session from the session state. A new pagination is started if filters changed.
+    :param state_key: Session state key of the pagination.
+    :param filters: Filters that are currently set.
+    :param fetch_page: Function returning the page starting at the given offset and the next page offset.
+    :return: Pagination of the session.
+    """
+    pagination: Optional[ScrollPagination] = st.session_state.get(state_key)
+    if pagination is None or pagination.filters != filters:
+        pagination = ScrollPagination(fetch_page=fetch_page, filters=filters)
+        st.session_state[state_key] = pagination
+    return pagination
+
+
+class PreferenceBuffer:
+    """
+    Write-behind buffer of the preference toggles of a session. Toggles update the session's view of the preferences
+    right away, so quotes render with their new ratings without a rerun, and are written to Redis in a single batched
+    call once the flush interval passed, the buffer is full or the user navigates to another page.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        page: str,
+        flush_interval: float = PREFERENCE_FLUSH_INTERVAL,
+        max_size: int = PREFERENCE_BUFFER_SIZE,
+    ) -> None:
+        """
+        Init preference buffer with the preferences stored in Redis.
+        :param username: The username of the logged-in user.
+        :param page: Page the preferences are rated on.
+        :param flush_interval: Seconds after the first buffered toggle at which the buffer is flushed.
+        :param max_size: Number of buffered toggles at which the buffer is flushed right away.
+        """
+        self.username = username
+        self.page = page
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        likes, dislikes = user_store.get_user_preferences(username)
+        # stored ratings of quote IDs, True for likes and False for dislikes
+        self._stored: dict[str, bool] = {**dict.fromkeys(dislikes, False), **dict.fromkeys(likes, True)}
+        # buffered ratings of quote IDs, None unsets the stored rating
+        self._pending: dict[str, Optional[bool]] = {}
+        self._pending_since: Optional[float] = None
+
+    def get_rating(self, quote_id: int | str) -> Optional[bool]:
+        """
+        Returns the rating of a quote including buffered toggles.
+        :param quote_id: ID of the quote.
+        :return: True for a like, False for a dislike, None if the quote is not rated.
+        """
+        quote_id = str(quote_id)
+        return self._pending[quote_id] if quote_id in self._pending else self._stored.get(quote_id)
+
+    @property
+    def likes(self) -> list[str]:
+        """
+        Returns the liked quotes including buffered toggles.
+        :return: IDs of the liked quotes.
+        """
+        return [quote_id for quote_id, rating in {**self._stored, **self._pending}.items() if rating]
+
+    @property
+    def dislikes(self) -> list[str]:
+        """
+        Returns the disliked quotes including buffered toggles.
+        :return: IDs of the disliked quotes.
+        """
+        return [quote_id for quote_id, rating in {**self._stored, **self._pending}.items() if rating is False]
+
+    @property
+    def ratings(self) -> list[UserPreference]:
+        """
+        Returns the ratings including buffered toggles, e.g. in order to display them.
+        :return: User preferences.
+        """
+        return [UserPreference(id=quote_id, like=True) for quote_id in self.likes] + [
+            UserPreference(id=quote_id, like=False) for quote_id in self.dislikes
+        ]
+
+    @property
+    def is_due(self) -> bool:
+        """
+        Whether the buffered toggles have to be written to Redis.
+        :return: True if the buffer is full or the flush interval passed since the first buffered toggle.
+        """
+        return self._pending_since is not None and (
+            len(self._pending) >= self.max_size or time.monotonic() - self._pending_since >= self.flush_interval
+        )
+
+    def record(self, quote_ids: Sequence[int | str], likes: Sequence[int | str], dislikes: Sequence[int | str]) -> None:
+        """
+        Buffers the ratings of displayed quotes that differ from the current ratings. Toggling a rating back cancels the
+        buffered toggle.
+        :param quote_ids: IDs of the displayed quotes.
+        :param likes: IDs of the displayed quotes that are liked.
+        :param dislikes: IDs of the displayed quotes that are disliked.
+        :return: None
+        """
+        like_ids, dislike_ids = {str(quote_id) for quote_id in likes}, {str(quote_id) for quote_id in dislikes}
+        for quote_id in map(str, quote_ids):
+            rating = True if quote_id in like_ids else False if quote_id in dislike_ids else None
+            if rating == self.get_rating(quote_id):
+                continue
+            if rating == self._stored.get(quote_id):
+                del self._pending[quote_id]
+            else:
+                self._pending[quote_id] = rating
+        if not self._pending:
+            self._pending_since = None
+        elif self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def flush(self) -> bool:
+        """
+        Writes the buffered toggles to Redis in a single batched call. Failed toggles stay buffered.
+        :return: Whether the operation was successful.
+        """
+        if not self._pending:
+            return True
+        updates: dict[str, list[str]] = {'likes': [], 'dislikes': [], 'unset_likes': [], 'unset_dislikes': []}
+        for quote_id, rating in self._pending.items():
+            if rating is None:
+                updates['unset_likes' if self._stored[quote_id] else 'unset_dislikes'].append(quote_id)
+            else:
+                updates['likes' if rating else 'dislikes'].append(quote_id)
+        if not user_store.apply_user_preferences(self.username, **updates):
+            return False
+        for quote_id, rating in self._pending.items():
+            if rating is None:
+                del self._stored[quote_id]
+            else:
+                self._stored[quote_id] = rating
+        self._pending.clear()
+        self._pending_since = None
+        return True
+
+    def flush_if_due(self) -> bool:
+        """
+        Writes the buffered toggles to Redis if they are due.
+        :return: Whether no write failed.
+        """
+        return self.flush() if self.is_due else True
+
+
+def get_preference_buffer(page: str) -> PreferenceBuffer:
+    """
+    Gets the preference buffer of the logged-in user from the session state. If the user navigated from another page
+    or logged in as another user, the previous buffer is flushed and the preferences are loaded again.
+    :param page: Page the preferences are rated on.
+    :return: Preference buffer of the session.
+    """
+    buffer: Optional[PreferenceBuffer] = st.session_state.get(PREFERENCE_BUFFER_STATE_KEY)
+    if buffer is not None and buffer.page == page and buffer.username == st.session_state['username']:
+        return buffer
+    flush_preference_buffer()
+    buffer = PreferenceBuffer(username=st.session_state['username'], page=page)
+    st.session_state[PREFERENCE_BUFFER_STATE_KEY] = buffer
+    return buffer
+
+
+def flush_preference_buffer() -> None:
+    """
+    Writes the toggles buffered by the session to Redis, e.g. before the preferences are read from Redis.
+    :return: None
+    """
+    buffer: Optional[PreferenceBuffer] = st.session_state.get(PREFERENCE_BUFFER_STATE_KEY)
+    if buffer is not None and not buffer.flush():
+        st.toast('Failed to save preferences. Please try again later.', icon='🕠')
+
+
+@st.fragment(run_every=PREFERENCE_FLUSH_INTERVAL)
+def flush_preference_buffer_when_due() -> None:
+    """
+    Periodically writes the toggles buffered by the session to Redis once they are due, without rerunning the page.
+    :return: None
+    """
+    buffer: Optional[PreferenceBuffer] = st.session_state.get(PREFERENCE_BUFFER_STATE_KEY)
+    if buffer is not None and not buffer.flush_if_due():
+        st.toast('Failed to save preferences. Please try again later.', icon='🕠')
+
+
+@contextmanager
+def measure_render(page: str) -> Iterator[None]:
+    """
+    Logs the time it takes to render the quote cards of a page.
+    :param page: Name of the page.
+    :return: None
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(f'Rendered the quotes of page {page} in {(time.perf_counter() - start_time) * 1000:.1f}ms.')
+
+
+def get_chunk_limit(state_key: str, chunk_size: int = QUOTES_CHUNK_SIZE) -> int:
+    """
+    Gets the number of quotes of a list the session displays, starting with one chunk.
+    :param state_key: Session state key of the list's limit.
+    :param chunk_size: Number of quotes per chunk.
+    :return: Number of quotes to display.
+    """
+    return st.session_state.setdefault(state_key, chunk_size)
+
+
+def load_more(state_key: str, chunk_size: int = QUOTES_CHUNK_SIZE) -> None:
+    """
+    Displays another chunk of a list of quotes.
+    :param state_key: Session state key of the list's limit.
+    :param chunk_size: Number of quotes per chunk.
+    :return: None
+    """
+    st.session_state[state_key] = get_chunk_limit(state_key, chunk_size) + chunk_size
+
+
+def display_load_more_button(state_key: str, total: int, chunk_size: int = QUOTES_CHUNK_SIZE) -> None:
+    """
+    Displays a button loading the next chunk of a list of quotes if not all quotes are displayed yet.
+    :param state_key: Session state key of the list's limit.
+    :param total: Number of quotes of the list.
+    :param chunk_size: Number of quotes per chunk.
+    :return: None
+    """
+    if (limit := get_chunk_limit(state_key, chunk_size)) < total:
+        st.button(
+            label=f"Load more ({total - limit} left)",
+            key=f"{state_key}-load-more",
+            use_container_width=True,
+            on_click=load_more,
+            args=[state_key, chunk_size],  # type: ignore
+        )
+
+
 # pylint: disable=too-many-locals
 def display_quotes(
     quotes: Sequence[Record | ScoredPoint],
@@ -76,21 +499,17 @@ def display_quotes(
         )
     # init likes/dislikes accumulators
     likes, dislikes = [], []
+    # index ratings by quote ID, so that each quote's rating is looked up in constant time
+    ratings_by_id: dict[str, bool] = {str(rating.id): rating.like for rating in ratings or []}
     # display each quote
     for quote in quotes:
         if not quote.payload:
             raise ValueError(f"No payload found for quote {quote.id}")
         # init checkbox default values
         like_value, dislike_value = False, False
-        # search for corresponding rating by ID
-        if ratings:
-            # find corresponding rating based on ID
-            rating = next(filter(lambda r, quote_id=quote.id: r.id == quote_id, ratings), None)  # type: ignore
-            # if a rating was found
-            if rating:
-                # set corresponding values
-                like_value = rating.like
-                dislike_value = not rating.like
+        # if a rating was found, set corresponding values
+        if (like := ratings_by_id.get(str(quote.id))) is not None:
+            like_value, dislike_value = like, not like
         # construct quote container
         with st.container(border=True):
             left_quote_col, right_quote_col = st.columns(spec=[0.7, 0.3])
@@ -105,7 +524,9 @@ def display_quotes(
             # display image on right hand side
             with right_quote_col:
                 if img_link := quote.payload['avatar_img']:
-                    st.image(img_link, use_column_width=True)
+                    # serve the cached thumbnail, avatars that are not cached yet are downloaded in the background
+                    avatar_cache = get_avatar_cache()
+                    st.image(avatar_cache.get(img_link) or avatar_cache.placeholder, use_column_width=True)
             if display_buttons:
                 # create unique keys for each checkbox
                 like_key, dislike_key = f"{quote.id}-like", f"{quote.id}-dislike"
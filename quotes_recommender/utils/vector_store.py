@@ -0,0 +1,19 @@
+from pathlib import Path
+from typing import Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from quotes_recommender.core.constants import DATA_PATH, TXT_ENCODING
+
+
+class VectorStoreConfig(BaseSettings):
+    """Vector store backend settings config"""
+
+    model_config = SettingsConfigDict(env_prefix='VECTOR_STORE_', env_file_encoding=TXT_ENCODING)
+    backend: Literal['qdrant', 'numpy'] = Field(
+        default='qdrant', description="Qdrant server or in-process NumPy brute-force index."
+    )
+    numpy_path: Path = Field(
+        default=DATA_PATH / 'vector_store', description="Directory of the NumPy vector store collections."
+    )
@@ -1,7 +1,41 @@
 from typing import Final
 
+from qdrant_client.http.models import (
+    PayloadSchemaType,
+    TextIndexParams,
+    TextIndexType,
+    TokenizerType,
+)
+
 # Default settings
 DEFAULT_QUOTE_COLLECTION: Final[str] = 'quotes'
 DEFAULT_DISTANCE: Final[str] = 'Cosine'
 DEFAULT_EMBEDDING_SIZE: Final[int] = 768
 DEFAULT_PAYLOAD_INDEX: Final[str] = 'tags'
+# number of vectors scored at once by the NumPy vector store
+DEFAULT_BLOCK_SIZE: Final[int] = 65_536
+# number of vectors streamed per scroll request
+DEFAULT_SCROLL_BATCH_SIZE: Final[int] = 1_000
+# number of neighbours stored per quote and number of quotes multiplied at once when building the neighbour graph
+DEFAULT_NEIGHBOURS: Final[int] = 50
+DEFAULT_GRAPH_BLOCK_SIZE: Final[int] = 4_096
+# number of records kept in the payload cache of the Qdrant vector store
+DEFAULT_PAYLOAD_CACHE_SIZE: Final[int] = 10_000
+# seconds after which cached payloads expire, bounds staleness of quotes upserted by other processes (e.g. the scraper)
+DEFAULT_PAYLOAD_CACHE_TTL: Final[float] = 300.0
+# payload fields needed for displaying a quote
+DISPLAY_PAYLOAD_FIELDS: Final[list[str]] = ['author', 'avatar_img', 'tags', 'text']
+
+# Payload indexes required by the filters in use, mapped to their field schema
+PAYLOAD_INDEXES: Final[dict[str, PayloadSchemaType | TextIndexParams]] = {
+    # tag filters of the search and preferences pages
+    DEFAULT_PAYLOAD_INDEX: PayloadSchemaType.KEYWORD,
+    # author matching during data fusion
+    'author': PayloadSchemaType.KEYWORD,
+    # keyword filter of the preferences page
+    'text': TextIndexParams(
+        type=TextIndexType.TEXT, tokenizer=TokenizerType.WORD, min_token_len=2, max_token_len=20, lowercase=True
+    ),
+    # number of likes on goodreads
+    'likes': PayloadSchemaType.INTEGER,
+}
@@ -0,0 +1,16 @@
+from typing import Literal, Optional
+
+from pydantic import Field
+
+from quotes_recommender.core.models import ForbidExtraModel
+
+
+class PayloadIndexStatus(ForbidExtraModel):
+    """Class representing the state of a payload index of a collection."""
+
+    field_name: str = Field(description="The payload field the index is built on.")
+    field_type: str = Field(description="The schema type of the index (e.g., keyword, text, integer).")
+    status: Literal['present', 'created', 'recreated'] = Field(
+        description="Whether the index already existed, was created, or was re-created due to a schema mismatch."
+    )
+    indexed_points: Optional[int] = Field(default=None, description="Number of points covered by the index.")
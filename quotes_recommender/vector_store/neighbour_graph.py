@@ -0,0 +1,202 @@
+"""
+Offline job computing the top-k nearest neighbours of every quote, and lookup-based item-item recommendations.
+
+Usage: python -m quotes_recommender.vector_store.neighbour_graph --neighbours 50
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional, Protocol, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from quotes_recommender.core.constants import NEIGHBOUR_GRAPH_PATH, TXT_ENCODING
+from quotes_recommender.vector_store.constants import (
+    DEFAULT_GRAPH_BLOCK_SIZE,
+    DEFAULT_NEIGHBOURS,
+    DEFAULT_QUOTE_COLLECTION,
+)
+from quotes_recommender.vector_store.vector_store_singleton import (
+    QdrantVectorStoreSingleton,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class VectorSource(Protocol):
+    """Vector store that is able to stream all of its vectors."""
+
+    def get_point_count(self, collection: str = DEFAULT_QUOTE_COLLECTION) -> int:
+        """Get the exact number of points for the given collection."""
+
+    def iter_vectors(
+        self, collection: str = DEFAULT_QUOTE_COLLECTION, batch_size: int = ...
+    ) -> Iterator[tuple[list[int | str], npt.NDArray[np.float32]]]:
+        """Iterate over all point IDs and vectors of a collection in batches."""
+
+
+def _top_k(
+    indices: npt.NDArray[np.int64], scores: npt.NDArray[np.float32], k: int
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+    """
+    Selects the k best scored candidates of each row.
+    :param indices: Candidate indices, one row per query.
+    :param scores: Candidate scores, one row per query.
+    :param k: Number of candidates to keep.
+    :return: Indices and scores of the k best candidates, unsorted.
+    """
+    if scores.shape[1] <= k:
+        return indices, scores
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(indices, top, axis=1), np.take_along_axis(scores, top, axis=1)
+
+
+def build_neighbour_graph(
+    vector_store: VectorSource,
+    path: Path = NEIGHBOUR_GRAPH_PATH,
+    k: int = DEFAULT_NEIGHBOURS,
+    block_size: int = DEFAULT_GRAPH_BLOCK_SIZE,
+    collection: str = DEFAULT_QUOTE_COLLECTION,
+) -> None:
+    """
+    Computes the k nearest neighbours (cosine similarity) of every point by blocked matrix multiplication.
+    Vectors are streamed into a memory-mapped matrix first, so memory is bounded by the block size, not the corpus.
+    :param vector_store: Vector store to read the vectors from.
+    :param path: Directory where the neighbour table is stored.
+    :param k: Number of neighbours per point.
+    :param block_size: Number of points multiplied at once.
+    :param collection: Collection to build the graph for.
+    :return: None
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    start_time = time.perf_counter()
+    # stream normalized vectors into a temporary memory-mapped matrix
+    vectors: Optional[npt.NDArray[np.float32]] = None
+    ids: list[int | str] = []
+    capacity = vector_store.get_point_count(collection)
+    for batch_ids, batch_vectors in vector_store.iter_vectors(collection=collection):
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(
+                path / 'vectors.npy', mode='w+', dtype=np.float32, shape=(capacity, batch_vectors.shape[1])
+            )
+        # stop if points were added while streaming
+        row = len(ids)
+        end = min(row + len(batch_ids), capacity)
+        norms = np.linalg.norm(batch_vectors[: end - row], axis=1, keepdims=True)
+        vectors[row:end] = batch_vectors[: end - row] / np.where(norms == 0, 1, norms)
+        ids.extend(batch_ids[: end - row])
+    count = len(ids)
+    if vectors is None or count < 2:
+        raise ValueError(f'Collection {collection} has too few points to build a neighbour graph.')
+    k = min(k, count - 1)
+
+    neighbours = np.lib.format.open_memmap(path / 'neighbours.npy', mode='w+', dtype=np.int32, shape=(count, k))
+    scores = np.lib.format.open_memmap(path / 'scores.npy', mode='w+', dtype=np.float32, shape=(count, k))
+    for query_start in range(0, count, block_size):
+        query_end = min(query_start + block_size, count)
+        query_block = np.asarray(vectors[query_start:query_end])
+        best_indices = np.empty((len(query_block), 0), dtype=np.int64)
+        best_scores = np.empty((len(query_block), 0), dtype=np.float32)
+        for key_start in range(0, count, block_size):
+            key_end = min(key_start + block_size, count)
+            block_scores = query_block @ np.asarray(vectors[key_start:key_end]).T
+            # a point is not its own neighbour
+            if key_start == query_start:
+                np.fill_diagonal(block_scores, -np.inf)
+            block_indices = np.broadcast_to(np.arange(key_start, key_end), block_scores.shape)
+            best_indices, best_scores = _top_k(
+                np.concatenate([best_indices, block_indices], axis=1),
+                np.concatenate([best_scores, block_scores], axis=1),
+                k,
+            )
+        # store neighbours sorted by descending similarity
+        order = np.argsort(-best_scores, axis=1)
+        neighbours[query_start:query_end] = np.take_along_axis(best_indices, order, axis=1)
+        scores[query_start:query_end] = np.take_along_axis(best_scores, order, axis=1)
+        logger.info(f'Computed neighbours of {query_end}/{count} points.')
+
+    neighbours.flush()
+    scores.flush()
+    np.save(path / 'ids.npy', np.array([str(point_id) for point_id in ids]))
+    (path / 'meta.json').write_text(
+        json.dumps({'collection': collection, 'count': count, 'neighbours': k, 'created_at': time.time()}),
+        encoding=TXT_ENCODING,
+    )
+    del vectors
+    (path / 'vectors.npy').unlink()
+    logger.info(f'Built neighbour graph of {count} points in {time.perf_counter() - start_time:.1f}s.')
+
+
+class NeighbourGraph:
+    """Precomputed item-item neighbour table that turns item-item recommendations into lookups."""
+
+    def __init__(self, path: Path = NEIGHBOUR_GRAPH_PATH) -> None:
+        """
+        Loads a neighbour table built by build_neighbour_graph.
+        :param path: Directory of the neighbour table.
+        """
+        self.meta: dict[str, Any] = json.loads((path / 'meta.json').read_text(encoding=TXT_ENCODING))
+        self.ids: npt.NDArray[np.str_] = np.load(path / 'ids.npy')
+        self.neighbours: npt.NDArray[np.int32] = np.load(path / 'neighbours.npy', mmap_mode='r')
+        self.scores: npt.NDArray[np.float32] = np.load(path / 'scores.npy', mmap_mode='r')
+        self.rows: dict[str, int] = {point_id: row for row, point_id in enumerate(self.ids.tolist())}
+
+    def _rows(self, ids: Sequence[int | str]) -> list[int]:
+        """
+        Maps point IDs to rows of the table, skipping points that are newer than the table.
+        :param ids: Point IDs.
+        :return: Rows.
+        """
+        return [row for point_id in ids if (row := self.rows.get(str(point_id))) is not None]
+
+    def recommend(
+        self, positives: Sequence[int | str], negatives: Sequence[int | str], limit: int = 10
+    ) -> list[tuple[str, float]]:
+        """
+        Merges the neighbour lists of liked quotes and subtracts those of disliked quotes.
+        Each candidate is scored by the sum of its similarities to the liked quotes it neighbours minus the sum of
+        its similarities to the disliked quotes it neighbours. Examples are never returned.
+        :param positives: IDs of liked quotes.
+        :param negatives: IDs of disliked quotes.
+        :param limit: Number of results.
+        :return: Point IDs and scores of the best candidates, best first.
+        """
+        positive_rows, negative_rows = self._rows(positives), self._rows(negatives)
+        if not positive_rows:
+            return []
+        candidates = np.concatenate([self.neighbours[positive_rows].ravel(), self.neighbours[negative_rows].ravel()])
+        weights = np.concatenate([self.scores[positive_rows].ravel(), -self.scores[negative_rows].ravel()])
+        # sum up weights per candidate
+        unique_candidates, inverse = np.unique(candidates, return_inverse=True)
+        candidate_scores = np.bincount(inverse, weights=weights)
+        # drop examples and candidates that are closer to the dislikes
+        keep = ~np.isin(unique_candidates, positive_rows + negative_rows) & (candidate_scores > 0)
+        unique_candidates, candidate_scores = unique_candidates[keep], candidate_scores[keep]
+        order = np.argsort(-candidate_scores, kind='stable')[:limit]
+        return [(str(self.ids[unique_candidates[i]]), float(candidate_scores[i])) for i in order]
+
+
+def main() -> None:
+    """Builds the neighbour graph of the configured vector store."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--neighbours', type=int, default=DEFAULT_NEIGHBOURS)
+    parser.add_argument('--block-size', type=int, default=DEFAULT_GRAPH_BLOCK_SIZE)
+    parser.add_argument('--collection', default=DEFAULT_QUOTE_COLLECTION)
+    parser.add_argument('--path', type=Path, default=NEIGHBOUR_GRAPH_PATH)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    build_neighbour_graph(
+        QdrantVectorStoreSingleton().vector_store,
+        path=args.path,
+        k=args.neighbours,
+        block_size=args.block_size,
+        collection=args.collection,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Iterable, Sequence
+
+from qdrant_client.http.models import Record
+
+from quotes_recommender.vector_store.constants import (
+    DEFAULT_PAYLOAD_CACHE_SIZE,
+    DEFAULT_PAYLOAD_CACHE_TTL,
+)
+
+
+def normalize_point_id(point_id: int | str) -> str:
+    """
+    Returns the canonical string of a point ID as returned by Qdrant, so that IDs given in other notations (e.g. UUIDs
+    in upper case or without hyphens) match the IDs of the retrieved records.
+    :param point_id: Unsigned integer or UUID point ID.
+    :return: Decimal integer or hyphenated lower case UUID string.
+    """
+    if isinstance(point_id, int) or point_id.isdigit():
+        return str(int(point_id))
+    try:
+        return str(uuid.UUID(point_id))
+    except ValueError:
+        # not a valid ID, it is never found
+        return point_id
+
+
+class PayloadCache:
+    """
+    Thread-safe LRU cache mapping point IDs of a collection to their records.
+    Upserts of the process invalidate the records, records upserted by other processes are refreshed after the TTL.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_PAYLOAD_CACHE_SIZE, ttl: float = DEFAULT_PAYLOAD_CACHE_TTL) -> None:
+        """
+        Init an empty cache.
+        :param capacity: Max number of cached records. The least recently used records are evicted first.
+        :param ttl: Seconds after which cached records expire.
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        # records with the time they were cached at
+        self._records: OrderedDict[tuple[str, str], tuple[float, Record]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get_many(self, collection: str, ids: Sequence[int | str]) -> tuple[dict[str, Record], list[int | str]]:
+        """
+        Looks up the records of the given IDs.
+        :param collection: Collection of the points.
+        :param ids: Point IDs.
+        :return: Cached records by normalized ID (see normalize_point_id) and IDs that are not cached.
+        """
+        cached: dict[str, Record] = {}
+        missing: list[int | str] = []
+        now = time.monotonic()
+        with self._lock:
+            for point_id in ids:
+                key = (collection, normalize_point_id(point_id))
+                if (entry := self._records.get(key)) is not None and now - entry[0] <= self.ttl:
+                    # mark as most recently used
+                    self._records.move_to_end(key)
+                    cached[key[1]] = entry[1]
+                else:
+                    # drop the expired record, it is replaced by the retrieved one
+                    self._records.pop(key, None)
+                    missing.append(point_id)
+            self.hits += len(cached)
+            self.misses += len(missing)
+        return cached, missing
+
+    def put_many(self, collection: str, records: Iterable[Record]) -> None:
+        """
+        Adds records to the cache and evicts the least recently used ones if the capacity is exceeded.
+        :param collection: Collection of the points.
+        :param records: Records to cache.
+        :return: None
+        """
+        now = time.monotonic()
+        with self._lock:
+            for record in records:
+                key = (collection, normalize_point_id(record.id))
+                self._records[key] = (now, record)
+                self._records.move_to_end(key)
+            while len(self._records) > self.capacity:
+                self._records.popitem(last=False)
+
+    def invalidate(self, collection: str, ids: Iterable[int | str]) -> None:
+        """
+        Removes the records of the given IDs from the cache.
+        :param collection: Collection of the points.
+        :param ids: Point IDs.
+        :return: None
+        """
+        with self._lock:
+            for point_id in ids:
+                self._records.pop((collection, normalize_point_id(point_id)), None)
+
+    def clear(self) -> None:
+        """
+        Removes all records from the cache.
+        :return: None
+        """
+        with self._lock:
+            self._records.clear()
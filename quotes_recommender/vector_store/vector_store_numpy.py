@@ -0,0 +1,602 @@
+import json
+import logging
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+from qdrant_client.http.models import Record, ScoredPoint, UpdateStatus
+
+from quotes_recommender.core.constants import TXT_ENCODING
+from quotes_recommender.quote_scraper.items import ExtendedQuoteData, QuoteItem
+from quotes_recommender.vector_store.constants import (
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_EMBEDDING_SIZE,
+    DEFAULT_QUOTE_COLLECTION,
+    DEFAULT_SCROLL_BATCH_SIZE,
+    DISPLAY_PAYLOAD_FIELDS,
+)
+from quotes_recommender.vector_store.models import PayloadIndexStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_id(point_id: int | str) -> str:
+    """
+    Normalizes a point ID the way Qdrant does in order to use it as a lookup key.
+    :param point_id: Integer or UUID point ID.
+    :return: String representation of the ID.
+    """
+    if isinstance(point_id, str) and not point_id.isdigit():
+        return str(uuid.UUID(point_id))
+    return str(int(point_id))
+
+
+def _tokenize(text: str) -> set[str]:
+    """
+    Splits a text into lowercase word tokens, similar to the word tokenizer of the Qdrant full-text index.
+    :param text: Text to tokenize.
+    :return: Set of tokens.
+    """
+    return set(re.findall(r'\w+', text.lower()))
+
+
+def _scaled_sigmoid(scores: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+    """
+    Squashes scores into (0, 1) with the fast sigmoid Qdrant applies to best score recommendations.
+    :param scores: Similarity scores.
+    :return: Squashed scores.
+    """
+    # missing examples are scored -inf, which results in NaNs that are never selected
+    with np.errstate(invalid='ignore'):
+        return 0.5 * (scores / (1.0 + np.abs(scores)) + 1.0)
+
+
+class NumpyCollection:
+    """
+    Collection stored as memory-mapped float32 matrix of normalized vectors and a JSON lines payload file.
+    Upserts are serialized by a lock, as the store is shared by the threads of the process.
+    """
+
+    def __init__(self, path: Path, embedding_size: int = DEFAULT_EMBEDDING_SIZE) -> None:
+        """
+        Opens or creates a collection at the given path.
+        :param path: Directory of the collection.
+        :param embedding_size: Dimension of the vectors.
+        """
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._meta_path = path / 'meta.json'
+        self._vectors_path = path / 'vectors.f32'
+        self._payloads_path = path / 'payloads.jsonl'
+
+        self.embedding_size = embedding_size
+        self._lock = threading.Lock()
+        self.count: int = 0
+        self.capacity: int = 0
+        if self._meta_path.exists():
+            meta = json.loads(self._meta_path.read_text(encoding=TXT_ENCODING))
+            self.embedding_size, self.count, self.capacity = meta['embedding_size'], meta['count'], meta['capacity']
+        self.vectors: npt.NDArray[np.float32] = self._open_vectors(self.capacity)
+
+        # point IDs and payloads in row order
+        self.ids: list[int | str] = []
+        self.payloads: list[dict[str, Any]] = []
+        if self._payloads_path.exists():
+            with open(self._payloads_path, 'r', encoding=TXT_ENCODING) as file:
+                for line in file:
+                    record = json.loads(line)
+                    self.ids.append(record['id'])
+                    self.payloads.append(record['payload'])
+        self.rows: dict[str, int] = {_normalize_id(point_id): row for row, point_id in enumerate(self.ids)}
+        # inverted index mapping each tag to the rows carrying it
+        self.tag_index: dict[str, set[int]] = {}
+        for row, payload in enumerate(self.payloads):
+            self._index_tags(row, payload)
+
+    def _open_vectors(self, capacity: int) -> npt.NDArray[np.float32]:
+        """
+        Memory-maps the vector file with the given number of rows.
+        :param capacity: Number of rows.
+        :return: Memory-mapped matrix.
+        """
+        if capacity == 0:
+            return np.zeros((0, self.embedding_size), dtype=np.float32)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.embedding_size))
+
+    def _grow(self, min_capacity: int) -> None:
+        """
+        Grows the vector file to hold at least the given number of rows.
+        :param min_capacity: Required number of rows.
+        :return: None
+        """
+        if min_capacity <= self.capacity:
+            return
+        capacity = max(min_capacity, 2 * self.capacity, 1024)
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        # extend file, existing rows stay in place
+        with open(self._vectors_path, 'ab') as file:
+            file.truncate(capacity * self.embedding_size * np.dtype(np.float32).itemsize)
+        self.capacity = capacity
+        self.vectors = self._open_vectors(capacity)
+
+    def _index_tags(self, row: int, payload: dict[str, Any]) -> None:
+        """
+        Adds the tags of a payload to the inverted tag index.
+        :param row: Row of the point.
+        :param payload: Payload of the point.
+        :return: None
+        """
+        for tag in payload.get('tags') or []:
+            self.tag_index.setdefault(tag, set()).add(row)
+
+    def upsert(
+        self, ids: Sequence[int | str], vectors: npt.NDArray[np.float32], payloads: list[dict[str, Any]]
+    ) -> None:
+        """
+        Inserts or updates points.
+        :param ids: Point IDs.
+        :param vectors: Matrix of point vectors.
+        :param payloads: Point payloads.
+        :return: None
+        """
+        # normalize vectors in order to search by dot product
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        with self._lock:
+            self._grow(self.count + len(ids))
+            updated = False
+            appended: list[int] = []
+            for point_id, vector, payload in zip(ids, vectors, payloads):
+                key = _normalize_id(point_id)
+                if (row := self.rows.get(key)) is not None:
+                    # remove outdated tags of an updated point
+                    for tag in self.payloads[row].get('tags') or []:
+                        self.tag_index.get(tag, set()).discard(row)
+                    self.payloads[row] = payload
+                    updated = True
+                else:
+                    row = self.count
+                    self.rows[key] = row
+                    self.ids.append(point_id)
+                    self.payloads.append(payload)
+                    self.count += 1
+                    appended.append(row)
+                self.vectors[row] = vector
+                self._index_tags(row, payload)
+            self._flush(appended_rows=None if updated else appended)
+
+    def _flush(self, appended_rows: Optional[list[int]] = None) -> None:
+        """
+        Persists vectors, payloads, and metadata.
+        :param appended_rows: Rows that were appended. If None, the whole payload file gets rewritten.
+        :return: None
+        """
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        rows = range(self.count) if appended_rows is None else appended_rows
+        with open(self._payloads_path, 'w' if appended_rows is None else 'a', encoding=TXT_ENCODING) as file:
+            for row in rows:
+                file.write(json.dumps({'id': self.ids[row], 'payload': self.payloads[row]}) + '\n')
+        self._meta_path.write_text(
+            json.dumps({'embedding_size': self.embedding_size, 'count': self.count, 'capacity': self.capacity}),
+            encoding=TXT_ENCODING,
+        )
+
+    def get_rows(self, ids: Sequence[int | str]) -> list[int]:
+        """
+        Maps point IDs to rows, skipping unknown IDs.
+        :param ids: Point IDs.
+        :return: Rows of the points.
+        """
+        return [row for point_id in ids if (row := self.rows.get(_normalize_id(point_id))) is not None]
+
+    def filter_mask(
+        self,
+        tags: Optional[list[str]] = None,
+        keyword: Optional[str] = None,
+        author: Optional[str] = None,
+    ) -> Optional[npt.NDArray[np.bool_]]:
+        """
+        Evaluates payload filters.
+        :param tags: Points must carry any of the tags.
+        :param keyword: Points must contain all tokens of the keyword in their text.
+        :param author: Points must have exactly this author.
+        :return: Boolean mask over all rows or None if no filter was set.
+        """
+        if not (tags or keyword or author):
+            return None
+        mask = np.ones(self.count, dtype=np.bool_)
+        if tags:
+            tag_mask = np.zeros(self.count, dtype=np.bool_)
+            for tag in tags:
+                tag_mask[list(self.tag_index.get(tag, ()))] = True
+            mask &= tag_mask
+        if keyword:
+            tokens = _tokenize(keyword)
+            mask &= np.fromiter(
+                (tokens.issubset(_tokenize(payload.get('text', ''))) for payload in self.payloads),
+                dtype=np.bool_,
+                count=self.count,
+            )
+        if author:
+            mask &= np.fromiter(
+                (payload.get('author') == author for payload in self.payloads), dtype=np.bool_, count=self.count
+            )
+        return mask
+
+    def iter_blocks(self, block_size: int) -> Iterator[tuple[int, npt.NDArray[np.float32]]]:
+        """
+        Iterates over the stored vectors in row blocks in order to bound memory.
+        :param block_size: Number of rows per block.
+        :return: Start row and vectors of each block.
+        """
+        for start in range(0, self.count, block_size):
+            end = min(start + block_size, self.count)
+            yield start, self.vectors[start:end]
+
+    def record(self, row: int, payload_fields: Optional[list[str]], score: Optional[float] = None) -> Any:
+        """
+        Builds a Qdrant record or scored point for the given row.
+        :param row: Row of the point.
+        :param payload_fields: Payload fields to include. If None, the full payload is returned.
+        :param score: Score of the point. If set, a scored point is returned.
+        :return: Record or scored point.
+        """
+        payload = self.payloads[row]
+        if payload_fields is not None:
+            payload = {field: payload.get(field) for field in payload_fields}
+        if score is None:
+            return Record(id=self.ids[row], payload=payload)
+        return ScoredPoint(id=self.ids[row], version=0, score=score, payload=payload)
+
+
+class NumpyVectorStore:
+    """
+    In-process vector store offering the interface of the QdrantVectorStore.
+    Vectors are kept in memory-mapped float32 matrices and searched by brute force (exact cosine similarity),
+    which avoids network round trips for small corpora and tests.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        embedding_size: int = DEFAULT_EMBEDDING_SIZE,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> None:
+        """
+        Init NumPy vector store instance.
+        :param path: Directory where the collections are stored, one subdirectory per collection.
+        :param embedding_size: Dimension of the vectors.
+        :param block_size: Number of rows scored at once. Bounds the memory needed for a search.
+        """
+        self.path = path
+        self.embedding_size = embedding_size
+        self.block_size = block_size
+        self._collections: dict[str, NumpyCollection] = {}
+        # guards the creation of collections by concurrent threads
+        self._lock = threading.Lock()
+        logger.info(f'Using NumPy vector store at {path}.')
+
+    def get_collection(self, collection: str = DEFAULT_QUOTE_COLLECTION) -> NumpyCollection:
+        """
+        Gets a collection, creating it if it does not exist.
+        :param collection: Collection name.
+        :return: Collection.
+        """
+        with self._lock:
+            if collection not in self._collections:
+                self._collections[collection] = NumpyCollection(self.path / collection, self.embedding_size)
+            return self._collections[collection]
+
+    def ensure_payload_indexes(
+        self, indexes: Optional[dict[str, Any]] = None, collection: str = DEFAULT_QUOTE_COLLECTION
+    ) -> list[PayloadIndexStatus]:
+        """
+        Payload filters are evaluated in memory, only the tag index exists.
+        :param indexes: Ignored, kept for compatibility with the QdrantVectorStore.
+        :param collection: Collection name.
+        :return: Status of the tag index.
+        """
+        return [
+            PayloadIndexStatus(
+                field_name='tags',
+                field_type='keyword',
+                status='present',
+                indexed_points=self.get_collection(collection).count,
+            )
+        ]
+
+    def upsert_quotes(
+        self,
+        quotes: list[QuoteItem],
+        embeddings: Sequence[list[float]],
+        collection_name: str = DEFAULT_QUOTE_COLLECTION,
+        wait: bool = True,  # pylint: disable=unused-argument
+    ) -> UpdateStatus:
+        """
+        Method to upsert quotes to the vector store.
+        :param quotes: list of QuoteItems
+        :param embeddings: list of quote embeddings
+        :param collection_name: where to store the quotes.
+        :param wait: Whether to wait for committed changes. Writes are always synchronous.
+        :return: Status of the upsert request.
+        """
+        self.get_collection(collection_name).upsert(
+            ids=[quote['id'] for quote in quotes],  # type: ignore
+            vectors=np.asarray(embeddings, dtype=np.float32),
+            payloads=[dict(quote['data']) for quote in quotes],  # type: ignore
+        )
+        return UpdateStatus.COMPLETED
+
+    @staticmethod
+    def _search(
+        score_blocks: Iterator[tuple[int, npt.NDArray[np.float32]]],
+        limit: int,
+        mask: Optional[npt.NDArray[np.bool_]] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[tuple[int, float]]:
+        """
+        Selects the top-k rows from blockwise computed scores.
+        :param score_blocks: Start row and scores of each block.
+        :param limit: Max number of results.
+        :param mask: Rows that may be returned.
+        :param score_threshold: Minimal score of a result.
+        :return: Rows and scores, best first.
+        """
+        best_rows: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        best_scores: npt.NDArray[np.float32] = np.empty(0, dtype=np.float32)
+        for start, scores in score_blocks:
+            end = start + len(scores)
+            rows = np.arange(start, end)
+            keep = np.ones(len(scores), dtype=np.bool_) if mask is None else mask[start:end]
+            if score_threshold is not None:
+                keep &= scores >= score_threshold
+            # merge candidates of the block with the best results so far and keep the top-k
+            rows = np.concatenate([best_rows, rows[keep]])
+            scores = np.concatenate([best_scores, scores[keep]])
+            if len(scores) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                rows, scores = rows[top], scores[top]
+            best_rows, best_scores = rows, scores
+        order = np.argsort(-best_scores, kind='stable')
+        return [(int(best_rows[i]), float(best_scores[i])) for i in order]
+
+    def _query_scores(
+        self, collection: NumpyCollection, query_embedding: npt.NDArray[Any]
+    ) -> Iterator[tuple[int, npt.NDArray[np.float32]]]:
+        """
+        Computes the cosine similarity of all stored vectors to the query, block by block.
+        :param collection: Collection to search.
+        :param query_embedding: Query vector.
+        :return: Start row and scores of each block.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        for start, block in collection.iter_blocks(self.block_size):
+            yield start, block @ query
+
+    # pylint: disable=too-many-arguments
+    def get_content_based_recommendation(
+        self,
+        query_embedding: npt.NDArray[np.float64],
+        tags: Optional[list[str]] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> Optional[list[ScoredPoint]]:
+        """
+        Get content-based recommendations for the specified query.
+        :param query_embedding: The encoded user search string.
+        :param tags: Only those quotes are returned that are assigned to one of the specified tags (logical OR).
+        :param limit: Max number of results that should be returned.
+        :param score_threshold: If defined, less similar results will not be returned.
+        :param collection: Collection used for the search.
+        :return: Payload results of the matching quotes.
+        """
+        store = self.get_collection(collection)
+        hits = self._search(
+            self._query_scores(store, query_embedding),
+            limit=limit,
+            mask=store.filter_mask(tags=tags),
+            score_threshold=score_threshold,
+        )
+        return [store.record(row, list(ExtendedQuoteData.model_fields.keys()), score) for row, score in hits]
+
+    def get_profile_recommendations(
+        self,
+        profile_vector: npt.NDArray[np.float32],
+        exclude_ids: Sequence[int | str] = (),
+        limit: int = 10,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> list[ScoredPoint]:
+        """
+        Get item-based recommendations with a single vector search for the profile vector of a user.
+        :param profile_vector: The profile vector of the user.
+        :param exclude_ids: IDs of quotes that must not be recommended (e.g., already rated quotes).
+        :param limit: Number of results.
+        :param collection: Where to search for points.
+        :return: List of recommendations.
+        """
+        store = self.get_collection(collection)
+        mask = np.ones(store.count, dtype=np.bool_)
+        mask[store.get_rows(exclude_ids)] = False
+        hits = self._search(self._query_scores(store, profile_vector), limit=limit, mask=mask)
+        return [store.record(row, DISPLAY_PAYLOAD_FIELDS, score) for row, score in hits]
+
+    def get_item_item_recommendations(
+        self,
+        negatives: Sequence[int | str],
+        positives: Optional[Sequence[int | str]] = None,
+        limit: int = 10,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> list[ScoredPoint]:
+        """
+        Item-based recommendations with the best score strategy of the Qdrant recommendations API:
+        a candidate closer to any positive than to any negative is scored by its best positive similarity,
+        otherwise by its negated best negative similarity (both squashed by a sigmoid). Examples are never returned.
+        :param positives: IDs of positive examples to search for.
+        :param negatives: IDs of negative examples to avoid.
+        :param limit: Number of results.
+        :param collection: Where to search for points.
+        :return: List of recommendations.
+        """
+        store = self.get_collection(collection)
+        positive_rows, negative_rows = store.get_rows(positives or []), store.get_rows(negatives)
+        if not (positive_rows or negative_rows):
+            return []
+        # score positives and negatives with a single matrix product per block
+        example_vectors = np.asarray(store.vectors[positive_rows + negative_rows], dtype=np.float32).T
+        split = len(positive_rows)
+
+        def best_scores() -> Iterator[tuple[int, npt.NDArray[np.float32]]]:
+            for start, block in store.iter_blocks(self.block_size):
+                scores = block @ example_vectors
+                no_examples = np.full(len(block), -np.inf, dtype=np.float32)
+                best_positive = scores[:, :split].max(axis=1) if positive_rows else no_examples
+                best_negative = scores[:, split:].max(axis=1) if negative_rows else no_examples
+                yield start, np.where(
+                    best_positive > best_negative, _scaled_sigmoid(best_positive), -_scaled_sigmoid(best_negative)
+                )
+
+        # exclude the examples themselves
+        mask = np.ones(store.count, dtype=np.bool_)
+        mask[positive_rows + negative_rows] = False
+        hits = self._search(best_scores(), limit=limit, mask=mask)
+        return [store.record(row, DISPLAY_PAYLOAD_FIELDS, score) for row, score in hits]
+
+    def get_item_item_recommendations_batch(
+        self,
+        examples: Sequence[tuple[Sequence[int | str], Sequence[int | str]]],
+        limit: int = 10,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> list[list[ScoredPoint]]:
+        """
+        Item-based recommendations for several users at once.
+        :param examples: Positive and negative example IDs of each user.
+        :param limit: Number of results per user.
+        :param collection: Where to search for points.
+        :return: List of recommendations per user.
+        """
+        return [
+            self.get_item_item_recommendations(
+                positives=positives, negatives=negatives, limit=limit, collection=collection
+            )
+            for positives, negatives in examples
+        ]
+
+    def scroll_points(
+        self,
+        payload_attributes: list[str],
+        tags: Optional[list[str]] = None,
+        keyword: Optional[str] = None,
+        offset: Optional[int] = None,
+        limit: int = 20,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> tuple[list[Record], Optional[int | str | Any]]:
+        """
+        Scroll points in insertion order.
+        :param payload_attributes: Which payload attributes to return for each point
+        :param tags: Tag filters.
+        :param keyword: Keyword filter.
+        :param offset: Row where to start.
+        :param limit: Number of results.
+        :param collection: Where to search for points.
+        :return: Page results and next page offset.
+        """
+        store = self.get_collection(collection)
+        mask = store.filter_mask(tags=tags, keyword=keyword)
+        start = offset or 0
+        candidates = np.arange(start, store.count)
+        if mask is not None:
+            candidates = candidates[mask[start:]]
+        page = candidates[: limit + 1]
+        next_offset = int(page[limit]) if len(page) > limit else None
+        return [store.record(int(row), payload_attributes) for row in page[:limit]], next_offset
+
+    def iter_vectors(
+        self, collection: str = DEFAULT_QUOTE_COLLECTION, batch_size: int = DEFAULT_SCROLL_BATCH_SIZE
+    ) -> Iterator[tuple[list[int | str], npt.NDArray[np.float32]]]:
+        """
+        Iterate over the IDs and vectors of all points of a collection.
+        :param collection: Collection name.
+        :param batch_size: Number of points per batch.
+        :return: Point IDs and vector matrix of each batch.
+        """
+        store = self.get_collection(collection)
+        for start, block in store.iter_blocks(batch_size):
+            end = start + len(block)
+            yield store.ids[start:end], np.asarray(block)
+
+    def get_vectors(
+        self, ids: Sequence[int | str], collection: str = DEFAULT_QUOTE_COLLECTION
+    ) -> dict[str, npt.NDArray[np.float32]]:
+        """
+        Get the vectors of points by IDs.
+        :param ids: List or sequence of point IDs.
+        :param collection: Where to search for points.
+        :return: Stringified point IDs mapped to their vectors. Missing points are left out.
+        """
+        store = self.get_collection(collection)
+        return {str(store.ids[row]): np.array(store.vectors[row]) for row in store.get_rows(ids)}
+
+    def get_point_count(self, collection: str = DEFAULT_QUOTE_COLLECTION) -> int:
+        """
+        Get the exact number of points for the given collection.
+        :param collection: Collection name.
+        :return: Number of exact point count.
+        """
+        return self.get_collection(collection).count
+
+    def search_points(
+        self, ids: Sequence[int | str], collection: str = DEFAULT_QUOTE_COLLECTION, limit: Optional[int] = None
+    ) -> list[Record]:
+        """
+        Searching points by IDs.
+        :param ids: List or sequence of point IDs.
+        :param collection: Where to search for points.
+        :param limit: The number of points that should be returned. If nothing is provided, all requested points
+        are returned.
+        :return: Points with payloads.
+        """
+        store = self.get_collection(collection)
+        return [store.record(row, DISPLAY_PAYLOAD_FIELDS) for row in store.get_rows(ids)[:limit]]
+
+    def get_similarity_scores(self, query_embedding: npt.NDArray[np.float64]) -> Optional[list[ScoredPoint]]:
+        """
+        Get similarity scores for the specified query.
+        Used for determining tuples for data fusion.
+        :param query_embedding: Encoded quote to be checked for duplicate detection.
+        :return: Payload results of duplicate quotes.
+        """
+        store = self.get_collection(DEFAULT_QUOTE_COLLECTION)
+        hits = self._search(self._query_scores(store, query_embedding), limit=1, score_threshold=0.9)
+        return [store.record(row, None, score) for row, score in hits]
+
+    def get_entry_by_author(
+        self,
+        query_embedding: npt.NDArray[np.float64],
+        author: str,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> Optional[ScoredPoint]:
+        """
+        Get entry with the same author based on similarity scores for the specified query.
+        :param author: Author to match.
+        :param query_embedding: Encoded quote to be checked for duplicate detection.
+        :param collection: Collection used for the search.
+        :return: Payload results of quotes with the same author.
+        """
+        store = self.get_collection(collection)
+        hits = self._search(
+            self._query_scores(store, query_embedding),
+            limit=1,
+            mask=store.filter_mask(author=author),
+            score_threshold=0,
+        )
+        if hits:
+            return store.record(hits[0][0], None, hits[0][1])
+        return None
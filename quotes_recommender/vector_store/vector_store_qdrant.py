@@ -1,5 +1,5 @@
 import logging
-from typing import Any, Optional, Sequence
+from typing import Any, Iterator, Optional, Sequence
 
 import numpy as np
 import numpy.typing as npt
@@ -12,14 +12,18 @@ from qdrant_client.http.models import (
     Distance,
     FieldCondition,
     Filter,
+    HasIdCondition,
     MatchAny,
     MatchText,
+    PayloadSchemaType,
     PayloadSelectorInclude,
     PointStruct,
+    RecommendRequest,
     RecommendStrategy,
     Record,
     ScoredPoint,
     SearchParams,
+    TextIndexParams,
     UpdateStatus,
     VectorParams,
 )
@@ -29,8 +33,17 @@ from quotes_recommender.quote_scraper.items import ExtendedQuoteData, QuoteItem
 from quotes_recommender.utils.qdrant import QdrantConfig
 from quotes_recommender.vector_store.constants import (
     DEFAULT_EMBEDDING_SIZE,
-    DEFAULT_PAYLOAD_INDEX,
+    DEFAULT_PAYLOAD_CACHE_SIZE,
+    DEFAULT_PAYLOAD_CACHE_TTL,
     DEFAULT_QUOTE_COLLECTION,
+    DEFAULT_SCROLL_BATCH_SIZE,
+    DISPLAY_PAYLOAD_FIELDS,
+    PAYLOAD_INDEXES,
+)
+from quotes_recommender.vector_store.models import PayloadIndexStatus
+from quotes_recommender.vector_store.payload_cache import (
+    PayloadCache,
+    normalize_point_id,
 )
 
 logger = logging.getLogger(__name__)
@@ -39,8 +52,15 @@ logger = logging.getLogger(__name__)
 class QdrantVectorStore:
     """Redis document store class for inserting, querying, and searching tasks"""
 
+    # pylint: disable=too-many-arguments
     def __init__(
-        self, qdrant_config: QdrantConfig, on_disk: bool = True, timeout: Optional[int] = 60, ping: bool = True
+        self,
+        qdrant_config: QdrantConfig,
+        on_disk: bool = True,
+        timeout: Optional[int] = 60,
+        ping: bool = True,
+        payload_cache_size: int = DEFAULT_PAYLOAD_CACHE_SIZE,
+        payload_cache_ttl: float = DEFAULT_PAYLOAD_CACHE_TTL,
     ) -> None:
         """
         Init Qdrant vector store instance.
@@ -48,8 +68,11 @@ class QdrantVectorStore:
         :param on_disk: Whether to store payloads on disk.
         :param timeout: Timeout after which the client declares a connection as aborted.
         :param ping: Whether to test the connection to Qdrant.
+        :param payload_cache_size: Max number of point payloads cached for retrieval by ID.
+        :param payload_cache_ttl: Seconds after which cached payloads expire, as other processes upsert quotes too.
         """
         self.on_disk_payload = on_disk
+        self.payload_cache = PayloadCache(capacity=payload_cache_size, ttl=payload_cache_ttl)
 
         # raise error of no host or port was provided
         if qdrant_config.host is None or qdrant_config.port is None:
@@ -79,11 +102,17 @@ class QdrantVectorStore:
             # try to fetch default collection
             self.client.get_collection(DEFAULT_QUOTE_COLLECTION)
         except UnexpectedResponse:
-            self._create_default_collection_and_index()
+            self._create_default_collection()
+        # make sure all filtered payload fields are indexed
+        for index_status in self.ensure_payload_indexes():
+            logger.info(
+                f'Payload index on {index_status.field_name} ({index_status.field_type}): {index_status.status}, '
+                f'{index_status.indexed_points} points indexed.'
+            )
 
-    def _create_default_collection_and_index(self) -> None:
+    def _create_default_collection(self) -> None:
         """
-        Creates a default collection and payload index.
+        Creates the default collection.
         :return: None
         """
         # create default collection
@@ -95,11 +124,65 @@ class QdrantVectorStore:
             ),
         ):
             raise ConnectionError(f'Could not create {DEFAULT_QUOTE_COLLECTION} collection.')
-        # create default index
-        if not self.client.create_payload_index(
-            collection_name=DEFAULT_QUOTE_COLLECTION, field_name=DEFAULT_PAYLOAD_INDEX, field_type='keyword'
-        ):
-            raise ConnectionError(f'Could not create {DEFAULT_PAYLOAD_INDEX} index on {DEFAULT_QUOTE_COLLECTION}.')
+
+    def ensure_payload_indexes(
+        self,
+        indexes: Optional[dict[str, PayloadSchemaType | TextIndexParams]] = None,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> list[PayloadIndexStatus]:
+        """
+        Creates all declared payload indexes that are missing on the given collection.
+        Indexes whose schema type differs from the declared one are re-created, existing ones are left untouched.
+        :param indexes: Payload field names mapped to their index schema. Defaults to PAYLOAD_INDEXES.
+        :param collection: Collection to create the indexes for.
+        :return: Status of each declared index.
+        """
+        if indexes is None:
+            indexes = PAYLOAD_INDEXES
+        # get indexes that already exist on the collection
+        payload_schema = self.client.get_collection(collection).payload_schema
+        statuses: list[PayloadIndexStatus] = []
+        for field_name, field_schema in indexes.items():
+            # text index params carry their schema type in a separate attribute
+            field_type = PayloadSchemaType(
+                field_schema.type if isinstance(field_schema, TextIndexParams) else field_schema
+            )
+            existing_index = payload_schema.get(field_name)
+            if existing_index is not None and existing_index.data_type == field_type:
+                statuses.append(
+                    PayloadIndexStatus(
+                        field_name=field_name,
+                        field_type=field_type.value,
+                        status='present',
+                        indexed_points=existing_index.points,
+                    )
+                )
+                continue
+            # drop index with a mismatching schema
+            if existing_index is not None:
+                logger.warning(
+                    f'Payload index on {field_name} has type {existing_index.data_type}, expected {field_type}.'
+                )
+                self.client.delete_payload_index(collection_name=collection, field_name=field_name, wait=True)
+            # create index and wait until it is built
+            if not self.client.create_payload_index(
+                collection_name=collection, field_name=field_name, field_schema=field_schema, wait=True
+            ):
+                raise ConnectionError(f'Could not create {field_name} index on {collection}.')
+            statuses.append(
+                PayloadIndexStatus(
+                    field_name=field_name,
+                    field_type=field_type.value,
+                    status='created' if existing_index is None else 'recreated',
+                )
+            )
+        # fill in number of indexed points for newly created indexes
+        if any(status.indexed_points is None for status in statuses):
+            payload_schema = self.client.get_collection(collection).payload_schema
+            for status in statuses:
+                if status.indexed_points is None and (index_info := payload_schema.get(status.field_name)):
+                    status.indexed_points = index_info.points
+        return statuses
 
     def upsert_quotes(
         self,
@@ -128,6 +211,8 @@ class QdrantVectorStore:
         ]
         # upsert points
         response = self.client.upsert(collection_name=collection_name, points=points, wait=wait)
+        # drop outdated payloads
+        self.payload_cache.invalidate(collection_name, [point.id for point in points])
         # if upsert was not successful, raise an error
         if response.status.startswith('4'):
             raise HTTPError(f'Failing to upsert points: {response.status}')
@@ -174,6 +259,30 @@ class QdrantVectorStore:
         # return payload results
         return hits
 
+    def get_profile_recommendations(
+        self,
+        profile_vector: npt.NDArray[np.float32],
+        exclude_ids: Sequence[int | str] = (),
+        limit: int = 10,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> list[ScoredPoint]:
+        """
+        Get item-based recommendations with a single vector search for the profile vector of a user.
+        :param profile_vector: The profile vector of the user.
+        :param exclude_ids: IDs of quotes that must not be recommended (e.g., already rated quotes).
+        :param limit: Number of results.
+        :param collection: Where to search for points.
+        :return: List of recommendations.
+        """
+        recommendations = self.client.search(
+            collection_name=collection,
+            query_vector=profile_vector,
+            query_filter=Filter(must_not=[HasIdCondition(has_id=list(exclude_ids))]) if exclude_ids else None,
+            limit=limit,
+            with_payload=PayloadSelectorInclude(include=DISPLAY_PAYLOAD_FIELDS),
+        )
+        return recommendations
+
     def get_item_item_recommendations(
         self,
         negatives: Sequence[int | str],
@@ -194,13 +303,42 @@ class QdrantVectorStore:
             positive=positives,
             negative=negatives,
             limit=limit,
-            # TODO: get from pydantic model
-            with_payload=PayloadSelectorInclude(include=['author', 'avatar_img', 'tags', 'text']),
+            with_payload=PayloadSelectorInclude(include=DISPLAY_PAYLOAD_FIELDS),
             strategy=RecommendStrategy.BEST_SCORE,
             search_params=SearchParams(hnsw_ef=256, exact=True),
         )
         return recommendations
 
+    def get_item_item_recommendations_batch(
+        self,
+        examples: Sequence[tuple[Sequence[int | str], Sequence[int | str]]],
+        limit: int = 10,
+        collection: str = DEFAULT_QUOTE_COLLECTION,
+    ) -> list[list[ScoredPoint]]:
+        """
+        Use the Qdrant batch recommendations API to receive item-based recommendations for several users at once.
+        :param examples: Positive and negative example IDs of each user.
+        :param limit: Number of results per user.
+        :param collection: Where to search for points.
+        :return: List of recommendations (without payloads) per user.
+        """
+        if not examples:
+            return []
+        return self.client.recommend_batch(
+            collection_name=collection,
+            requests=[
+                RecommendRequest(
+                    positive=list(positives),
+                    negative=list(negatives),
+                    limit=limit,
+                    with_payload=False,
+                    strategy=RecommendStrategy.BEST_SCORE,
+                    params=SearchParams(hnsw_ef=256, exact=True),
+                )
+                for positives, negatives in examples
+            ],
+        )
+
     def scroll_points(
         self,
         payload_attributes: list[str],
@@ -235,6 +373,39 @@ class QdrantVectorStore:
         # return points and next_page_offset
         return points, next_offset
 
+    def iter_vectors(
+        self, collection: str = DEFAULT_QUOTE_COLLECTION, batch_size: int = DEFAULT_SCROLL_BATCH_SIZE
+    ) -> Iterator[tuple[list[int | str], npt.NDArray[np.float32]]]:
+        """
+        Iterate over the IDs and vectors of all points of a collection.
+        :param collection: Collection name.
+        :param batch_size: Number of points fetched per request.
+        :return: Point IDs and vector matrix of each batch.
+        """
+        offset: Optional[int | str | Any] = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection, limit=batch_size, offset=offset, with_vectors=True, with_payload=False
+            )
+            if points:
+                yield [point.id for point in points], np.asarray([point.vector for point in points], dtype=np.float32)
+            if offset is None:
+                break
+
+    def get_vectors(
+        self, ids: Sequence[int | str], collection: str = DEFAULT_QUOTE_COLLECTION
+    ) -> dict[str, npt.NDArray[np.float32]]:
+        """
+        Get the vectors of points by IDs.
+        :param ids: List or sequence of point IDs.
+        :param collection: Where to search for points.
+        :return: Stringified point IDs mapped to their vectors. Missing points are left out.
+        """
+        if not ids:
+            return {}
+        points = self.client.retrieve(collection_name=collection, ids=ids, with_payload=False, with_vectors=True)
+        return {str(point.id): np.asarray(point.vector, dtype=np.float32) for point in points}
+
     def get_point_count(self, collection: str = DEFAULT_QUOTE_COLLECTION) -> int:
         """
         Get the exact number of points for the given collection.
@@ -249,25 +420,29 @@ class QdrantVectorStore:
         self, ids: Sequence[int | str], collection: str = DEFAULT_QUOTE_COLLECTION, limit: Optional[int] = None
     ) -> list[Record]:
         """
-        Searching points by IDs.
+        Searching points by IDs. Payloads are served from the payload cache, cache misses are fetched from Qdrant
+        with a single request.
         :param ids: List or sequence of point IDs.
         :param collection: Where to search for points.
         :param limit: The number of points that should be returned. If nothing is provided, all requested points
         are returned.
-        :return: Points with payloads.
+        :return: Points with payloads in the order of the requested IDs.
         """
-        # get points from qdrant
-        hits = self.client.retrieve(
-            collection_name=collection,
-            ids=ids,
-            # TODO: get from pydantic model
-            with_payload=PayloadSelectorInclude(include=['author', 'avatar_img', 'tags', 'text']),
-        )
-        # if limit was provided
+        # if limit was provided, only fetch the first N points
         if limit:
-            # get only first N elements
-            hits = hits[:limit]
-        return hits
+            ids = ids[:limit]
+        cached, missing = self.payload_cache.get_many(collection, ids)
+        if missing:
+            # get points from qdrant
+            hits = self.client.retrieve(
+                collection_name=collection,
+                ids=missing,
+                with_payload=PayloadSelectorInclude(include=DISPLAY_PAYLOAD_FIELDS),
+            )
+            self.payload_cache.put_many(collection, hits)
+            cached.update({normalize_point_id(hit.id): hit for hit in hits})
+        # restore requested order, skipping IDs that do not exist
+        return [cached[point_id] for point_id in map(normalize_point_id, ids) if point_id in cached]
 
     def get_similarity_scores(self, query_embedding: npt.NDArray[np.float64]) -> Optional[list[ScoredPoint]]:
         """
@@ -1,14 +1,23 @@
-from typing import Any
+from typing import Any, TypeAlias
 
 from quotes_recommender.utils.qdrant import QdrantConfig
 from quotes_recommender.utils.singleton import Singleton
+from quotes_recommender.utils.vector_store import VectorStoreConfig
+from quotes_recommender.vector_store.vector_store_numpy import NumpyVectorStore
 from quotes_recommender.vector_store.vector_store_qdrant import QdrantVectorStore
 
+VectorStore: TypeAlias = QdrantVectorStore | NumpyVectorStore
+
 
 class QdrantVectorStoreSingleton(Singleton):
-    """Singleton class for Qdrant database"""
+    """Singleton class for the vector store, backed by Qdrant unless configured otherwise"""
 
     def init(self, *args: Any, **kwargs: Any) -> None:  # pylint: disable=unused-argument
-        """Init qdrant vector store"""
+        """Init vector store of the configured backend"""
 
-        self.vector_store = QdrantVectorStore(QdrantConfig())
+        config = VectorStoreConfig()
+        self.vector_store: VectorStore
+        if config.backend == 'numpy':
+            self.vector_store = NumpyVectorStore(path=config.numpy_path)
+        else:
+            self.vector_store = QdrantVectorStore(QdrantConfig())
@@ -13,3 +13,6 @@ TEST_VECTOR_CONFIG: Final[VectorParams] = VectorParams(
                     distance=Distance.COSINE,
                     on_disk=True
                 )
+
+# Redis database of the tests, so that they do not write to the data of the app, e.g. its preference event stream
+TEST_REDIS_DB: Final[int] = 14
@@ -0,0 +1,37 @@
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Mapping, Optional
+
+
+class StubExecutor(Executor):
+    """
+    Executor running the submitted calls only when a test says so, so that tests control when calls start and finish.
+    Calls of replaced functions run the replacement right away instead.
+    """
+
+    def __init__(self, replacements: Optional[Mapping[Callable[..., Any], Callable[..., Any]]] = None) -> None:
+        self.replacements = replacements or {}
+        # queued calls in order of submission
+        self.calls: list[tuple[Future, Callable[..., Any], tuple, dict]] = []
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        if fn in self.replacements:
+            self._run(future, self.replacements[fn], args, kwargs)
+        else:
+            self.calls.append((future, fn, args, kwargs))
+        return future
+
+    def run_next(self) -> Future:
+        future, fn, args, kwargs = self.calls.pop(0)
+        self._run(future, fn, args, kwargs)
+        return future
+
+    @staticmethod
+    def _run(future: Future, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        # cancelled calls do not start
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as error:
+            future.set_exception(error)
@@ -0,0 +1,12 @@
+from quotes_recommender.recommender.examples import order_by_recency, select_examples
+
+
+def test_examples_are_recent_and_cover_tags():
+    preferences = ['q1', 'q2', 'q3', 'q4', 'q5']
+    # q1 was scraped and has no recorded time
+    candidates = order_by_recency(preferences, recent=['q5', 'q4', 'q3', 'q2'])
+    assert candidates == ['q5', 'q4', 'q3', 'q2', 'q1']
+    tags = {'q5': ['love'], 'q4': ['love'], 'q3': ['love'], 'q2': ['life'], 'q1': ['humor']}
+    # the most recent quote and the most recent quotes adding a tag come first, order is kept
+    assert select_examples(candidates, tags, max_examples=3) == ['q5', 'q2', 'q1']
+    assert select_examples(candidates, tags, max_examples=4) == ['q5', 'q4', 'q2', 'q1']
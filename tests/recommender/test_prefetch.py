@@ -0,0 +1,67 @@
+import pytest
+from qdrant_client.http.models import Record
+
+from quotes_recommender.recommender import prefetch
+from quotes_recommender.recommender.prefetch import RecommendationPrefetcher
+from tests.recommender.stub_executor import StubExecutor
+
+TEST_USER = "test-prefetch-user"
+
+
+class StubUserStore:
+    def __init__(self):
+        self.stored = {}
+
+    def get_user_credentials(self):
+        return {TEST_USER: {}}
+
+    def get_user_preferences(self, username):
+        return ["1"], ["2"]
+
+    def get_recommendations(self, username):
+        return self.stored.get(username)
+
+    def store_recommendations(self, recommendations, ttl):
+        self.stored.update(recommendations)
+
+
+class StubVectorStore:
+    def search_points(self, point_ids):
+        return [Record(id=point_id, payload={}) for point_id in point_ids]
+
+
+@pytest.fixture
+def prefetcher(monkeypatch):
+    monkeypatch.setattr(prefetch, "get_item_item_quotes", lambda *args, **kwargs: [Record(id=3, payload={})])
+    monkeypatch.setattr(prefetch, "get_user_user_quote_ids", lambda *args, **kwargs: ["4"])
+    return RecommendationPrefetcher(StubUserStore(), StubVectorStore(), None, StubExecutor())
+
+
+def test_prefetches_are_deduplicated_per_user(prefetcher):
+    future = prefetcher.prefetch(TEST_USER)
+    assert prefetcher.prefetch(TEST_USER) is future
+    assert len(prefetcher._executor.calls) == 1
+    recommendations = prefetcher._executor.run_next().result()
+    assert (recommendations.item_item, recommendations.user_user) == (["3"], ["4"])
+    assert prefetcher.user_store.stored[TEST_USER] == recommendations
+    # the next login prefetches again
+    assert prefetcher.prefetch(TEST_USER) is not future
+
+
+def test_cancelled_queued_prefetch_does_not_start(prefetcher):
+    prefetcher.prefetch(TEST_USER)
+    assert prefetcher.cancel(TEST_USER)
+    assert prefetcher._executor.run_next().cancelled()
+    assert not prefetcher.user_store.stored
+
+
+def test_cancelled_running_prefetch_stores_nothing(prefetcher, monkeypatch):
+    def get_user_user_quote_ids(*args, **kwargs):
+        # the user logs out while the prefetch is running
+        assert prefetcher.cancel(TEST_USER)
+        return ["4"]
+
+    monkeypatch.setattr(prefetch, "get_user_user_quote_ids", get_user_user_quote_ids)
+    prefetcher.prefetch(TEST_USER)
+    assert prefetcher._executor.run_next().result() is None
+    assert not prefetcher.user_store.stored
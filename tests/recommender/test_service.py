@@ -0,0 +1,82 @@
+from qdrant_client.http.models import Record
+
+from quotes_recommender.recommender.service import (
+    get_item_item_quotes,
+    get_recommendations,
+    get_user_user_quotes,
+)
+from tests.recommender.stub_executor import StubExecutor
+
+TEST_USER = "test-service-user"
+POPULAR_QUOTES = [101, 102]
+
+
+class StubUserStore:
+    def get_recommendations(self, username):
+        return None
+
+
+class StubVectorStore:
+    def __init__(self):
+        self.searches = []
+
+    def search_points(self, point_ids):
+        self.searches.append(list(point_ids))
+        return [Record(id=point_id, payload={}) for point_id in point_ids]
+
+
+class StubPopularityIndex:
+    def get_popular_quote_ids(self, limit, exclude):
+        return [quote_id for quote_id in POPULAR_QUOTES if quote_id not in exclude][:limit]
+
+
+def recommend(executor, vector_store=None):
+    return get_recommendations(
+        StubUserStore(),
+        vector_store or StubVectorStore(),
+        None,
+        StubPopularityIndex(),
+        executor,
+        TEST_USER,
+        likes=["1"],
+        dislikes=["2"],
+        timeout=0.01,
+    )
+
+
+def test_timed_out_branch_falls_back_to_popular_quotes():
+    # the item-item branch stays queued
+    executor = StubExecutor({get_user_user_quotes: lambda *args, **kwargs: [Record(id=3, payload={})]})
+    recommendations = recommend(executor)
+    assert [quote.id for quote in recommendations.item_item] == POPULAR_QUOTES
+    assert recommendations.item_item_fallback
+    assert [quote.id for quote in recommendations.user_user] == [3]
+    assert not recommendations.user_user_fallback
+    # the timed out branch does not start anymore
+    assert executor.calls[0][1] is get_item_item_quotes
+    assert executor.run_next().cancelled()
+
+
+def test_failed_branch_falls_back_to_popular_quotes():
+    def fail(*args, **kwargs):
+        raise ConnectionError("Qdrant is down.")
+
+    executor = StubExecutor(
+        {get_item_item_quotes: fail, get_user_user_quotes: lambda *args, **kwargs: [Record(id=3, payload={})]}
+    )
+    recommendations = recommend(executor)
+    assert [quote.id for quote in recommendations.item_item] == POPULAR_QUOTES
+    assert recommendations.item_item_fallback
+    assert not recommendations.user_user_fallback
+
+
+def test_empty_branches_share_one_fallback():
+    vector_store = StubVectorStore()
+    executor = StubExecutor(
+        {get_item_item_quotes: lambda *args, **kwargs: [], get_user_user_quotes: lambda *args, **kwargs: []}
+    )
+    recommendations = recommend(executor, vector_store)
+    assert recommendations.item_item_fallback and recommendations.user_user_fallback
+    assert [quote.id for quote in recommendations.item_item] == [quote.id for quote in recommendations.user_user]
+    # the popular quotes are fetched once for both branches
+    assert vector_store.searches == [POPULAR_QUOTES]
@@ -0,0 +1,53 @@
+import pytest
+
+from quotes_recommender.recommender.user_user import (
+    get_similar_users,
+    get_user_user_recommendations,
+)
+from quotes_recommender.user_store.minhash import MinHashIndex
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from tests.redis_utils import TEST_REDIS_CONFIG, delete_user_data
+
+TEST_USERS = ["test-user-user-a", "test-user-user-b", "test-user-user-c"]
+TEST_QUOTES = [f"test-user-user-quote-{quote}" for quote in range(8)]
+
+
+@pytest.fixture
+def user_store():
+    user_store = RedisUserStore(TEST_REDIS_CONFIG)
+    yield user_store
+    # delete test data
+    delete_user_data(user_store, TEST_USERS, TEST_QUOTES)
+
+
+def test_recommendations_are_similarity_weighted_votes(user_store):
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES[:4], dislikes=TEST_QUOTES[4:5])
+    # most similar user
+    user_store.set_user_preferences(TEST_USERS[1], likes=TEST_QUOTES[:3] + TEST_QUOTES[5:7])
+    # less similar user disagreeing about one quote
+    user_store.set_user_preferences(
+        TEST_USERS[2], likes=TEST_QUOTES[1:4] + TEST_QUOTES[4:6] + TEST_QUOTES[7:], dislikes=TEST_QUOTES[6:7]
+    )
+    recommendations = get_user_user_recommendations(
+        user_store, TEST_USERS[0], likes=TEST_QUOTES[:4], dislikes=TEST_QUOTES[4:5]
+    )
+    # the user's own ratings are excluded, quote 5 is liked by both similar users, quote 6 is also disliked by one
+    assert [quote_id for quote_id, _ in recommendations] == [TEST_QUOTES[5], TEST_QUOTES[7], TEST_QUOTES[6]]
+
+
+def test_similar_users_of_users_with_many_likes_are_found_by_lsh(user_store):
+    minhash_index = MinHashIndex(user_store)
+    user_store.add_preference_listener(minhash_index.apply_change)
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES)
+    user_store.set_user_preferences(TEST_USERS[1], likes=TEST_QUOTES[:7])
+    # shares a single like, so it does not share an LSH bucket
+    user_store.set_user_preferences(TEST_USERS[2], likes=TEST_QUOTES[:1])
+    try:
+        similar_users = get_similar_users(user_store, TEST_USERS[0], TEST_QUOTES, threshold=1, lsh_min_likes=1)
+        assert similar_users == [(TEST_USERS[1], 7 / 8)]
+        # the likers index finds all users with common likes
+        assert len(get_similar_users(user_store, TEST_USERS[0], TEST_QUOTES, threshold=1)) == 2
+    finally:
+        # unliking the quotes removes the users from their LSH buckets
+        for user in TEST_USERS:
+            user_store.delete_user_preference(user, likes=TEST_QUOTES)
@@ -0,0 +1,48 @@
+from typing import Sequence
+
+from quotes_recommender.user_store.constants import (
+    PREFERENCE_EVENTS_KEY,
+    USERS_INDEX_KEY,
+)
+from quotes_recommender.user_store.models import (
+    CredentialsKey,
+    LikersKey,
+    MinHashKey,
+    PreferenceKey,
+    ProfileKey,
+    RecommendationKey,
+)
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.utils.redis import RedisConfig
+from tests.constants import TEST_REDIS_DB
+
+TEST_REDIS_CONFIG = RedisConfig(db=TEST_REDIS_DB)
+
+
+def delete_user_data(user_store: RedisUserStore, usernames: Sequence[str], quote_ids: Sequence[str] = ()) -> None:
+    """
+    Deletes the data of test users together with all keys derived from it, and the preference event stream.
+    :param user_store: User store of the test.
+    :param usernames: The usernames of the test users.
+    :param quote_ids: IDs of the quotes the test users liked.
+    :return: None
+    """
+    user_store.client.delete(
+        PREFERENCE_EVENTS_KEY,
+        *[
+            key
+            for username in usernames
+            for key in (
+                PreferenceKey(username=username).like_key,
+                PreferenceKey(username=username).dislike_key,
+                PreferenceKey(username=username).like_times_key,
+                PreferenceKey(username=username).dislike_times_key,
+                CredentialsKey(username=username).key,
+                ProfileKey(username=username).key,
+                MinHashKey(username=username).key,
+                RecommendationKey(username=username).key,
+            )
+        ],
+        *[LikersKey(quote_id=str(quote_id)).key for quote_id in quote_ids],
+    )
+    user_store.client.hdel(USERS_INDEX_KEY, *usernames)
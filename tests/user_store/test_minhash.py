@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from quotes_recommender.user_store.minhash import MinHashIndex
+from quotes_recommender.user_store.models import MinHashKey, PreferenceChange
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from tests.redis_utils import TEST_REDIS_CONFIG, delete_user_data
+
+TEST_USERS = ["test-minhash-a", "test-minhash-b", "test-minhash-c"]
+
+
+@pytest.fixture
+def minhash_index():
+    user_store = RedisUserStore(TEST_REDIS_CONFIG)
+    minhash_index = MinHashIndex(user_store)
+    user_store.add_preference_listener(minhash_index.apply_change)
+    yield minhash_index
+    # delete test data, unliking the quotes removes the users from their LSH buckets
+    for user in TEST_USERS:
+        user_store.delete_user_preference(user, likes=[str(quote) for quote in range(100)])
+    delete_user_data(user_store, TEST_USERS, [str(quote) for quote in range(100)])
+
+
+def test_signature_estimates_jaccard_similarity(minhash_index):
+    signature_a = minhash_index.signature(range(0, 60))
+    signature_b = minhash_index.signature(range(20, 80))
+    # exact Jaccard similarity is 40 / 80
+    assert abs((signature_a == signature_b).mean() - 0.5) < 0.15
+
+
+def test_incremental_updates_match_rebuilt_signature(minhash_index):
+    user_store = minhash_index.user_store
+    user_store.set_user_preferences(TEST_USERS[0], likes=["1", "2"])
+    user_store.set_user_preferences(TEST_USERS[0], likes=["3"])
+    user_store.set_user_preferences(TEST_USERS[0], dislikes=["2"])
+    stored = np.frombuffer(user_store.client.get(MinHashKey(username=TEST_USERS[0]).key), dtype=np.uint32)
+    assert np.array_equal(stored, minhash_index.signature(["1", "3"]))
+
+
+def test_late_changes_do_not_merge_unset_likes(minhash_index):
+    user_store = minhash_index.user_store
+    user_store.set_user_preferences(TEST_USERS[0], likes=["1", "2"])
+    user_store.set_user_preferences(TEST_USERS[0], dislikes=["2"])
+    # e.g. an event redelivered to the consumer
+    minhash_index.apply_change(PreferenceChange(username=TEST_USERS[0], added_likes=["1", "2"]))
+    stored = np.frombuffer(user_store.client.get(MinHashKey(username=TEST_USERS[0]).key), dtype=np.uint32)
+    assert np.array_equal(stored, minhash_index.signature(["1"]))
+
+
+def test_similar_users(minhash_index):
+    user_store = minhash_index.user_store
+    user_store.set_user_preferences(TEST_USERS[0], likes=[str(quote) for quote in range(50)])
+    user_store.set_user_preferences(TEST_USERS[1], likes=[str(quote) for quote in range(1, 50)])
+    user_store.set_user_preferences(TEST_USERS[2], likes=[str(quote) for quote in range(50, 100)])
+    similar_users = minhash_index.get_similar_users(TEST_USERS[0], k=2)
+    assert [user for user, _ in similar_users] == [TEST_USERS[1]]
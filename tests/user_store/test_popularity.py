@@ -0,0 +1,31 @@
+import pytest
+
+from quotes_recommender.user_store.models import PopularityKey, PreferenceChange
+from quotes_recommender.user_store.popularity import PopularityIndex
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from tests.redis_utils import TEST_REDIS_CONFIG
+
+TEST_QUOTES = ["test-popular-quote-1", "test-popular-quote-2", "test-popular-quote-3"]
+
+
+@pytest.fixture
+def popularity_index():
+    user_store = RedisUserStore(TEST_REDIS_CONFIG)
+    # the vector store is only needed for the tags of liked quotes
+    popularity_index = PopularityIndex(user_store, vector_store=None, per_tag=False)  # type: ignore
+    yield popularity_index
+    # delete test data
+    user_store.client.zrem(PopularityKey().key, *TEST_QUOTES)
+    user_store.client.delete(PopularityKey(tag='test-popular-tag').key)
+
+
+def test_app_likes_add_to_scraped_likes(popularity_index):
+    popularity_index.per_tag = True
+    popularity_index.seed([(quote, 1_000_000 + likes, ['test-popular-tag']) for likes, quote in enumerate(TEST_QUOTES)])
+    popularity_index.per_tag = False
+    popularity_index.apply_change(PreferenceChange(username='test-popular-user', added_likes=TEST_QUOTES[:1]))
+    popularity_index.apply_change(PreferenceChange(username='test-popular-user', added_likes=TEST_QUOTES[:1]))
+    # seeding again keeps the likes gained in the app
+    popularity_index.seed([(TEST_QUOTES[0], 1_000_000, [])])
+    assert popularity_index.get_popular_quote_ids(limit=2, exclude=TEST_QUOTES[2:]) == TEST_QUOTES[:2]
+    assert popularity_index.get_popular_quote_ids(limit=3, tag='test-popular-tag') == TEST_QUOTES[::-1]
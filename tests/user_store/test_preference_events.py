@@ -0,0 +1,41 @@
+import pytest
+
+from quotes_recommender.user_store.models import PreferenceChange
+from quotes_recommender.user_store.preference_events import PreferenceEventConsumer
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from tests.redis_utils import TEST_REDIS_CONFIG, delete_user_data
+
+TEST_USERS = ["test-events-a", "test-events-b"]
+TEST_QUOTES = ["test-events-quote-1", "test-events-quote-2"]
+TEST_GROUP = "test-events-group"
+
+
+@pytest.fixture
+def user_store():
+    user_store = RedisUserStore(TEST_REDIS_CONFIG)
+    yield user_store
+    # delete test data, the consumer group is deleted with the event stream
+    delete_user_data(user_store, TEST_USERS, TEST_QUOTES)
+
+
+def test_consumer_resumes_with_pending_events(user_store):
+    changes: list[PreferenceChange] = []
+
+    def failing_handler(change: PreferenceChange) -> None:
+        raise ValueError(change.username)
+
+    consumer = PreferenceEventConsumer(user_store.client, TEST_GROUP, 'test-consumer', failing_handler, block_ms=10)
+    consumer.create_group()
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES)
+    user_store.set_user_preferences(TEST_USERS[0], dislikes=TEST_QUOTES[:1])
+    user_store.store_likes_batch(TEST_USERS, quote_id=TEST_QUOTES[1])
+    assert consumer.read_new() == 0
+    # a restarted consumer applies the events it did not acknowledge
+    consumer = PreferenceEventConsumer(user_store.client, TEST_GROUP, 'test-consumer', changes.append, block_ms=10)
+    assert consumer.process_pending() == 3
+    assert [change for change in changes if change.username in TEST_USERS] == [
+        PreferenceChange(username=TEST_USERS[0], added_likes=TEST_QUOTES),
+        PreferenceChange(username=TEST_USERS[0], removed_likes=TEST_QUOTES[:1], added_dislikes=TEST_QUOTES[:1]),
+        PreferenceChange(username=TEST_USERS[1], added_likes=TEST_QUOTES[1:]),
+    ]
+    assert consumer.process_pending() == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from quotes_recommender.user_store.models import PreferenceChange, ProfileKey
+from quotes_recommender.user_store.user_profiles import UserProfileStore
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.vector_store.vector_store_numpy import NumpyVectorStore
+from tests.redis_utils import TEST_REDIS_CONFIG, delete_user_data
+
+TEST_USER = "test-profile-user"
+EMBEDDING_SIZE = 8
+
+
+@pytest.fixture
+def profile_store(tmp_path):
+    user_store = RedisUserStore(TEST_REDIS_CONFIG)
+    vector_store = NumpyVectorStore(path=tmp_path, embedding_size=EMBEDDING_SIZE)
+    embeddings = np.random.default_rng(0).random((3, EMBEDDING_SIZE))
+    vector_store.upsert_quotes(
+        [{"id": point_id, "data": {"text": "", "author": "", "avatar_img": None, "tags": []}} for point_id in range(3)],
+        embeddings.tolist(),
+    )
+    yield UserProfileStore(user_store, vector_store)
+    # delete test data
+    delete_user_data(user_store, [TEST_USER], [str(quote) for quote in range(3)])
+
+
+def test_applying_a_change_twice_is_idempotent(profile_store):
+    user_store = profile_store.user_store
+    user_store.set_user_preferences(TEST_USER, likes=["0"])
+    profile_store.rebuild(TEST_USER)
+    user_store.set_user_preferences(TEST_USER, likes=["1"], dislikes=["2"])
+    change = PreferenceChange(username=TEST_USER, added_likes=["1"], added_dislikes=["2"])
+    # e.g. an event redelivered to the consumer
+    profile_store.apply_change(change)
+    profile_store.apply_change(change)
+    profile = user_store.client.hgetall(ProfileKey(username=TEST_USER).key)
+    assert profile == profile_store.rebuild(TEST_USER)
+    assert int(profile[b'like_count']) == 2
+    assert int(profile[b'dislike_count']) == 1
+
+
+def test_profiles_lagging_behind_the_preferences_are_rebuilt(profile_store):
+    user_store = profile_store.user_store
+    user_store.set_user_preferences(TEST_USER, likes=["0"])
+    profile_store.rebuild(TEST_USER)
+    # the change is not applied to the profile, e.g. because the consumer is behind
+    user_store.set_user_preferences(TEST_USER, likes=["1"])
+    vectors = profile_store.vector_store.get_vectors(["0", "1"])
+    assert np.allclose(profile_store.get_profile_vector(TEST_USER), (vectors["0"] + vectors["1"]) / 2)
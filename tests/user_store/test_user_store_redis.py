@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from quotes_recommender.user_store.commands import store_likes_call
+from quotes_recommender.user_store.models import (
+    LikersKey,
+    PreferenceKey,
+    ProfileKey,
+    RecommendationKey,
+)
+from quotes_recommender.user_store.user_store_redis import RedisUserStore
+from quotes_recommender.user_store.user_store_redis_async import AsyncRedisUserStore
+from tests.redis_utils import TEST_REDIS_CONFIG, delete_user_data
+
+TEST_USERS = ["test-user-a", "test-user-b", "test-user-c"]
+TEST_QUOTES = ["test-quote-1", "test-quote-2", "test-quote-3"]
+
+
+@pytest.fixture
+def user_store():
+    user_store = RedisUserStore(TEST_REDIS_CONFIG)
+    yield user_store
+    # delete test data
+    delete_user_data(user_store, TEST_USERS, TEST_QUOTES)
+
+
+def test_likers_index_follows_preferences(user_store):
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES[:2])
+    user_store.set_user_preferences(TEST_USERS[0], dislikes=TEST_QUOTES[1:2])
+    user_store.store_likes_batch(TEST_USERS[1:], quote_id=TEST_QUOTES[0])
+    assert user_store.client.smembers(LikersKey(quote_id=TEST_QUOTES[0]).key) == {user.encode() for user in TEST_USERS}
+    assert not user_store.client.exists(LikersKey(quote_id=TEST_QUOTES[1]).key)
+    user_store.delete_user_preference(TEST_USERS[0], likes=TEST_QUOTES[:1])
+    assert user_store.client.smembers(LikersKey(quote_id=TEST_QUOTES[0]).key) == {
+        user.encode() for user in TEST_USERS[1:]
+    }
+
+
+def test_most_similar_user_has_most_common_likes(user_store):
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES)
+    user_store.set_user_preferences(TEST_USERS[1], likes=TEST_QUOTES)
+    user_store.set_user_preferences(TEST_USERS[2], likes=TEST_QUOTES[:1])
+    assert user_store.get_common_likes(TEST_USERS[0]) == {TEST_USERS[1]: 3, TEST_USERS[2]: 1}
+    assert user_store.get_most_similar_user(TEST_USERS[0], threshold=1) == TEST_USERS[1]
+    assert user_store.get_most_similar_user(TEST_USERS[2], threshold=2) is None
+
+
+def test_common_likes_follow_moves(user_store):
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES)
+    user_store.set_user_preferences(TEST_USERS[1], likes=TEST_QUOTES[1:])
+    user_store.store_likes_batch(TEST_USERS[2:], quote_id=TEST_QUOTES[0])
+    user_store.set_user_preferences(TEST_USERS[0], dislikes=TEST_QUOTES[1:2])
+    assert user_store.get_common_likes(TEST_USERS[0]) == {TEST_USERS[1]: 1, TEST_USERS[2]: 1}
+
+
+def test_iter_user_bitmaps_streams_chunks(user_store):
+    for user in TEST_USERS:
+        user_store.set_user_preferences(user, likes=TEST_QUOTES[:2])
+    chunks = list(user_store.iter_user_bitmaps(search_str=PreferenceKey(username="test-user-*").like_key, batch_size=2))
+    assert all(len(chunk) <= 2 for chunk in chunks)
+    assert {username: sorted(likes) for chunk in chunks for username, likes in chunk} == {
+        user: TEST_QUOTES[:2] for user in TEST_USERS
+    }
+
+
+def test_registered_user_is_visible_in_cached_credentials(user_store):
+    user_store.get_user_credentials()
+    user_store.register_user(TEST_USERS[0], {"name": "Test", "email": "test@example.com", "password": "hash"})
+    credentials = user_store.get_user_credentials()
+    assert credentials[TEST_USERS[0]] == {"name": "Test", "email": "test@example.com", "password": "hash"}
+    # callers may modify their copy without affecting the cache
+    credentials[TEST_USERS[0]]["name"] = "Modified"
+    assert user_store.get_user_credentials()[TEST_USERS[0]]["name"] == "Test"
+
+
+def test_async_user_store_matches_sync_user_store(user_store):
+    async def update() -> tuple[tuple[list[str], list[str]], bool]:
+        async_user_store = AsyncRedisUserStore(TEST_REDIS_CONFIG, preference_cache=user_store.preference_cache)
+        try:
+            await async_user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES[:2], dislikes=TEST_QUOTES[2:])
+            await async_user_store.set_user_preferences(TEST_USERS[1], likes=TEST_QUOTES[:2])
+            deleted = await async_user_store.delete_user_preference(TEST_USERS[0], dislikes=TEST_QUOTES[2:])
+            return await async_user_store.get_user_preferences(TEST_USERS[0]), deleted
+        finally:
+            await async_user_store.close()
+
+    # the asyncio store invalidates the preferences cached by the blocking store
+    user_store.get_user_preferences(TEST_USERS[0])
+    (likes, dislikes), deleted = asyncio.run(update())
+    assert deleted
+    assert (sorted(likes), dislikes) == (TEST_QUOTES[:2], [])
+    assert sorted(user_store.get_user_preferences(TEST_USERS[0])[0]) == TEST_QUOTES[:2]
+    assert user_store.get_common_likes(TEST_USERS[0]) == {TEST_USERS[1]: 2}
+
+
+def test_preference_cache_is_invalidated(user_store):
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES[:1])
+    assert user_store.get_user_preferences(TEST_USERS[0]) == (TEST_QUOTES[:1], [])
+    assert user_store.get_user_preferences(TEST_USERS[0]) == (TEST_QUOTES[:1], [])
+    # own writes invalidate the cache right away
+    user_store.set_user_preferences(TEST_USERS[0], dislikes=TEST_QUOTES[:1])
+    assert user_store.get_user_preferences(TEST_USERS[0]) == ([], TEST_QUOTES[:1])
+    # writes of other processes are invalidated by Redis
+    user_store._execute([store_likes_call(TEST_USERS[:1], TEST_QUOTES[1])])
+    user_store.preference_cache._on_invalidation({'data': [PreferenceKey(username=TEST_USERS[0]).like_key.encode()]})
+    assert user_store.get_user_preferences(TEST_USERS[0]) == (TEST_QUOTES[1:2], TEST_QUOTES[:1])
+    assert user_store.preference_cache.stats().hits >= 1
+
+
+def test_preference_cache_ignores_other_user_keys(user_store):
+    user_store.get_user_preferences(TEST_USERS[0])
+    invalidations = user_store.preference_cache.stats().invalidations
+    # e.g. a profile or recommendations written by another process
+    user_store.preference_cache._on_invalidation(
+        {
+            'data': [
+                ProfileKey(username=TEST_USERS[0]).key.encode(),
+                RecommendationKey(username=TEST_USERS[0]).key.encode(),
+            ]
+        }
+    )
+    assert user_store.preference_cache.stats().invalidations == invalidations
+    hits = user_store.preference_cache.stats().hits
+    user_store.get_user_preferences(TEST_USERS[0])
+    assert user_store.preference_cache.stats().hits == hits + 1
+
+
+def test_recent_preferences_follow_moves_and_deletes(user_store):
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES[:1])
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES[1:])
+    user_store.set_user_preferences(TEST_USERS[0], dislikes=TEST_QUOTES[1:2])
+    user_store.delete_user_preference(TEST_USERS[0], likes=TEST_QUOTES[2:])
+    assert user_store.get_recent_preferences_batch(TEST_USERS[:1]) == [(TEST_QUOTES[:1], TEST_QUOTES[1:2])]
+
+
+def test_buffered_preferences_are_applied_in_one_batch(user_store):
+    changes = []
+    user_store.add_preference_listener(changes.append)
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES[:2], dislikes=TEST_QUOTES[2:])
+    assert user_store.apply_user_preferences(
+        TEST_USERS[0], dislikes=TEST_QUOTES[:1], unset_likes=TEST_QUOTES[1:2], unset_dislikes=TEST_QUOTES[2:]
+    )
+    assert user_store.get_user_preferences(TEST_USERS[0]) == ([], TEST_QUOTES[:1])
+    assert changes[-1].removed_likes == [TEST_QUOTES[1], TEST_QUOTES[0]]
+    assert changes[-1].removed_dislikes == TEST_QUOTES[2:]
+    assert changes[-1].added_dislikes == TEST_QUOTES[:1]
+
+
+def test_preference_sets_are_migrated_to_bitmaps(user_store):
+    user_store.client.sadd(PreferenceKey(username=TEST_USERS[0]).like_key, *TEST_QUOTES[:2])
+    user_store.client.sadd(PreferenceKey(username=TEST_USERS[0]).dislike_key, TEST_QUOTES[2])
+    user_store.client.sadd(PreferenceKey(username=TEST_USERS[1]).like_key, *TEST_QUOTES[1:])
+    report = user_store.migrate_to_bitmaps(batch_size=2)
+    assert report.keys >= 3
+    assert report.set_bytes > 0 and report.bitmap_bytes > 0 and report.mapping_bytes > 0
+    assert report.used_memory_before > 0 and report.used_memory_after > 0
+    likes, dislikes = user_store.get_user_preferences(TEST_USERS[0])
+    assert (sorted(likes), dislikes) == (TEST_QUOTES[:2], TEST_QUOTES[2:])
+    assert user_store.get_common_likes(TEST_USERS[0], candidates=TEST_USERS[1:2]) == {TEST_USERS[1]: 1}
+    # migrated bitmaps are updated by the preference scripts
+    user_store.set_user_preferences(TEST_USERS[0], likes=TEST_QUOTES[2:])
+    assert sorted(user_store.get_user_preferences(TEST_USERS[0])[0]) == TEST_QUOTES
+    assert user_store.get_common_likes(TEST_USERS[0], candidates=TEST_USERS[1:2]) == {TEST_USERS[1]: 2}
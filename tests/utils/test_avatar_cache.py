@@ -0,0 +1,62 @@
+import functools
+import http.server
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+from quotes_recommender.utils.avatar_cache import AvatarCache
+
+
+@pytest.fixture
+def avatar_server(tmp_path):
+    # serve the avatars from a local web server
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_avatars_are_cached_as_thumbnails_and_evicted(tmp_path, avatar_server):
+    avatar_urls = []
+    for color in range(3):
+        Image.new('RGB', (400, 400), color=(color * 100, 0, 0)).save(tmp_path / f'avatar-{color}.png')
+        avatar_urls.append(f'{avatar_server}/avatar-{color}.png')
+    thumbnail = AvatarCache(path=tmp_path / 'cache', thumbnail_size=40).fetch(avatar_urls[0])
+    assert Image.open(io.BytesIO(thumbnail)).size == (40, 40)
+    # the cache is read from disk by other processes, index entries holding the thumbnail names count towards the size
+    entry_size = len(thumbnail) + len(f'{"0" * 64}.jpg')
+    avatar_cache = AvatarCache(path=tmp_path / 'cache', max_bytes=int(2.5 * entry_size), thumbnail_size=40)
+    assert avatar_cache.get(avatar_urls[0]) == thumbnail
+    # broken avatars are not cached
+    assert avatar_cache.fetch(f'{avatar_server}/missing.png') is None
+    # the least recently read avatar is evicted first, together with its index entry
+    avatar_cache.fetch(avatar_urls[1])
+    avatar_cache.get(avatar_urls[0])
+    avatar_cache.fetch(avatar_urls[2])
+    assert avatar_cache.get(avatar_urls[0]) is not None
+    assert avatar_cache.get(avatar_urls[1]) is None
+    assert len(list((tmp_path / 'cache' / 'index').iterdir())) == 2
+
+
+def test_avatars_are_only_downloaded_over_http(tmp_path):
+    avatar_path = tmp_path / 'avatar.png'
+    Image.new('RGB', (400, 400)).save(avatar_path)
+    assert AvatarCache(path=tmp_path / 'cache').fetch(avatar_path.as_uri()) is None
+
+
+def test_oversized_avatars_are_rejected(tmp_path, avatar_server):
+    (tmp_path / 'avatar.png').write_bytes(b'\0' * 2048)
+    assert AvatarCache(path=tmp_path / 'cache', max_avatar_bytes=1024).fetch(f'{avatar_server}/avatar.png') is None
+
+
+def test_failures_are_forgotten_after_the_retry_interval(tmp_path, avatar_server):
+    avatar_cache = AvatarCache(path=tmp_path / 'cache', retry_interval=0)
+    for avatar in range(3):
+        assert avatar_cache.fetch(f'{avatar_server}/missing-{avatar}.png') is None
+    # failures that may be retried already are pruned when a failure is recorded
+    assert list(avatar_cache._failed) == [f'{avatar_server}/missing-2.png']
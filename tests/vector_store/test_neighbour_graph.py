@@ -0,0 +1,26 @@
+import numpy as np
+
+from quotes_recommender.vector_store.neighbour_graph import NeighbourGraph, build_neighbour_graph
+from quotes_recommender.vector_store.vector_store_numpy import NumpyVectorStore
+from tests.constants import TEST_COLLECTION_NAME
+
+
+def test_neighbour_graph_matches_exact_search(tmp_path):
+    embeddings = np.random.default_rng(0).standard_normal((100, 8))
+    vector_store = NumpyVectorStore(path=tmp_path / "vectors", embedding_size=8)
+    vector_store.upsert_quotes(
+        [{"id": point_id, "data": {"text": "", "author": "", "tags": []}} for point_id in range(100)],
+        embeddings.tolist(),
+        collection_name=TEST_COLLECTION_NAME,
+    )
+    # use a block size that does not divide the number of points
+    build_neighbour_graph(vector_store, path=tmp_path / "graph", k=5, block_size=30, collection=TEST_COLLECTION_NAME)
+    graph = NeighbourGraph(tmp_path / "graph")
+    for point_id in [0, 42, 99]:
+        exact = vector_store.get_item_item_recommendations(
+            positives=[point_id], negatives=[], limit=5, collection=TEST_COLLECTION_NAME
+        )
+        assert graph.neighbours[point_id].tolist() == [hit.id for hit in exact]
+    # recommendations never contain the examples
+    recommendations = graph.recommend(positives=[1, 2], negatives=[3], limit=10)
+    assert {point_id for point_id, _ in recommendations}.isdisjoint({"1", "2", "3"})
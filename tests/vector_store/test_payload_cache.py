@@ -0,0 +1,55 @@
+import time
+
+from qdrant_client.http.models import Record
+
+from quotes_recommender.vector_store.payload_cache import PayloadCache
+from tests.constants import TEST_COLLECTION_NAME
+
+
+def test_cache_returns_hits_and_misses():
+    cache = PayloadCache(capacity=10)
+    cache.put_many(TEST_COLLECTION_NAME, [Record(id=1, payload={"text": "a"})])
+    cached, missing = cache.get_many(TEST_COLLECTION_NAME, ["1", 2])
+    assert list(cached.keys()) == ["1"]
+    assert missing == [2]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PayloadCache(capacity=2)
+    cache.put_many(TEST_COLLECTION_NAME, [Record(id=1, payload={}), Record(id=2, payload={})])
+    # use point 1 so that point 2 becomes the least recently used one
+    cache.get_many(TEST_COLLECTION_NAME, [1])
+    cache.put_many(TEST_COLLECTION_NAME, [Record(id=3, payload={})])
+    _, missing = cache.get_many(TEST_COLLECTION_NAME, [1, 2, 3])
+    assert missing == [2]
+
+
+def test_cache_invalidation():
+    cache = PayloadCache()
+    cache.put_many(TEST_COLLECTION_NAME, [Record(id=1, payload={})])
+    cache.invalidate(TEST_COLLECTION_NAME, [1])
+    _, missing = cache.get_many(TEST_COLLECTION_NAME, [1])
+    assert missing == [1]
+
+
+def test_cache_expires_records_upserted_elsewhere():
+    cache = PayloadCache(ttl=0.05)
+    cache.put_many(TEST_COLLECTION_NAME, [Record(id=1, payload={"text": "outdated"})])
+    cached, _ = cache.get_many(TEST_COLLECTION_NAME, [1])
+    assert list(cached.keys()) == ["1"]
+    # the point is updated by another process, e.g. the scraper, without invalidating this cache
+    time.sleep(0.1)
+    _, missing = cache.get_many(TEST_COLLECTION_NAME, [1])
+    assert missing == [1]
+    cache.put_many(TEST_COLLECTION_NAME, [Record(id=1, payload={"text": "updated"})])
+    cached, _ = cache.get_many(TEST_COLLECTION_NAME, [1])
+    assert cached["1"].payload == {"text": "updated"}
+
+
+def test_cache_matches_uuids_in_any_notation():
+    point_id = "5c56c793-69f3-4fbf-87e6-c4bf54c28c26"
+    cache = PayloadCache()
+    cache.put_many(TEST_COLLECTION_NAME, [Record(id=point_id, payload={})])
+    cached, missing = cache.get_many(TEST_COLLECTION_NAME, [point_id.upper(), point_id.replace("-", "")])
+    assert list(cached.keys()) == [point_id]
+    assert missing == []
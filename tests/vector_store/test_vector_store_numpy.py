@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from quotes_recommender.vector_store.vector_store_numpy import NumpyVectorStore
+from tests.constants import TEST_COLLECTION_NAME
+
+EMBEDDING_SIZE = 8
+
+
+def create_vector_store(path, size=10):
+    vector_store = NumpyVectorStore(path=path, embedding_size=EMBEDDING_SIZE, block_size=3)
+    embeddings = np.random.default_rng(0).random((size, EMBEDDING_SIZE))
+    quotes = [
+        {
+            "id": point_id,
+            "data": {
+                "text": f"quote number {point_id}",
+                "author": "author",
+                "avatar_img": None,
+                "tags": ["love"] if point_id % 2 else ["life"],
+            },
+        }
+        for point_id in range(size)
+    ]
+    vector_store.upsert_quotes(quotes, embeddings.tolist(), collection_name=TEST_COLLECTION_NAME)
+    return vector_store, embeddings
+
+
+def test_search_returns_query_point_first(tmp_path):
+    vector_store, embeddings = create_vector_store(tmp_path)
+    hits = vector_store.get_content_based_recommendation(embeddings[3], limit=3, collection=TEST_COLLECTION_NAME)
+    assert hits[0].id == 3
+    assert hits[0].score > hits[1].score >= hits[2].score
+
+
+def test_search_with_tag_filter(tmp_path):
+    vector_store, embeddings = create_vector_store(tmp_path)
+    hits = vector_store.get_content_based_recommendation(
+        embeddings[3], tags=["life"], limit=5, collection=TEST_COLLECTION_NAME
+    )
+    assert len(hits) == 5
+    assert all("life" in hit.payload["tags"] for hit in hits)
+
+
+def test_recommendations_exclude_examples(tmp_path):
+    vector_store, _ = create_vector_store(tmp_path)
+    hits = vector_store.get_item_item_recommendations(
+        positives=["1", "2"], negatives=[3], limit=20, collection=TEST_COLLECTION_NAME
+    )
+    assert len(hits) == 7
+    assert {hit.id for hit in hits}.isdisjoint({1, 2, 3})
+
+
+def test_scroll_with_tag_filter(tmp_path):
+    vector_store, _ = create_vector_store(tmp_path)
+    points, next_offset = vector_store.scroll_points(["text"], tags=["love"], limit=3, collection=TEST_COLLECTION_NAME)
+    assert [point.id for point in points] == [1, 3, 5]
+    points, next_offset = vector_store.scroll_points(
+        ["text"], tags=["love"], limit=3, offset=next_offset, collection=TEST_COLLECTION_NAME
+    )
+    assert [point.id for point in points] == [7, 9]
+    assert next_offset is None
+
+
+def test_collection_is_persisted(tmp_path):
+    create_vector_store(tmp_path)
+    vector_store = NumpyVectorStore(path=tmp_path, embedding_size=EMBEDDING_SIZE)
+    assert vector_store.get_point_count(collection=TEST_COLLECTION_NAME) == 10
+    assert vector_store.search_points([4], collection=TEST_COLLECTION_NAME)[0].payload["tags"] == ["life"]
+
+
+def test_concurrent_upserts(tmp_path):
+    vector_store = NumpyVectorStore(path=tmp_path, embedding_size=EMBEDDING_SIZE, block_size=3)
+    embeddings = np.random.default_rng(0).random((1, EMBEDDING_SIZE)).tolist()
+
+    def upsert(point_id):
+        quote = {"id": point_id, "data": {"text": f"quote number {point_id}", "tags": ["love"]}}
+        vector_store.upsert_quotes([quote], embeddings, collection_name=TEST_COLLECTION_NAME)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(upsert, range(50)))
+    collection = vector_store.get_collection(TEST_COLLECTION_NAME)
+    assert collection.count == 50
+    assert sorted(collection.ids) == list(range(50))
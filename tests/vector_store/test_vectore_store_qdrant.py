@@ -2,6 +2,7 @@ import json
 
 from quotes_recommender.core.constants import TXT_ENCODING
 from quotes_recommender.quote_scraper.items import QuoteItem
+from quotes_recommender.vector_store.constants import PAYLOAD_INDEXES
 from quotes_recommender.vector_store.vector_store_singleton import QdrantVectorStoreSingleton
 from tests.constants import TEST_VECTOR_SIZE, TEST_COLLECTION_NAME, TEST_DATA_PATH
 
@@ -21,3 +22,12 @@ def test_upsert_quotes():
     )
     # check status
     assert response == "completed"
+
+
+def test_ensure_payload_indexes():
+    # first call creates all declared indexes
+    statuses = vector_store.ensure_payload_indexes(collection=TEST_COLLECTION_NAME)
+    assert {status.field_name for status in statuses} == set(PAYLOAD_INDEXES.keys())
+    # second call is idempotent
+    statuses = vector_store.ensure_payload_indexes(collection=TEST_COLLECTION_NAME)
+    assert all(status.status == "present" for status in statuses)